@@ -8,10 +8,10 @@ def main():
     parser = argparse.ArgumentParser(
         description="PULCHRA Protein Chain Restoration Algorithm",
         formatter_class=argparse.RawTextHelpFormatter,
-        usage="%(prog)s [options] <pdb_file>",
+        usage="%(prog)s [options] <pdb_file> [<pdb_file> ...]",
         add_help=True,
     )
-    parser.add_argument("pdb_file", nargs="?", help="Input PDB file")
+    parser.add_argument("pdb_file", nargs="*", help="Input PDB files, rebuilt one after the other")
     parser.add_argument("-v", "--verbose", action="store_true", help="Verbose output")
     parser.add_argument("-n", "--center_chain", action="store_true", help="Center chain")
     parser.add_argument("-x", "--time_seed", action="store_true", help="Time-seed random number generator")
@@ -20,7 +20,14 @@ def main():
     parser.add_argument("-p", "--cispro", action="store_true", help="Detect cis-prolins")
     parser.add_argument("-r", "--ca_random", action="store_true", help="Start from a random chain")
     parser.add_argument("-i", "--ini_file", help="Read initial C-alpha coordinates from a PDB file")
-    parser.add_argument("-t", "--ca_trajectory", action="store_true", help="Save chain optimization trajectory")
+    parser.add_argument(
+        "-t", "--ca_trajectory", action="store_true",
+        help="Save chain optimization trajectory to <pdb_file>.tra",
+    )
+    parser.add_argument(
+        "--trajectory-stride", type=int, default=1, metavar="N",
+        help="Save every N-th optimization step to the trajectory",
+    )
     parser.add_argument("-u", "--ca_start_dist", type=float, default=3.0, help="Maximum shift from the restraint coordinates")
     parser.add_argument("-e", "--bb_rearrange", action="store_true", help="Rearrange backbone atoms")
     parser.add_argument("-b", "--no_rebuild_bb", action="store_true", help="Skip backbone reconstruction")
@@ -29,6 +36,61 @@ def main():
     parser.add_argument("-s", "--no_rebuild_sc", action="store_true", help="Skip side chains reconstruction")
     parser.add_argument("-o", "--no_xvolume", action="store_true", help="Don't attempt to fix excluded volume conflicts")
     parser.add_argument("-z", "--no_chiral", action="store_true", help="Don't check amino acid chirality")
+    parser.add_argument(
+        "--all-models", action="store_true",
+        help="Rebuild every MODEL of a multi-model input (e.g. a CA trajectory)",
+    )
+    parser.add_argument(
+        "--frames", type=frame_slice, metavar="START:STOP[:STEP]",
+        help=(
+            "With --all-models, rebuild only these models, counted from 0 as in a Python slice;\n"
+            "the models of an uncompressed input are found through a frame index and read directly"
+        ),
+    )
+    parser.add_argument(
+        "--save-index", action="store_true",
+        help="With --frames, save the frame index of the input to <pdb_file>.idx for later runs",
+    )
+    parser.add_argument(
+        "--ca-only", action="store_true",
+        help=(
+            "Read only the C-alpha atoms of the input (faster on large files; other atoms are not "
+            "written out)"
+        ),
+    )
+    parser.add_argument(
+        "--cache", nargs="?", const="", metavar="DIR",
+        help=(
+            "Cache parsed inputs by content in DIR (default: $PULCHRA_CACHE_DIR or "
+            "~/.cache/pulchra)"
+        ),
+    )
+    parser.add_argument(
+        "--cache-size", type=int, default=1024,
+        help="Maximum size of the cache in megabytes; least recently used entries are evicted",
+    )
+    parser.add_argument(
+        "--float32", action="store_true",
+        help=(
+            "Store and rebuild coordinates in single precision (less memory, last digit may "
+            "differ)"
+        ),
+    )
+    parser.add_argument(
+        "--output", metavar="PATH",
+        help=(
+            "Write the rebuilt structure to PATH instead of <name>.rebuilt.pdb; \"-\" writes PDB "
+            "records to standard output,\nand a PATH ending in .coords a NumPy coordinate archive"
+        ),
+    )
+    parser.add_argument(
+        "--archive-dtype", choices=("float16", "float32", "float64"),
+        help="Coordinate type of a .coords archive (default: the rebuild precision)",
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="Parse large inputs and rebuild chains in parallel using this many processes",
+    )
 
     if len(sys.argv) == 1:
         parser.print_help(sys.stderr)
@@ -38,37 +100,131 @@ def main():
 
     if not args.pdb_file:
         parser.error("the following arguments are required: pdb_file")
+    if args.frames is not None and not args.all_models:
+        parser.error("--frames needs --all-models")
+    if args.save_index and args.frames is None:
+        parser.error("--save-index needs --frames")
+    if args.output is not None and len(args.pdb_file) > 1:
+        parser.error("--output can only be used with a single input file")
 
-    input_path = Path(args.pdb_file)
-    output_path = input_path.with_name(f"{input_path.stem}.rebuilt.pdb")
-
-    from pulchra.pdb_parser import read_pdb_file
-    from pulchra.core import ca_optimize, rebuild_backbone, rebuild_sidechains, add_hydrogens
-    from pulchra.pdb_writer import write_pdb
-
-    molecule = read_pdb_file(input_path, input_path.name)
-    if molecule:
-        if not args.no_ca_optimize:
-            ca_optimize(
-                chain=molecule,
-                ca_trajectory=args.ca_trajectory,
-                ini_file=args.ini_file,
-                cispro=args.cispro,
-                ca_random=args.ca_random,
-                ca_start_dist=args.ca_start_dist
-            )
+    import contextlib
+    from concurrent.futures import ProcessPoolExecutor
+    from pulchra.cache import DEFAULT_CACHE_DIR, StructureCache
+    from pulchra.pipeline import REBUILD_OPTIONS
 
-        c_alpha, rbins = None, None
-        if not args.no_rebuild_bb:
-            c_alpha, rbins = rebuild_backbone(molecule)
+    # With "--output -" the PDB records go to standard output, so progress
+    # messages go to standard error instead.
+    progress = contextlib.nullcontext()
+    output_path = None
+    if args.output == "-":
+        output_path = sys.stdout.buffer
+        progress = contextlib.redirect_stdout(sys.stderr)
+    elif args.output is not None:
+        output_path = Path(args.output)
 
-        if not args.no_rebuild_sc and c_alpha and rbins:
-            rebuild_sidechains(molecule, c_alpha, rbins)
+    cache = None
+    if args.cache is not None:
+        cache = StructureCache(args.cache or DEFAULT_CACHE_DIR, args.cache_size << 20)
 
-        if args.add_hydrogens:
-            add_hydrogens(molecule)
+    options = {name: getattr(args, name) for name in REBUILD_OPTIONS}
+    executor = ProcessPoolExecutor(args.jobs) if args.jobs > 1 else None
 
-        write_pdb(molecule, output_path)
+    try:
+        with progress:
+            for name in args.pdb_file:
+                input_path = Path(name)
+                rebuild_file(
+                    args, input_path, output_path or rebuilt_path(input_path),
+                    cache, executor, options,
+                )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def frame_slice(text):
+    """
+    Parses a START:STOP[:STEP] frame selection into a slice.
+    """
+    parts = text.split(":")
+    try:
+        if not 2 <= len(parts) <= 3:
+            raise ValueError
+        return slice(*(int(part) if part else None for part in parts))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid frame range {text!r}, expected START:STOP[:STEP]"
+        ) from None
+
+
+def rebuilt_path(input_path):
+    """
+    Returns the default output path for an input file.
+
+    A compressed input ("model.pdb.gz") gives a compressed output ("model.rebuilt.pdb.gz"),
+    and an mmCIF input ("model.cif") an mmCIF output ("model.rebuilt.cif").
+    """
+    from pulchra.compression import compression_suffix
+    from pulchra.mmcif import is_mmcif_path
+
+    suffix = compression_suffix(input_path)
+    stem = Path(input_path.name[:len(input_path.name) - len(suffix)]).stem
+    extension = "cif" if is_mmcif_path(input_path) else "pdb"
+    return input_path.with_name(f"{stem}.rebuilt.{extension}{suffix}")
+
+
+def rebuild_file(args, input_path, output_path, cache, executor, options):
+    """
+    Rebuilds one input file and writes it to ``output_path``.
+    """
+    from pulchra.archive import is_archive_path, write_archive, write_archive_models
+    from pulchra.pdb_parser import read_ca_chains, read_pdb_chains, iter_model_chains
+    from pulchra.pipeline import rebuild_chains
+    from pulchra.pdb_writer import TrajectoryWriter, write_pdb, write_pdb_models
+
+    # An archive holds the coordinates of the rebuilt chains only; records
+    # passed through from the input are left out.
+    archive = is_archive_path(output_path)
+    # The trajectory of every chain (and model) goes to one file as it is
+    # optimized, so the chains are then rebuilt one after the other.
+    trajectory = None
+    if args.ca_trajectory:
+        trajectory = TrajectoryWriter(
+            input_path.with_name(input_path.name + ".tra"), stride=args.trajectory_stride
+        )
+        executor = None
+    options = dict(options, ca_trajectory=trajectory)
+
+    try:
+        # Ligands, waters and ions skip reconstruction and are copied to the
+        # output as they are.
+        if args.all_models:
+            models = iter_model_chains(
+                input_path, input_path.name, ca_only=args.ca_only, frames=args.frames,
+                workers=args.jobs, passthrough=True, save_index=args.save_index,
+            )
+            rebuilt = (
+                (rebuild_chains(chains, executor, **options), passthrough)
+                for chains, passthrough in models
+            )
+            if archive:
+                molecules = (molecule for molecule, _ in rebuilt)
+                write_archive_models(molecules, output_path, args.archive_dtype)
+            else:
+                write_pdb_models(rebuilt, output_path, passthrough=True)
+        else:
+            read_chains = read_ca_chains if args.ca_only else read_pdb_chains
+            chains, passthrough = read_chains(
+                input_path, input_path.name, cache=cache, workers=args.jobs, passthrough=True
+            )
+            if chains and archive:
+                rebuilt = rebuild_chains(chains, executor, **options)
+                write_archive(rebuilt, output_path, args.archive_dtype)
+            elif chains:
+                write_pdb(rebuild_chains(chains, executor, **options), output_path, passthrough)
+    finally:
+        if trajectory is not None:
+            trajectory.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,265 @@
+import io
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+from numpy.lib import format as npy_format
+
+from .pdb_datastructures import Molecule
+
+ARCHIVE_FORMAT = "pulchra-coordinates"
+# Bumped whenever the archive layout changes.
+ARCHIVE_VERSION = 1
+# Directory suffix of coordinate archives, used to pick the output format.
+ARCHIVE_SUFFIX = ".coords"
+# Coordinate types an archive may store.
+ARCHIVE_DTYPES = ("float16", "float32", "float64")
+# Archive files of the Molecule.to_buffers arrays other than the coordinates,
+# which are the same in every frame.
+TOPOLOGY_FILES = (
+    "name", "atom_names", "name_codes", "serials", "flags", "cispro", "order", "offsets",
+    "res_num", "res_locnum", "res_type", "res_pdbsg", "res_protein", "res_name", "res_chain",
+)
+
+
+def is_archive_path(filepath):
+    """
+    Returns whether a path names a coordinate archive.
+    """
+    return isinstance(filepath, (str, Path)) and Path(filepath).suffix == ARCHIVE_SUFFIX
+
+
+def write_archive(molecule, path, dtype=None):
+    """
+    Writes a Molecule object, or a list of chain Molecules, to a new coordinate archive.
+
+    An existing archive at ``path`` is replaced. ``dtype`` is one of
+    ARCHIVE_DTYPES and defaults to the precision of the molecule. float16 has
+    11 significant bits, so it keeps coordinates to within 0.016 Å below 64 Å
+    but only 0.25 Å between 512 and 1024 Å; float32 is exact to the 0.001 Å of
+    a PDB file for any coordinate a PDB file can hold.
+    """
+    write_archive_models([molecule], path, dtype)
+
+
+def write_archive_models(molecules, path, dtype=None):
+    """
+    Writes a sequence of molecules to a new coordinate archive, one frame each.
+
+    The molecules must have the same atoms. ``molecules`` may be a generator.
+    """
+    shutil.rmtree(path, ignore_errors=True)
+    writer = ArchiveWriter(path, dtype)
+    for molecule in molecules:
+        writer.append(molecule)
+
+
+def read_archive(path, mmap=True):
+    """
+    Opens a coordinate archive for reading, as a CoordinateArchive.
+    """
+    return CoordinateArchive(path, mmap)
+
+
+class CoordinateArchive:
+    """
+    A coordinate archive: a directory of ``.npy`` files that NumPy loads directly.
+
+    ``coords`` is a (frames, atoms, 3) array in the stored precision, with the
+    atoms in the order they are written to a PDB file; the other
+    files hold the arrays of Molecule.to_buffers (atom names and codes, residue
+    names, numbers and chains, and the residue to atom tables), written with
+    the first frame. ``format.json`` names the format, its version and the
+    coordinate type. With ``mmap`` the arrays are read-only memory maps, so
+    opening an archive reads nothing but the headers.
+    """
+
+    def __init__(self, path, mmap=True):
+        self.path = Path(path)
+        info = _read_info(self.path)
+        mmap_mode = "r" if mmap else None
+        self.version = info["version"]
+        self.dtype = np.dtype(info["dtype"])
+        self.coords = np.load(self.path / "coords.npy", mmap_mode=mmap_mode, allow_pickle=False)
+        self.topology = {
+            name: np.load(self.path / f"{name}.npy", mmap_mode=mmap_mode, allow_pickle=False)
+            for name in TOPOLOGY_FILES
+        }
+
+    def __len__(self):
+        """Returns the number of frames."""
+        return len(self.coords)
+
+    @property
+    def natoms(self):
+        """Number of atoms in every frame."""
+        return self.coords.shape[1]
+
+    @property
+    def atom_names(self):
+        """The name of each atom, as a unicode array."""
+        return self.topology["atom_names"][self.topology["name_codes"]]
+
+    def molecule(self, frame=0):
+        """
+        Builds the Molecule of a frame. float16 coordinates are widened to float32.
+        """
+        coords = self.coords[frame]
+        if coords.dtype == np.float16:
+            coords = coords.astype(np.float32)
+        buffers = dict(self.topology, coords=coords, model=np.array([frame + 1]))
+        return Molecule.from_buffers(buffers)
+
+
+class ArchiveWriter:
+    """
+    Appends frames to a coordinate archive, creating it with the first frame.
+
+    Opening an existing archive appends to it, in its own precision; ``dtype``
+    must then be None or the same. Each frame is written after the frames the
+    header of ``coords.npy`` counts, replacing anything a failed append left
+    there, before the header is updated to count it, so readers never see a
+    partial frame.
+    """
+
+    def __init__(self, path, dtype=None):
+        self.path = Path(path)
+        self.dtype = None if dtype is None else np.dtype(dtype)
+        if self.dtype is not None and self.dtype.name not in ARCHIVE_DTYPES:
+            raise ValueError(f"Archive coordinates must be one of {', '.join(ARCHIVE_DTYPES)}.")
+        self.natoms = None
+        self.nframes = 0
+        if (self.path / "format.json").exists():
+            archive = CoordinateArchive(self.path)
+            if self.dtype is not None and self.dtype != archive.dtype:
+                raise ValueError(
+                    f"{self.path} stores {archive.dtype} coordinates, not {self.dtype}."
+                )
+            self.dtype = archive.dtype
+            self.natoms = archive.natoms
+            self.nframes = len(archive)
+            self._names = np.array(archive.atom_names)
+
+    def append(self, molecule):
+        """
+        Appends a Molecule object, or a list of chain Molecules, as a new frame.
+        """
+        buffers = _in_output_order(
+            _concatenate_buffers([chain.to_buffers() for chain in _as_chains(molecule)])
+        )
+        coords = buffers["coords"]
+        if self.natoms is None:
+            self._create(buffers)
+        elif len(coords) != self.natoms or not np.array_equal(
+            buffers["atom_names"][buffers["name_codes"]], self._names
+        ):
+            raise ValueError("Every frame of an archive must have the same atoms.")
+        frame = np.ascontiguousarray(coords, dtype=self.dtype.newbyteorder("<"))
+        header = io.BytesIO()
+        self._write_header(header, self.nframes + 1)
+        with open(self.path / "coords.npy", "r+b") as f:
+            npy_format.read_magic(f)
+            npy_format.read_array_header_1_0(f)
+            offset = f.tell()
+            if len(header.getvalue()) != offset:
+                raise RuntimeError(
+                    f"The header of {self.path / 'coords.npy'} cannot grow in place."
+                )
+            # Bytes past the frames the header counts are left over from an
+            # append that failed, and are overwritten.
+            f.seek(offset + self.nframes * frame.nbytes)
+            f.truncate()
+            f.write(frame.tobytes())
+            f.flush()
+            f.seek(0)
+            f.write(header.getvalue())
+        self.nframes += 1
+
+    def _create(self, buffers):
+        coords = buffers["coords"]
+        if self.dtype is None:
+            self.dtype = np.dtype(coords.dtype)
+        self.path.mkdir(parents=True, exist_ok=True)
+        for name in TOPOLOGY_FILES:
+            np.save(self.path / f"{name}.npy", buffers[name], allow_pickle=False)
+        self.natoms = len(coords)
+        self._names = buffers["atom_names"][buffers["name_codes"]]
+        with open(self.path / "coords.npy", "wb") as f:
+            self._write_header(f, 0)
+        info = {"format": ARCHIVE_FORMAT, "version": ARCHIVE_VERSION, "dtype": self.dtype.name}
+        (self.path / "format.json").write_text(json.dumps(info) + "\n")
+
+    def _write_header(self, f, nframes):
+        npy_format.write_array_header_1_0(f, {
+            "descr": npy_format.dtype_to_descr(self.dtype.newbyteorder("<")),
+            "fortran_order": False,
+            "shape": (nframes, self.natoms, 3),
+        })
+
+
+def _read_info(path):
+    try:
+        info = json.loads((path / "format.json").read_text())
+    except FileNotFoundError:
+        raise ValueError(f"{path} is not a coordinate archive.") from None
+    if info.get("format") != ARCHIVE_FORMAT:
+        raise ValueError(f"{path} is not a coordinate archive.")
+    if info["version"] > ARCHIVE_VERSION:
+        raise ValueError(
+            f"{path} is a version {info['version']} archive; this version of pulchra "
+            f"reads up to version {ARCHIVE_VERSION}."
+        )
+    return info
+
+
+def _as_chains(molecule):
+    return [molecule] if isinstance(molecule, Molecule) else list(molecule)
+
+
+def _in_output_order(buffers):
+    """
+    Returns to_buffers arrays with the atom rows sorted by residue_offsets order.
+    """
+    order = buffers["order"]
+    buffers = dict(buffers, order=np.arange(len(order), dtype=order.dtype))
+    for key in ("coords", "name_codes", "serials", "flags", "cispro"):
+        buffers[key] = buffers[key][order]
+    return buffers
+
+
+def _concatenate_buffers(parts):
+    """
+    Joins the to_buffers arrays of several chains into those of one molecule.
+
+    Atom name codes are renumbered into one name list, and the residue to
+    atom tables are shifted past the atoms of the previous chains.
+    """
+    if len(parts) == 1:
+        return parts[0]
+    names = {}
+    codes, orders, offsets = [], [], []
+    natoms = 0
+    for part in parts:
+        remap = np.array(
+            [names.setdefault(name, len(names)) for name in part["atom_names"].tolist()],
+            dtype=np.int64,
+        )
+        codes.append(remap[part["name_codes"]] if len(remap) else part["name_codes"])
+        orders.append(part["order"] + natoms)
+        offsets.append(part["offsets"][:-1] + natoms)
+        natoms += len(part["coords"])
+    offsets.append(np.array([natoms]))
+    buffers = {
+        key: np.concatenate([part[key] for part in parts])
+        for key in parts[0] if key not in ("name", "model", "atom_names")
+    }
+    buffers.update(
+        name=parts[0]["name"],
+        model=parts[0]["model"],
+        atom_names=np.array(list(names), dtype=str),
+        name_codes=np.concatenate(codes).astype(parts[0]["name_codes"].dtype),
+        order=np.concatenate(orders),
+        offsets=np.concatenate(offsets),
+    )
+    return buffers
@@ -0,0 +1,139 @@
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from .pdb_datastructures import AtomTable, RawRecords
+from .pdb_parser import read_pdb_table
+
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get("PULCHRA_CACHE_DIR", Path.home() / ".cache" / "pulchra")
+)
+DEFAULT_MAX_BYTES = 1 << 30
+# Bumped whenever the parser output or the entry layout changes.
+CACHE_VERSION = 2
+# Entry files of the passthrough records of a table read with passthrough=True.
+PASSTHROUGH_FILES = ("passthrough_data", "passthrough_starts", "passthrough_ends")
+# Bytes hashed at a time when computing a file's key.
+HASH_CHUNK_SIZE = 1 << 20
+
+
+class StructureCache:
+    """
+    On-disk cache of parsed structures, keyed by the content of the input file.
+
+    Each entry is a directory holding one ``.npy`` file per AtomTable column, so
+    a hit is reloaded by memory-mapping the arrays instead of parsing any text.
+    The key is a SHA-256 of the file bytes together with the parsing options, so
+    renamed or copied inputs share an entry and edited ones get a new one.
+
+    The total size of the entries is kept under ``max_bytes`` by evicting the
+    least recently used ones, as told by the modification time of their
+    directory, which every hit refreshes.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def read_table(self, filename, all_chains=False, ca_only=False, use_mmap=False, workers=1,
+                   passthrough=False):
+        """
+        Returns the AtomTable of a file as read_pdb_table would, from the cache if possible.
+
+        Tables loaded from the cache are backed by read-only memory maps.
+        """
+        key = self.key(filename, all_chains=all_chains, ca_only=ca_only, passthrough=passthrough)
+        table = self.load(key)
+        if table is None:
+            table = read_pdb_table(
+                filename, use_mmap=use_mmap, all_chains=all_chains, ca_only=ca_only,
+                workers=workers, passthrough=passthrough,
+            )
+            self.store(key, table)
+        return table
+
+    def key(self, filename, all_chains=False, ca_only=False, passthrough=False):
+        """
+        Returns the cache key of a file read with the given options.
+        """
+        digest = hashlib.sha256()
+        with open(filename, "rb") as f:
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+        settings = (CACHE_VERSION, AtomTable.FIELDS, all_chains, ca_only, passthrough)
+        digest.update(repr(settings).encode())
+        return digest.hexdigest()
+
+    def load(self, key):
+        """
+        Returns the cached table of a key, memory-mapped, or None on a miss.
+        """
+        entry = self.directory / key
+        try:
+            table = AtomTable(**{
+                field: np.load(entry / f"{field}.npy", mmap_mode="r", allow_pickle=False)
+                for field in AtomTable.FIELDS
+            })
+            if (entry / f"{PASSTHROUGH_FILES[0]}.npy").exists():
+                table.passthrough = RawRecords(*(
+                    np.load(entry / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+                    for name in PASSTHROUGH_FILES
+                ))
+            os.utime(entry)
+        except (FileNotFoundError, ValueError):
+            return None
+        return table
+
+    def store(self, key, table):
+        """
+        Writes a table to the cache under a key, then evicts old entries if needed.
+
+        The entry is written to a temporary directory and renamed into place, so
+        readers never see a partial entry.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = self.directory / key
+        partial = self.directory / f".{key}.{os.getpid()}"
+        partial.mkdir(exist_ok=True)
+        for field in AtomTable.FIELDS:
+            np.save(partial / f"{field}.npy", getattr(table, field), allow_pickle=False)
+        if table.passthrough is not None:
+            raw = table.passthrough.compact()
+            for name, array in zip(PASSTHROUGH_FILES, (raw.data, raw.starts, raw.ends)):
+                np.save(partial / f"{name}.npy", array, allow_pickle=False)
+        try:
+            partial.rename(entry)
+        except OSError:
+            # Another process stored the same entry first.
+            shutil.rmtree(partial, ignore_errors=True)
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """
+        Removes least recently used entries until the cache fits in ``max_bytes``.
+
+        The entry named ``keep`` is never removed.
+        """
+        entries = []
+        for entry in self.directory.iterdir():
+            if entry.name.startswith(".") or not entry.is_dir():
+                continue
+            size = sum(path.stat().st_size for path in entry.iterdir())
+            entries.append((entry.stat().st_mtime, size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry.name == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """
+        Removes every entry of the cache.
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,84 @@
+import numpy as np
+
+SPACE = ord(" ")
+ZERO = ord("0")
+MINUS = ord("-")
+
+
+def fixed_width(buf, starts, ends, lo, hi):
+    """
+    Gathers columns ``lo:hi`` of the given lines into an (n, hi - lo) byte matrix.
+
+    Columns past the end of a short line read as spaces, so every field has the
+    same width regardless of how the line was trimmed.
+    """
+    rows = np.empty((len(starts), hi - lo), dtype=np.uint8)
+    if not len(starts):
+        return rows
+    last = len(buf) - 1
+    short = (ends - starts).min() < hi
+    # One column at a time keeps the index temporaries at one integer per line.
+    for k, column in enumerate(range(lo, hi)):
+        index = starts + column
+        rows[:, k] = buf[np.minimum(index, last)]
+        if short:
+            rows[index >= ends, k] = SPACE
+    return rows
+
+
+def field(rows, lo, hi):
+    """
+    Returns columns ``lo:hi`` of a byte matrix as an array of fixed-width byte strings.
+    """
+    return np.ascontiguousarray(rows[:, lo:hi]).view(f"S{hi - lo}").ravel()
+
+
+def bytes_matrix(values, width):
+    """
+    Returns an array of byte strings as an (n, width) matrix, padded with spaces.
+    """
+    matrix = np.ascontiguousarray(values, dtype=f"S{width}").view(np.uint8).reshape(-1, width)
+    return np.where(matrix == 0, SPACE, matrix)
+
+
+def put_int(rows, values, lo, width, negative=None):
+    """
+    Writes integers right-aligned into columns ``lo:lo + width`` of a byte matrix.
+
+    ``negative`` gives the sign when it is not that of ``values`` (for -0.5 < x < 0,
+    whose integer part is 0). Values are assumed to fit.
+    """
+    if negative is None:
+        negative = values < 0
+    values = np.abs(values)
+    ndigits = 1 + sum(values >= 10 ** k for k in range(1, width))
+    for k in range(width):
+        digit = (ZERO + values // 10 ** k % 10).astype(np.uint8)
+        pad = np.where(negative & (ndigits == k), MINUS, SPACE).astype(np.uint8)
+        rows[:, lo + width - 1 - k] = np.where(ndigits > k, digit, pad)
+
+
+def put_decimal(rows, values, lo, width):
+    """
+    Writes numbers with three decimals right-aligned into columns ``lo:lo + width``.
+
+    The digits are those "%{width}.3f" formatting would give. Returns the mask of
+    the values left for the caller to format: those that do not fit, are not
+    finite, or are too close to a rounding tie to be sure of the last digit.
+    Their columns hold placeholder digits.
+    """
+    # Values past 1e15 would overflow the digit arithmetic; like non-finite ones,
+    # they are zeroed here and left to the caller.
+    finite = np.isfinite(values) & (np.abs(values) < 1e15)
+    scaled = np.abs(np.where(finite, values, 0.0)) * 1000.0
+    fraction = scaled - np.floor(scaled)
+    negative = np.signbit(values)
+    scaled = np.rint(scaled).astype(np.int64)
+    put_int(rows, scaled // 1000, lo, width - 4, negative)
+    rows[:, lo + width - 4] = ord(".")
+    for k, divisor in enumerate((100, 10, 1)):
+        rows[:, lo + width - 3 + k] = ZERO + scaled // divisor % 10
+    return (
+        ~finite | (np.abs(fraction - 0.5) < 1e-6)
+        | (scaled >= 10 ** (width - 1)) | (negative & (scaled >= 10 ** (width - 2)))
+    )
@@ -0,0 +1,74 @@
+import bz2
+import gzip
+import io
+import lzma
+from pathlib import Path
+
+# Leading bytes identifying each supported compression format.
+MAGIC_BYTES = {
+    b"\x1f\x8b": gzip,
+    b"BZh": bz2,
+    b"\xfd7zXZ\x00": lzma,
+}
+
+# File suffixes selecting a compression format for output.
+SUFFIXES = {
+    ".gz": gzip,
+    ".bz2": bz2,
+    ".xz": lzma,
+}
+
+
+def detect_compression(filename):
+    """
+    Returns the compression module (gzip, bz2 or lzma) of a file, or None.
+
+    The format is recognized by its magic bytes, so misnamed files still open.
+    """
+    with open(filename, "rb") as f:
+        head = f.read(max(len(magic) for magic in MAGIC_BYTES))
+    for magic, module in MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return module
+    return None
+
+
+def compression_suffix(filename):
+    """
+    Returns the compression suffix of a file name (e.g. ".gz"), or an empty string.
+    """
+    suffix = Path(filename).suffix
+    return suffix if suffix in SUFFIXES else ""
+
+
+def open_input(filename):
+    """
+    Opens a file for binary reading, decompressing it on the fly if needed.
+
+    Compressed files are decompressed incrementally as the stream is read.
+    """
+    module = detect_compression(filename)
+    if module is None:
+        return open(filename, "rb")
+    return module.open(filename, "rb")
+
+
+def open_input_text(filename):
+    """
+    Opens a possibly compressed file for text reading.
+    """
+    return io.TextIOWrapper(open_input(filename))
+
+
+def open_output(filepath, mode="w"):
+    """
+    Opens a file for writing, compressing it if its suffix asks for it.
+
+    ``mode`` is "w" for text or "wb" for bytes.
+    """
+    module = SUFFIXES.get(compression_suffix(filepath))
+    if module is None:
+        return open(filepath, mode)
+    if mode == "w":
+        return module.open(filepath, "wt")
+    return module.open(filepath, mode)
@@ -1,17 +1,33 @@
 import math
 import random
+from functools import lru_cache
+
 import numpy as np
-from .pdb_datastructures import Molecule
+from .pdb_datastructures import Molecule, CATrace
 from .energy import calc_ca_energy
-from .data import AA_NAMES, SHORT_AA_NAMES, AA_NUMS, NHEAVY, HEAVY_ATOM_NAMES, NCO_STAT, NCO_STAT_PRO
-from .geometry import calc_distance, calc_r14, superimpose, cross, norm
+from .data import (
+    AA_NAMES, SHORT_AA_NAMES, AA_NUMS, AA_MAP_3_TO_NUM, NHEAVY, HEAVY_ATOM_NAMES, NCO_STAT,
+    NCO_STAT_PRO,
+)
+from .geometry import calc_r14_rows, superimpose, cross, norm
 from .rotamer_data import ROT_STAT_IDX, ROT_STAT_COORDS
 
+GLY = AA_MAP_3_TO_NUM["GLY"]
+PRO = AA_MAP_3_TO_NUM["PRO"]
+# The rotamer coordinates are generated from rot_data_coords.h; without it the
+# table is a single NaN and side chains cannot be placed.
+HAVE_ROTAMER_COORDS = ROT_STAT_COORDS.ndim == 2
+# Number of (r13_1, r13_2, r14) distance bins of the NCO fragment tables.
+NCO_BINS = (10, 10, 74)
+
 def rebuild_sidechains(chain, c_alpha, rbins):
     """
     Rebuilds the side chains of the protein.
     """
     print("Rebuilding side chains...")
+    if not HAVE_ROTAMER_COORDS:
+        print("Rotamer coordinates are not available, side chains are kept as they are.")
+        return
     chain_length = len(chain.residues)
     res_list = []
     for res in chain.residues:
@@ -21,7 +37,8 @@ def rebuild_sidechains(chain, c_alpha, rbins):
 
     for i in range(chain_length):
         res = res_list[i]
-        if res.name == "GLY" or not res.protein:
+        # Types past the 20 standard amino acids (UNK) have no side chain template.
+        if res.type == GLY or res.type >= len(NHEAVY) or not res.protein:
             continue
 
         x1, y1, z1 = c_alpha[ca_offset + i - 2]
@@ -61,7 +78,7 @@ def rebuild_sidechains(chain, c_alpha, rbins):
         for j in range(nsc):
             sc.append(ROT_STAT_COORDS[pos+j])
 
-        rmsd, transformed_coords = superimpose(lsys, vv, sc)
+        rmsd, transformed_coords = superimpose(lsys, vv, sc, dtype=chain.dtype)
 
         transformed_coords = np.array(transformed_coords)
         transformed_coords += np.array([x3, y3, z3])
@@ -71,22 +88,24 @@ def rebuild_sidechains(chain, c_alpha, rbins):
             res.add_or_replace_atom(atom_name, transformed_coords[j][0], transformed_coords[j][1], transformed_coords[j][2], 4)
 
 
-def rebuild_backbone(chain):
+def rebuild_backbone(chain, ca_coords=None):
     """
     Rebuilds the protein backbone.
+
+    ``ca_coords`` gives the (n, 3) C-alpha coordinates of the residues, such as
+    CATrace.coords; when omitted they are looked up in the residues' atoms.
     """
     print("Rebuilding backbone...")
 
     # Initialize data structures
     chain_length = len(chain.residues)
-    c_alpha_coords = []
-    res_list = []
-    for res in chain.residues:
-        res_list.append(res)
-        for atom in res.atoms:
-            if atom.name == 'CA':
-                c_alpha_coords.append([atom.x, atom.y, atom.z])
-                break
+    res_list = list(chain.residues)
+    if ca_coords is None:
+        ca_coords = chain.coords[[atom.index for atom in _c_alpha_atoms(chain)]]
+    c_alpha_coords = np.asarray(ca_coords).tolist()
+    dtype = chain.dtype
+    nco_stat, nco_stat_pro = _nco_tables(dtype)
+    nco_grids = _nco_grids()
 
     x_coords = []
     for i in range(5):
@@ -104,7 +123,7 @@ def rebuild_backbone(chain):
     cacoords = [c_alpha[ca_offset + i] for i in range(2, 5)]
     tmpstat = [c_alpha[ca_offset + i] for i in range(3)]
 
-    rmsd, transformed_coords = superimpose(tmpstat, cacoords, tmpcoords)
+    rmsd, transformed_coords = superimpose(tmpstat, cacoords, tmpcoords, dtype=dtype)
 
     for i in range(2):
         for j in range(3):
@@ -115,66 +134,36 @@ def rebuild_backbone(chain):
     cacoords = [c_alpha[ca_offset + i] for i in range(chain_length - 5, chain_length - 2)]
     tmpstat = [c_alpha[ca_offset + i] for i in range(chain_length - 3, chain_length)]
 
-    rmsd, transformed_coords = superimpose(tmpstat, cacoords, tmpcoords)
+    rmsd, transformed_coords = superimpose(tmpstat, cacoords, tmpcoords, dtype=dtype)
 
     c_alpha[ca_offset + chain_length] = transformed_coords[3]
     c_alpha[ca_offset + chain_length + 1] = transformed_coords[4]
 
 
+    rbins = _distance_bins(np.array(c_alpha[ca_offset - 2:ca_offset + chain_length + 2]))
+
     # Loop through the chain
-    rbins = []
     for i in range(chain_length + 1):
-        x1, y1, z1 = c_alpha[ca_offset + i - 2]
-        x2, y2, z2 = c_alpha[ca_offset + i - 1]
-        x3, y3, z3 = c_alpha[ca_offset + i]
-        x4, y4, z4 = c_alpha[ca_offset + i + 1]
-
-        r13_1 = calc_distance(np.array([x1, y1, z1]), np.array([x3, y3, z3]))
-        r13_2 = calc_distance(np.array([x2, y2, z2]), np.array([x4, y4, z4]))
-        p1 = np.array([x1, y1, z1])
-        p2 = np.array([x2, y2, z2])
-        p3 = np.array([x3, y3, z3])
-        p4 = np.array([x4, y4, z4])
-        r14 = calc_r14(p1, p2, p3, p4)
-
-        bin13_1 = int((r13_1 - 4.6) / 0.3)
-        bin13_2 = int((r13_2 - 4.6) / 0.3)
-        bin14 = int((r14 + 11.0) / 0.3)
-
-        if bin13_1 < 0: bin13_1 = 0
-        if bin13_2 < 0: bin13_2 = 0
-        if bin14 < 0: bin14 = 0
-        if bin13_1 > 9: bin13_1 = 9
-        if bin13_2 > 9: bin13_2 = 9
-        if bin14 > 73: bin14 = 73
-
-        rbins.append([bin13_1, bin13_2, bin14])
-
-        cacoords = [[x1, y1, z1], [x2, y2, z2], [x3, y3, z3], [x4, y4, z4]]
+        bin13_1, bin13_2, bin14 = rbins[i]
+        cacoords = c_alpha[ca_offset + i - 2:ca_offset + i + 2]
 
         prevres = res_list[i-1] if i > 0 else None
 
         pro = False
-        if prevres and prevres.name == "PRO":
+        if prevres and prevres.type == PRO:
             pro = True
 
         if pro:
-            nco_stat_list = NCO_STAT_PRO
+            nco_stat_list = nco_stat_pro
         else:
-            nco_stat_list = NCO_STAT
+            nco_stat_list = nco_stat
 
-        besthit = 1000.0
-        bestpos = 0
-        for j, (bins, data) in enumerate(nco_stat_list):
-            hit = abs(bins[0] - bin13_1) + abs(bins[1] - bin13_2) + 0.2 * abs(bins[2] - bin14)
-            if hit < besthit:
-                besthit = hit
-                bestpos = j
+        bestpos = int(nco_grids[pro][bin13_1, bin13_2, bin14])
 
         tmpstat = nco_stat_list[bestpos][1][:4]
         tmpcoords = nco_stat_list[bestpos][1]
 
-        rmsd, transformed_coords = superimpose(cacoords, tmpstat, tmpcoords)
+        rmsd, transformed_coords = superimpose(cacoords, tmpstat, tmpcoords, dtype=dtype)
 
         if prevres:
             prevres.add_or_replace_atom("C", transformed_coords[4][0], transformed_coords[4][1], transformed_coords[4][2], 1)
@@ -186,39 +175,105 @@ def rebuild_backbone(chain):
 
     return c_alpha, rbins
 
+@lru_cache(maxsize=None)
+def _nco_tables(dtype):
+    """
+    Returns NCO_STAT and NCO_STAT_PRO with their coordinates converted to ``dtype``.
+    """
+    return tuple(
+        [(bins, coords.astype(dtype, copy=False)) for bins, coords in table]
+        for table in (NCO_STAT, NCO_STAT_PRO)
+    )
+
+def _distance_bins(ca):
+    """
+    Returns the NCO fragment bins of every window of four consecutive rows of ``ca``.
+
+    The bins are returned as a list of [bin13_1, bin13_2, bin14] triples.
+    ``ca`` holds the C-alpha coordinates with the two extrapolated positions
+    before and after the chain, so window i spans residues i-2 to i+1. The
+    r13 distances are CA(i-2)-CA(i) and CA(i-1)-CA(i+1), r14 is the signed
+    CA(i-2)-CA(i+1) distance, and the bins are clamped to NCO_BINS.
+    """
+    p1, p2, p3, p4 = ca[:-3], ca[1:-2], ca[2:-1], ca[3:]
+    r13_1 = np.linalg.norm(p1 - p3, axis=1)
+    r13_2 = np.linalg.norm(p2 - p4, axis=1)
+    r14 = calc_r14_rows(p1, p2, p3, p4)
+    bins = np.stack([(r13_1 - 4.6) / 0.3, (r13_2 - 4.6) / 0.3, (r14 + 11.0) / 0.3], axis=1)
+    # Truncated toward zero, as int() does, then clamped.
+    bins = np.clip(bins.astype(np.int64), 0, np.array(NCO_BINS) - 1)
+    return bins.tolist()
+
+@lru_cache(maxsize=None)
+def _nco_grids():
+    """
+    Returns, for NCO_STAT and NCO_STAT_PRO, the best fragment of every bin triple.
+
+    Each grid is an array of shape NCO_BINS holding fragment indices. The best
+    fragment minimizes |bin13_1 - b0| + |bin13_2 - b1| + 0.2 |bin14 - b2|; of
+    equal ones the first in the table wins, as argmin picks the first minimum.
+    """
+    grids = []
+    bin13_1, bin13_2, bin14 = np.indices(NCO_BINS)
+    for table in (NCO_STAT, NCO_STAT_PRO):
+        bins = np.array([bins for bins, _ in table], dtype=np.int64)
+        hits = (
+            np.abs(bins[:, 0, None, None, None] - bin13_1)
+            + np.abs(bins[:, 1, None, None, None] - bin13_2)
+            + 0.2 * np.abs(bins[:, 2, None, None, None] - bin14)
+        )
+        grids.append(hits.argmin(axis=0).astype(np.intp))
+    return tuple(grids)
+
 def ca_optimize(chain, ca_trajectory, ini_file, cispro, ca_random, ca_start_dist):
     """
     Optimizes the positions of the C-alpha atoms.
+
+    ``chain`` is a Molecule, whose CA atoms are moved, or a CATrace, whose
+    coordinate array is updated in place. ``ca_trajectory`` is None or a
+    pdb_writer.TrajectoryWriter, which gets the C-alpha positions every
+    ``ca_trajectory.stride`` steps and after the last one.
     """
     print("Optimizing C-alpha atoms...")
 
-    c_alpha = []
-    for res in chain.residues:
-        for atom in res.atoms:
-            if atom.name == 'CA':
-                c_alpha.append(atom)
-                break
+    if isinstance(chain, CATrace):
+        index = slice(None)
+        res_types = chain.types.tolist()
+        labels = (chain.resname, chain.resnum, chain.chain)
+    else:
+        atoms = _c_alpha_atoms(chain)
+        index = np.array([atom.index for atom in atoms], dtype=np.intp)
+        res_types = [atom.res.type for atom in atoms]
+        labels = (
+            np.array([atom.res.name for atom in atoms], dtype="S3"),
+            np.array([atom.res.num for atom in atoms], dtype=np.int64),
+            np.array([atom.res.chain[:1] for atom in atoms], dtype="S1"),
+        )
+        chain.own_buffers()
+    coords = chain.coords
+    c_alpha = coords[index].tolist()
 
     chain_length = len(c_alpha)
     if not chain_length:
         return
 
-    init_c_alpha = [[atom.x, atom.y, atom.z] for atom in c_alpha]
+    init_c_alpha = [list(row) for row in c_alpha]
 
+    cispro_flags = [False] * chain_length
     if cispro:
         for i in range(1, chain_length):
-            dx = c_alpha[i].x - c_alpha[i-1].x
-            dy = c_alpha[i].y - c_alpha[i-1].y
-            dz = c_alpha[i].z - c_alpha[i-1].z
+            dx = c_alpha[i][0] - c_alpha[i-1][0]
+            dy = c_alpha[i][1] - c_alpha[i-1][1]
+            dz = c_alpha[i][2] - c_alpha[i-1][2]
             dd = math.sqrt(dx*dx + dy*dy + dz*dz)
             # A simple check for cis-proline, more sophisticated logic might be needed
-            if c_alpha[i].res.name == 'PRO' and 2.8 < dd < 3.0:
-                c_alpha[i].cispro = True
+            if res_types[i] == PRO and 2.8 < dd < 3.0:
+                cispro_flags[i] = True
+        if not isinstance(chain, CATrace):
+            chain.cispro[index] |= cispro_flags
 
     if ca_random:
-        c_alpha[0].x = 0.0
-        c_alpha[0].y = 0.0
-        c_alpha[0].z = 0.0
+        c_alpha[0] = [0.0, 0.0, 0.0]
         for i in range(1, chain_length):
             dx = 0.01 * (100 - random.randint(0, 199))
             dy = 0.01 * (100 - random.randint(0, 199))
@@ -227,9 +282,7 @@ def ca_optimize(chain, ca_trajectory, ini_file, cispro, ca_random, ca_start_dist
             dx *= dd
             dy *= dd
             dz *= dd
-            c_alpha[i].x = c_alpha[i-1].x + dx
-            c_alpha[i].y = c_alpha[i-1].y + dy
-            c_alpha[i].z = c_alpha[i-1].z + dz
+            c_alpha[i] = [c_alpha[i-1][0] + dx, c_alpha[i-1][1] + dy, c_alpha[i-1][2] + dz]
 
     gradient = [[0.0, 0.0, 0.0] for _ in range(chain_length)]
     energies = [0.0, 0.0, 0.0, 0.0]
@@ -240,29 +293,35 @@ def ca_optimize(chain, ca_trajectory, ini_file, cispro, ca_random, ca_start_dist
     last_gnorm = 1000.0
 
     while fcnt < 3 and num_steps < 100: # Simplified loop condition for now
+        if ca_trajectory and num_steps % ca_trajectory.stride == 0:
+            ca_trajectory.add_frame(c_alpha, *labels)
+
         # Calculate gradients
         for i in range(chain_length):
             gradient[i][0] = gradient[i][1] = gradient[i][2] = 0.0
 
-        e_pot = calc_ca_energy(c_alpha, new_c_alpha, init_c_alpha, gradient, 0.0, energies, True, ca_start_dist)
+        e_pot = calc_ca_energy(c_alpha, new_c_alpha, init_c_alpha, gradient, 0.0, energies, True, ca_start_dist,
+                               cispro_flags)
 
         # Line search
         alpha1 = -1.0
         alpha2 = 0.0
         alpha3 = 1.0
 
-        ene1 = calc_ca_energy(c_alpha, new_c_alpha, init_c_alpha, gradient, alpha1, energies, False, ca_start_dist)
+        ene1 = calc_ca_energy(c_alpha, new_c_alpha, init_c_alpha, gradient, alpha1, energies, False, ca_start_dist,
+                              cispro_flags)
         ene2 = e_pot
-        ene3 = calc_ca_energy(c_alpha, new_c_alpha, init_c_alpha, gradient, alpha3, energies, False, ca_start_dist)
+        ene3 = calc_ca_energy(c_alpha, new_c_alpha, init_c_alpha, gradient, alpha3, energies, False, ca_start_dist,
+                              cispro_flags)
 
         # Simplified line search
         last_alpha = 0.01
 
         # Update coordinates
         for i in range(chain_length):
-            c_alpha[i].x += last_alpha * gradient[i][0]
-            c_alpha[i].y += last_alpha * gradient[i][1]
-            c_alpha[i].z += last_alpha * gradient[i][2]
+            c_alpha[i][0] += last_alpha * gradient[i][0]
+            c_alpha[i][1] += last_alpha * gradient[i][1]
+            c_alpha[i][2] += last_alpha * gradient[i][2]
 
         gnorm = 0.0
         for i in range(chain_length):
@@ -275,6 +334,22 @@ def ca_optimize(chain, ca_trajectory, ini_file, cispro, ca_random, ca_start_dist
 
         num_steps += 1
 
+    if ca_trajectory:
+        ca_trajectory.add_frame(c_alpha, *labels)
+    coords[index] = c_alpha
+
+def _c_alpha_atoms(chain):
+    """
+    Returns the first CA atom of each residue that has one.
+    """
+    atoms = []
+    for res in chain.residues:
+        for atom in res.atoms:
+            if atom.name == 'CA':
+                atoms.append(atom)
+                break
+    return atoms
+
 def add_hydrogens(chain: Molecule):
     """
     Adds hydrogen atoms to the protein chain.
@@ -287,7 +362,10 @@ def add_hydrogens(chain: Molecule):
     prev_c_coord = None
     for res in chain.residues:
 
-        heavy_atoms = {atom.name: np.array([atom.x, atom.y, atom.z]) for atom in res.atoms}
+        # Rows of the coordinate buffer, read in place; the buffer may be
+        # reallocated as atoms are added, so it is looked up per residue.
+        coords = chain.coords
+        heavy_atoms = {atom.name: coords[atom.index] for atom in res.atoms}
 
         # Get the C-atom of the previous residue for amide H placement
         if prev_c_coord is None and res.num > 1:
@@ -1,18 +1,24 @@
 import math
 from . import constants
 
-def calc_ca_energy(c_alpha, new_c_alpha, init_c_alpha, gradient, alpha, ene, calc_gradient, ca_start_dist):
+def calc_ca_energy(c_alpha, new_c_alpha, init_c_alpha, gradient, alpha, ene, calc_gradient, ca_start_dist,
+                   cispro=None):
     """
     Calculates the energy of the C-alpha chain.
+
+    ``c_alpha`` holds the [x, y, z] coordinates of the C-alpha atoms and
+    ``cispro`` flags the residues preceded by a cis peptide bond.
     """
     chain_length = len(c_alpha)
     if not new_c_alpha:
-        new_c_alpha = [[atom.x, atom.y, atom.z] for atom in c_alpha]
+        new_c_alpha = [list(coords) for coords in c_alpha]
+    if cispro is None:
+        cispro = [False] * chain_length
 
     for i in range(chain_length):
-        new_c_alpha[i][0] = c_alpha[i].x + alpha * gradient[i][0]
-        new_c_alpha[i][1] = c_alpha[i].y + alpha * gradient[i][1]
-        new_c_alpha[i][2] = c_alpha[i].z + alpha * gradient[i][2]
+        new_c_alpha[i][0] = c_alpha[i][0] + alpha * gradient[i][0]
+        new_c_alpha[i][1] = c_alpha[i][1] + alpha * gradient[i][1]
+        new_c_alpha[i][2] = c_alpha[i][2] + alpha * gradient[i][2]
 
     new_e_pot = 0.0
     ene[0] = ene[1] = ene[2] = ene[3] = 0.0
@@ -40,7 +46,7 @@ def calc_ca_energy(c_alpha, new_c_alpha, init_c_alpha, gradient, alpha, ene, cal
         dz = new_c_alpha[i][2] - new_c_alpha[i-1][2]
         dist = math.sqrt(dx*dx + dy*dy + dz*dz)
 
-        if c_alpha[i].cispro:
+        if cispro[i]:
             ddist = constants.CA_DIST_CISPRO - dist
         else:
             ddist = constants.CA_DIST - dist
@@ -0,0 +1,169 @@
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from .pdb_parser import MODEL_MARK
+
+# Suffix appended to a PDB file name to name its frame index.
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"PULCHIDX"
+# Bumped whenever the index layout changes.
+INDEX_VERSION = 1
+# Magic, version, then the size and modification time of the indexed file.
+INDEX_HEADER = struct.Struct("<8sIxxxxqq")
+# One (model number, start offset, end offset) row per frame.
+INDEX_ROW = np.dtype([("number", "<i8"), ("start", "<i8"), ("end", "<i8")])
+# Bytes scanned at a time when building an index.
+SCAN_CHUNK_SIZE = 1 << 20
+
+
+def index_path(filename):
+    """
+    Returns the path of the frame index of a file: the file name plus ".idx".
+    """
+    filename = Path(filename)
+    return filename.with_name(filename.name + INDEX_SUFFIX)
+
+
+class FrameIndex:
+    """
+    Byte offsets of the models (frames) of an uncompressed multi-model PDB file.
+
+    ``rows`` has one (number, start, end) row per frame: the MODEL serial and
+    the byte range from the start of its MODEL record to the end of its ENDMDL
+    record. A file without MODEL records is one frame spanning the whole file.
+
+    The index can be kept next to the file, in ``<file>.idx``, as a small header
+    followed by the rows, so it can be appended to as frames are written. The
+    header records the size and modification time of the indexed file; an
+    index that does not match them is stale and is rebuilt.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __len__(self):
+        """Returns the number of indexed frames."""
+        return len(self.rows)
+
+    @property
+    def numbers(self):
+        """Model numbers of the indexed frames."""
+        return self.rows["number"]
+
+    @classmethod
+    def for_file(cls, filename, save=False):
+        """
+        Returns the index of a file, from its sidecar if that is up to date.
+
+        Otherwise the index is built. Only with ``save`` is a built index
+        written as the sidecar; otherwise it is kept in memory, so reading a
+        file writes nothing next to it.
+        """
+        index = cls.load(filename)
+        if index is None:
+            index = cls.build(filename)
+            if save:
+                index.save(filename)
+        return index
+
+    @classmethod
+    def build(cls, filename):
+        """
+        Scans a file for its MODEL/ENDMDL blocks.
+        """
+        rows = []
+        start = number = None
+        offset = 0
+        carry = b""
+        with open(filename, "rb") as f:
+            while True:
+                chunk = f.read(SCAN_CHUNK_SIZE)
+                data = carry + chunk
+                cut = len(data) if not chunk else data.rfind(b"\n") + 1
+                base = offset - len(carry)
+                for mark in MODEL_MARK.finditer(data, 0, cut):
+                    line_end = data.find(b"\n", mark.start(), cut)
+                    line_end = cut if line_end < 0 else line_end + 1
+                    kind = mark.group(1)
+                    if kind == b"MODEL":
+                        fields = data[mark.end():line_end].split()
+                        number = int(fields[0]) if fields else len(rows) + 1
+                        start = base + mark.start()
+                    elif kind == b"ENDMDL" and start is not None:
+                        rows.append((number, start, base + line_end))
+                        start = None
+                carry = data[cut:]
+                offset += len(chunk)
+                if not chunk:
+                    break
+        if start is not None:
+            rows.append((number, start, offset))
+        if not rows and offset:
+            rows.append((1, 0, offset))
+        return cls(np.array(rows, dtype=INDEX_ROW))
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Reads the sidecar index of a file, or returns None if it is missing or stale.
+        """
+        try:
+            with open(index_path(filename), "rb") as f:
+                header = f.read(INDEX_HEADER.size)
+                rows = np.fromfile(f, dtype=INDEX_ROW)
+            magic, version, size, mtime = INDEX_HEADER.unpack(header)
+            stat = os.stat(filename)
+        except (OSError, struct.error):
+            return None
+        expected = (INDEX_MAGIC, INDEX_VERSION, stat.st_size, stat.st_mtime_ns)
+        if (magic, version, size, mtime) != expected:
+            return None
+        return cls(rows)
+
+    def save(self, filename):
+        """
+        Writes the index as the sidecar of ``filename``.
+        """
+        with open(index_path(filename), "wb") as f:
+            f.write(_header(filename))
+            f.write(self.rows.tobytes())
+
+    def select(self, frames):
+        """
+        Returns the rows of the frames selected by a slice or range of positions.
+        """
+        if isinstance(frames, range):
+            frames = slice(frames.start, frames.stop, frames.step)
+        return self.rows[frames]
+
+
+class IndexAppender:
+    """
+    Keeps the sidecar index of a file up to date as frames are appended to it.
+
+    The caller writes the frames to the file, then calls append with their rows
+    once they are flushed; the header is rewritten to match the file each time.
+    """
+
+    def __init__(self, filename):
+        self.filename = Path(filename)
+        with open(index_path(self.filename), "wb") as f:
+            f.write(_header(self.filename))
+
+    def append(self, rows):
+        """
+        Adds (number, start, end) rows of flushed frames to the sidecar.
+        """
+        with open(index_path(self.filename), "r+b") as f:
+            f.seek(0, 2)
+            f.write(np.asarray(rows, dtype=INDEX_ROW).tobytes())
+            f.seek(0)
+            f.write(_header(self.filename))
+
+
+def _header(filename):
+    stat = os.stat(filename)
+    return INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, stat.st_size, stat.st_mtime_ns)
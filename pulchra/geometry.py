@@ -2,11 +2,15 @@
 
 import numpy as np
 
-def superimpose(coords1, coords2, tpoints):
+def superimpose(coords1, coords2, tpoints, dtype=np.float64):
     """
     Superimposes two sets of coordinates and applies the transformation to a third set.
     This is a Python/NumPy port of the superimpose2 function from the C code.
+    The computation is done in ``dtype``.
     """
+    coords1 = np.asarray(coords1, dtype=dtype)
+    coords2 = np.asarray(coords2, dtype=dtype)
+    tpoints = np.asarray(tpoints, dtype=dtype)
     npoints = len(coords1)
 
     c1 = np.mean(coords1, axis=0)
@@ -113,21 +117,29 @@ def calc_r14(p1, p2, p3, p4):
 
     return r
 
+def calc_r14_rows(p1, p2, p3, p4):
+    """
+    calc_r14 over the rows of four (n, 3) arrays, returning an (n,) array.
+
+    The arithmetic is the same, term by term, as in calc_r14.
+    """
+    p1, p2, p3, p4 = (np.asarray(p, dtype=np.float64) for p in (p1, p2, p3, p4))
+    d = p4 - p1
+    r = np.sqrt(d[:, 0]*d[:, 0] + d[:, 1]*d[:, 1] + d[:, 2]*d[:, 2])
+
+    v1 = p2 - p1
+    v2 = p3 - p2
+    v3 = p4 - p3
+    hand = (v1[:, 1]*v2[:, 2] - v2[:, 1]*v1[:, 2])*v3[:, 0] + \
+           (v1[:, 2]*v2[:, 0] - v2[:, 2]*v1[:, 0])*v3[:, 1] + \
+           (v1[:, 0]*v2[:, 1] - v2[:, 0]*v1[:, 1])*v3[:, 2]
+
+    return np.where(hand < 0, -r, r)
+
 def find_atom(res, atom_name):
     """Finds an atom in a residue by name."""
-    for atom in res.atoms:
-        if atom.name == atom_name:
-            return atom
-    return None
+    return res.find_atom(atom_name)
 
 def add_replace_atom(res, atom_name, x, y, z, flag=0):
     """Adds or replaces an atom in a residue."""
-    atom = find_atom(res, atom_name)
-    if atom:
-        atom.x = x
-        atom.y = y
-        atom.z = z
-        atom.flag |= flag
-    else:
-        new_atom = Atom(name=atom_name, x=x, y=y, z=z, flag=flag)
-        res.add_atom(new_atom)
+    res.add_or_replace_atom(atom_name, x, y, z, flag)
@@ -0,0 +1,351 @@
+import re
+from pathlib import Path
+
+import numpy as np
+
+from .columns import SPACE, bytes_matrix, field, put_decimal, put_int
+from .compression import compression_suffix, open_input
+from .pdb_datastructures import AtomTable
+
+MMCIF_SUFFIXES = (".cif", ".mmcif")
+# A quoted or bare token, for loops whose values contain quotes.
+QUOTED_TOKEN = re.compile(rb"'([^']*)'(?=\s|$)|\"([^\"]*)\"(?=\s|$)|(\S+)")
+# One item name of the _atom_site loop header.
+ATOM_SITE_ITEM = re.compile(rb"\s*_atom_site\.(\S+)[^\n]*\n")
+# Line starts ending the rows of a loop.
+LOOP_END = (b"\n#", b"\nloop_", b"\n_", b"\ndata_")
+# Values standing for "unknown" or "not applicable".
+NULL_VALUES = (b".", b"?")
+
+# _atom_site items written by write_atom_site, in order.
+ATOM_SITE_ITEMS = (
+    "group_PDB",
+    "id",
+    "type_symbol",
+    "label_atom_id",
+    "label_alt_id",
+    "label_comp_id",
+    "label_asym_id",
+    "label_seq_id",
+    "pdbx_PDB_ins_code",
+    "Cartn_x",
+    "Cartn_y",
+    "Cartn_z",
+    "occupancy",
+    "B_iso_or_equiv",
+    "auth_seq_id",
+    "auth_comp_id",
+    "auth_asym_id",
+    "auth_atom_id",
+    "pdbx_PDB_model_num",
+)
+# Values of the _atom_site columns that rebuilt atoms do not carry.
+ATOM_SITE_DEFAULTS = {
+    "groups": b"ATOM",
+    "altlocs": b"",
+    "icodes": b"?",
+    "occupancies": b"1.00",
+    "bfactors": b"0.00",
+}
+
+
+def is_mmcif_path(filename):
+    """
+    Tells whether a file name has an mmCIF suffix, compression suffixes aside.
+    """
+    name = Path(filename).name
+    name = name[:len(name) - len(compression_suffix(name))]
+    return Path(name).suffix.lower() in MMCIF_SUFFIXES
+
+
+def is_mmcif(filename):
+    """
+    Tells whether a file holds mmCIF data, by suffix or by a leading ``data_`` block.
+    """
+    if is_mmcif_path(filename):
+        return True
+    with open_input(filename) as stream:
+        head = stream.read(4096)
+    for line in head.splitlines():
+        line = line.strip()
+        if line and not line.startswith(b"#"):
+            return line.startswith(b"data_")
+    return False
+
+
+def read_mmcif_table(filename, all_chains=False):
+    """
+    Reads the _atom_site loop of an mmCIF file into an AtomTable.
+
+    The loop is tokenized as a whole: token boundaries are found with NumPy and
+    each needed column is gathered straight into an array, without building
+    per-atom records. Only the first model and the first alternate location
+    (' ' or 'A') are kept, as for PDB files. mmCIF has no TER records, so
+    unless ``all_chains`` only the records up to the first chain change are
+    kept, which is where a PDB file would be terminated. Author chain IDs longer
+    than one character are kept whole.
+    """
+    with open_input(filename) as stream:
+        return parse_mmcif_bytes(stream.read(), all_chains=all_chains)
+
+
+def parse_mmcif_bytes(data, all_chains=False):
+    """
+    Decodes the first model of the _atom_site loop of an in-memory mmCIF text.
+    """
+    table, models = _parse_atom_site(data)
+    if len(table):
+        table = table.take(models == models[0])
+    return table if all_chains else _first_chain(table)
+
+
+def iter_mmcif_tables(filename, all_chains=False):
+    """
+    Yields (model number, AtomTable) pairs for the models of an mmCIF file.
+    """
+    with open_input(filename) as stream:
+        table, models = _parse_atom_site(stream.read())
+    bounds = (np.flatnonzero(np.diff(models)) + 1).tolist()
+    for lo, hi in zip([0] + bounds, bounds + [len(models)]):
+        model = table.take(slice(lo, hi))
+        yield int(models[lo]), model if all_chains else _first_chain(model)
+
+
+def _first_chain(table):
+    """
+    Returns the records of the first chain of a table.
+    """
+    starts = table.chain_starts()
+    return table if len(starts) < 2 else table.take(slice(0, starts[1]))
+
+
+def _parse_atom_site(data):
+    """
+    Decodes every record of the _atom_site loop.
+
+    Returns the AtomTable and an array with the model number of each record.
+    """
+    items, body = _atom_site_loop(data)
+    if not items:
+        return AtomTable.empty(), np.zeros(0, dtype=np.int64)
+
+    buf, starts, ends = _tokenize(body)
+    if len(starts) % len(items):
+        raise ValueError("The _atom_site loop does not hold a whole number of rows.")
+    # One contiguous row of offsets per item, so each column is gathered quickly.
+    starts = starts.reshape(-1, len(items)).T.copy()
+    ends = ends.reshape(-1, len(items)).T.copy()
+    nrows = starts.shape[1]
+
+    def column(*names, default=b" "):
+        for name in names:
+            if name in items:
+                k = items.index(name)
+                values = np.strings.strip(_tokens(buf, starts[k], ends[k]))
+                null = (values == NULL_VALUES[0]) | (values == NULL_VALUES[1])
+                return np.where(null, default, values)
+        return np.full(nrows, default)
+
+    altloc = column("label_alt_id").astype("S1")
+    coords = np.empty((nrows, 3), dtype=np.float64)
+    for axis, name in enumerate(("Cartn_x", "Cartn_y", "Cartn_z")):
+        coords[:, axis] = column(name).astype(np.float64)
+
+    table = AtomTable(
+        hetatm=column("group_PDB", default=b"ATOM") == b"HETATM",
+        serial=column("id", default=b"0").astype(np.int64),
+        name=column("auth_atom_id", "label_atom_id"),
+        altloc=altloc,
+        resname=column("auth_comp_id", "label_comp_id"),
+        chain=column("auth_asym_id", "label_asym_id"),
+        resnum=column("auth_seq_id", "label_seq_id", default=b"0").astype(np.int64),
+        icode=column("pdbx_PDB_ins_code").astype("S1"),
+        segment=np.zeros(nrows, dtype=np.int64),
+        coords=coords,
+    )
+    models = column("pdbx_PDB_model_num", default=b"1").astype(np.int64)
+    keep = (altloc == b" ") | (altloc == b"A")
+    return table.take(keep), models[keep]
+
+
+def _atom_site_loop(data):
+    """
+    Returns the item names and the row text of the _atom_site loop, if any.
+    """
+    match = re.search(rb"^loop_\s*\n\s*_atom_site\.", data, re.MULTILINE)
+    if match is None:
+        return [], None
+    pos = match.start() + len(b"loop_")
+    items = []
+    while True:
+        item = ATOM_SITE_ITEM.match(data, pos)
+        if item is None:
+            break
+        items.append(item.group(1).decode())
+        pos = item.end()
+    # Each search stops at the earliest end found so far, usually the "#" line.
+    end = len(data)
+    for mark in LOOP_END:
+        found = data.find(mark, pos - 1, end)
+        if found >= 0:
+            end = found + 1
+    return items, data[pos:end]
+
+
+def _tokenize(body):
+    """
+    Splits the rows of a loop into whitespace-separated tokens.
+
+    Returns a byte array of the text and the start and end offsets of its
+    tokens. Every token is followed by whitespace in the array: a space is
+    appended, and when the text holds quotes the closing quote of each quoted
+    token is blanked, so the offsets exclude the quotes.
+    """
+    buf = np.frombuffer(body + b" ", dtype=np.uint8)
+    if b"'" in body or b'"' in body:
+        buf = buf.copy()
+        matches = list(QUOTED_TOKEN.finditer(body))
+        spans = np.array(
+            [match.span(match.lastindex) for match in matches], dtype=np.int64
+        ).reshape(-1, 2)
+        quoted = np.array([match.lastindex < 3 for match in matches], dtype=bool)
+        buf[spans[quoted, 1]] = SPACE
+        return buf, spans[:, 0], spans[:, 1]
+    # Bytes at or below the space count as whitespace between mmCIF tokens.
+    solid = np.zeros(len(buf) + 1, dtype=np.int8)
+    solid[1:] = buf > SPACE
+    edges = np.diff(solid)
+    return buf, np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _tokens(buf, starts, ends):
+    """
+    Gathers the given tokens into an array of fixed-width byte strings.
+
+    Bytes past the end of a shorter token repeat the whitespace that follows it,
+    which the caller strips.
+    """
+    width = int((ends - starts).max(initial=1))
+    rows = np.empty((len(starts), width), dtype=np.uint8)
+    for k in range(width):
+        rows[:, k] = buf[np.minimum(starts + k, ends)]
+    return field(rows, 0, width)
+
+
+def write_atom_site(f, models, name):
+    """
+    Writes an mmCIF data block with an _atom_site loop to an open binary file.
+
+    ``models`` yields (model number, chunks) pairs, where chunks are the atom
+    columns produced for the PDB writer (see pdb_writer._atom_chunks). Rows are
+    assembled in a byte matrix a chunk at a time, as PDB records are, with each
+    value padded to the widest one of its column in the chunk. Columns a chunk
+    lacks, or leaves blank, take their value from ATOM_SITE_DEFAULTS; blank
+    alternate locations are written as ".".
+    """
+    f.write(f"data_{_value(name or 'pulchra')}\n#\nloop_\n".encode())
+    f.write("".join(f"_atom_site.{item}\n" for item in ATOM_SITE_ITEMS).encode())
+    for number, chunks in models:
+        for chunk in chunks:
+            f.write(_atom_site_rows(number, chunk))
+    f.write(b"#\n")
+
+
+def _atom_site_rows(number, chunk):
+    """
+    Formats the _atom_site rows of one chunk of atom columns into bytes.
+    """
+    n = len(chunk["serials"])
+    atoms = _values(chunk["names"])
+    resnames = _values(chunk["resnames"])
+    chains = _values(chunk["chains"])
+    seqs = _integers(chunk["seqs"]) if "seqs" in chunk else _text(np.full(n, b"."))
+    columns = [
+        _text(_optional(chunk, "groups", n)),
+        _integers(chunk["serials"]),
+        _text(np.strings.strip(chunk["elements"])),
+        _text(atoms),
+        _text(_values(_optional(chunk, "altlocs", n))),
+        _text(resnames),
+        _text(chains),
+        seqs,
+        _text(_optional(chunk, "icodes", n)),
+        *(_decimals(chunk["coords"][:, axis]) for axis in range(3)),
+        _text(_optional(chunk, "occupancies", n)),
+        _text(_optional(chunk, "bfactors", n)),
+        _integers(chunk["resnums"]),
+        _text(resnames),
+        _text(chains),
+        _text(atoms),
+        _integers(np.full(n, number)),
+    ]
+    space = np.full((n, 1), SPACE, dtype=np.uint8)
+    parts = []
+    for column in columns:
+        parts += [column, space]
+    parts[-1] = np.full((n, 1), ord("\n"), dtype=np.uint8)
+    return np.hstack(parts).tobytes()
+
+
+def _optional(chunk, key, n):
+    """
+    Returns a column of a chunk, with missing or blank values set to ATOM_SITE_DEFAULTS.
+    """
+    default = ATOM_SITE_DEFAULTS[key]
+    if key not in chunk:
+        return np.full(n, default)
+    return np.where(chunk[key] == b"", default, chunk[key])
+
+
+def _values(values):
+    """
+    Formats an array of byte strings as mmCIF values, quoting each distinct one once.
+    """
+    unique, inverse = np.unique(values, return_inverse=True)
+    quoted = [_value(value.decode()).encode() for value in unique.tolist()]
+    return np.array(quoted, dtype=bytes)[inverse] if quoted else np.array([], dtype="S1")
+
+
+def _text(values):
+    """
+    Returns byte strings left-aligned in a byte matrix as wide as the longest one.
+    """
+    return bytes_matrix(values, max(values.dtype.itemsize, 1))
+
+
+def _integers(values):
+    """
+    Returns integers right-aligned in a byte matrix as wide as the widest one.
+    """
+    width = max((len(str(value)) for value in (values.min(initial=0), values.max(initial=0))))
+    rows = np.empty((len(values), width), dtype=np.uint8)
+    put_int(rows, values, 0, width)
+    return rows
+
+
+def _decimals(values):
+    """
+    Returns numbers with three decimals right-aligned in a byte matrix as wide as the widest one.
+    """
+    finite = values[np.isfinite(values)]
+    width = len(f"{-np.abs(finite).max(initial=0.0):.3f}")
+    rows = np.empty((len(values), width), dtype=np.uint8)
+    # Columns wider than 16 only hold values past the reach of put_decimal.
+    slow = put_decimal(rows, values, 0, width) if width <= 16 else np.ones(len(values), bool)
+    for i in np.flatnonzero(slow).tolist():
+        rows[i] = np.frombuffer(f"{values[i]:{width}.3f}".encode(), dtype=np.uint8)
+    return rows
+
+
+def _value(text):
+    """
+    Formats a string as an mmCIF value, quoting it when needed.
+    """
+    text = text.strip()
+    if not text:
+        return "."
+    if "'" in text:
+        return f'"{text}"'
+    if " " in text or text[0] in "_#$;[]" or text in (".", "?"):
+        return f"'{text}'"
+    return text
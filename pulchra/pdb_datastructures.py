@@ -1,62 +1,770 @@
+import numpy as np
+
+from .data import AA_MAP_3_TO_NUM
+
+# Output rank of the backbone atoms; every other atom ranks after them.
+BACKBONE_ORDER = {"N": 0, "CA": 1, "C": 2, "O": 3}
+OTHER_RANK = len(BACKBONE_ORDER)
+# Residue type of names missing from AA_MAP_3_TO_NUM.
+UNK_TYPE = AA_MAP_3_TO_NUM["UNK"]
+
+
+def encode_residue_names(names):
+    """
+    Returns the residue type codes and the protein mask of an array of residue names.
+
+    Codes come from data.AA_MAP_3_TO_NUM, non-canonical aliases such as MSE and
+    SEP included; other names (ligands, waters, ions) get UNK and are not protein.
+    Each distinct name is looked up once.
+    """
+    unique, inverse = np.unique(np.asarray(names), return_inverse=True)
+    codes = [AA_MAP_3_TO_NUM.get(name) for name in unique.astype(str).tolist()]
+    types = np.array([UNK_TYPE if code is None else code for code in codes], dtype=np.int64)
+    protein = np.array([code is not None for code in codes], dtype=bool)
+    inverse = inverse.ravel()
+    return types[inverse], protein[inverse]
+
+
 class Atom:
+    """
+    A view of one row of the atom buffers of a Molecule.
+
+    Constructing an Atom appends a row to the buffers of ``res.molecule``; the
+    attributes then read and write that row, so changes are seen by code working
+    on the arrays directly and vice versa. An Atom only stores its residue and
+    row index; ``locnum`` is accepted for compatibility and ignored.
+    """
+
+    __slots__ = ("res", "index")
+
     def __init__(self, x, y, z, name, num, locnum, flag, cispro, res):
-        self.x = x
-        self.y = y
-        self.z = z
-        self.name = name
-        self.num = num
-        self.locnum = locnum
-        self.flag = flag
-        self.cispro = cispro
         self.res = res
-        self.prev = None
-        self.next = None
+        self.index = res.molecule.add_atom_row(x, y, z, name, num, flag, cispro)
+
+    @classmethod
+    def view(cls, res, index):
+        """Returns the Atom of an existing buffer row, without allocating one."""
+        atom = cls.__new__(cls)
+        atom.res = res
+        atom.index = index
+        return atom
+
+    @property
+    def x(self):
+        """The x coordinate of the atom."""
+        return self.res.molecule.atom_coords[self.index, 0]
+
+    @x.setter
+    def x(self, value):
+        self.res.molecule.own_buffers().atom_coords[self.index, 0] = value
+
+    @property
+    def y(self):
+        """The y coordinate of the atom."""
+        return self.res.molecule.atom_coords[self.index, 1]
+
+    @y.setter
+    def y(self, value):
+        self.res.molecule.own_buffers().atom_coords[self.index, 1] = value
+
+    @property
+    def z(self):
+        """The z coordinate of the atom."""
+        return self.res.molecule.atom_coords[self.index, 2]
+
+    @z.setter
+    def z(self, value):
+        self.res.molecule.own_buffers().atom_coords[self.index, 2] = value
+
+    @property
+    def name(self):
+        """The atom name, looked up from its code."""
+        molecule = self.res.molecule
+        return molecule.atom_names[molecule.atom_name_codes[self.index]]
+
+    @property
+    def num(self):
+        """The atom serial number."""
+        return int(self.res.molecule.atom_serials[self.index])
+
+    @num.setter
+    def num(self, value):
+        self.res.molecule.own_buffers().atom_serials[self.index] = value
+
+    @property
+    def flag(self):
+        """The atom flags."""
+        return int(self.res.molecule.atom_flags[self.index])
+
+    @flag.setter
+    def flag(self, value):
+        self.res.molecule.own_buffers().atom_flags[self.index] = value
+
+    @property
+    def cispro(self):
+        """The cis-proline flag of the atom."""
+        return bool(self.res.molecule.atom_cispro[self.index])
+
+    @cispro.setter
+    def cispro(self, value):
+        self.res.molecule.own_buffers().atom_cispro[self.index] = value
 
 class Residue:
-    def __init__(self, num, locnum, natoms, type, pdbsg, protein, name, chain):
+    """
+    A residue of a Molecule: its descriptors plus the Atom views of its atoms.
+
+    ``molecule`` is the Molecule holding the atom buffers; a Residue built
+    without one gets a Molecule of its own. ``natoms`` is the length of
+    ``atoms``; the constructor argument is accepted for compatibility and ignored.
+
+    Atoms added with add_atom are kept in output order, N, CA, C, O and then
+    the others as added, and indexed by name so find_atom does not scan the list.
+    """
+
+    __slots__ = (
+        "num", "locnum", "type", "pdbsg", "protein", "name", "chain", "molecule", "atoms",
+        "_lookup", "_indexed",
+    )
+
+    def __init__(self, num, locnum, natoms, type, pdbsg, protein, name, chain, molecule=None):
         self.num = num
         self.locnum = locnum
-        self.natoms = natoms
         self.type = type
         self.pdbsg = pdbsg
         self.protein = protein
         self.name = name
         self.chain = chain
+        self.molecule = Molecule(name) if molecule is None else molecule
         self.atoms = []
-        self.sgx = 0.0
-        self.sgy = 0.0
-        self.sgz = 0.0
-        self.cmx = 0.0
-        self.cmy = 0.0
-        self.cmz = 0.0
-        self.prev = None
-        self.next = None
+        self._lookup = None
+        self._indexed = -1
 
-    def add_or_replace_atom(self, name, x, y, z, flag):
-        for atom in self.atoms:
-            if atom.name == name:
-                atom.x = x
-                atom.y = y
-                atom.z = z
-                atom.flag |= flag
-                return
-
-        new_atom = Atom(x, y, z, name, 0, 0, flag, False, self)
-
-        if name == "N":
-            self.atoms.insert(0, new_atom)
+    @property
+    def natoms(self):
+        """The number of atoms of the residue."""
+        return len(self.atoms)
+
+    def find_atom(self, name):
+        """Returns the first atom called ``name``, or None."""
+        if self._indexed != len(self.atoms):
+            # Built on first use, and again if atoms were put in the list directly.
+            self._lookup = {}
+            for atom in reversed(self.atoms):
+                self._lookup[atom.name] = atom
+            self._indexed = len(self.atoms)
+        return self._lookup.get(name)
+
+    def add_atom(self, atom):
+        """
+        Adds an atom at its place in output order and indexes it by name.
+
+        Backbone atoms go after the backbone atoms of lower or equal rank, so
+        only the few atoms at the front of the list are looked at.
+        """
+        name = atom.name
+        self.find_atom(name)
+        rank = BACKBONE_ORDER.get(name, OTHER_RANK)
+        if rank == OTHER_RANK:
+            self.atoms.append(atom)
         else:
-            self.atoms.append(new_atom)
-        self.natoms += 1
+            pos = 0
+            atoms = self.atoms
+            while pos < len(atoms) and BACKBONE_ORDER.get(atoms[pos].name, OTHER_RANK) <= rank:
+                pos += 1
+            self.atoms.insert(pos, atom)
+        self._lookup.setdefault(name, atom)
+        self._indexed += 1
+
+    def atom_indices(self):
+        """Returns the buffer rows of the residue's atoms, in order."""
+        return np.array([atom.index for atom in self.atoms], dtype=np.intp)
+
+    def add_or_replace_atom(self, name, x, y, z, flag):
+        atom = self.find_atom(name)
+        if atom is not None:
+            atom.x = x
+            atom.y = y
+            atom.z = z
+            atom.flag |= flag
+            return
+
+        self.add_atom(Atom(x, y, z, name, 0, 0, flag, False, self))
 
 class Molecule:
-    def __init__(self, name):
+    """
+    A chain of residues whose atoms are stored as a struct of arrays.
+
+    ``coords`` is an (natoms, 3) float array holding every atom's coordinates;
+    ``name_codes`` indexes ``atom_names``, and ``serials``, ``flags`` and
+    ``cispro`` hold the other per-atom fields. The buffers have spare capacity
+    so rebuilt atoms are appended without copying; ``coords`` and the other
+    properties are views of their first ``natoms`` rows. Residues list Atom
+    views of their rows, which need not be contiguous: residue_offsets gives
+    the atoms grouped by residue.
+
+    fork returns a copy that shares the buffers with the molecule, copy on
+    write: the shared buffers are read-only, and the first change made through
+    an Atom or add_atom_row gives the changed molecule buffers of its own. Code
+    writing to the arrays directly calls own_buffers first.
+    """
+
+    BUFFERS = ("atom_coords", "atom_name_codes", "atom_serials", "atom_flags", "atom_cispro")
+
+    __slots__ = (
+        "name", "residues", "nres", "model", "natoms", "atom_names", "_name_lookup",
+        "_shared",
+    ) + BUFFERS
+
+    def __init__(self, name, capacity=0, dtype=np.float64):
         self.name = name
         self.residues = []
         self.nres = 0
-        self.r14 = None
-        self.seq = None
-        self.contacts = None
-        self.cutoffs = None
-        self.prev = None
-        self.next = None
+        self.model = None
+        self.natoms = 0
+        self.atom_names = []
+        self._name_lookup = {}
+        self._allocate(capacity, dtype)
+
+    def _allocate(self, capacity, dtype):
+        """Allocates empty atom buffers with room for ``capacity`` atoms."""
+        self.atom_coords = np.zeros((capacity, 3), dtype=dtype)
+        self.atom_name_codes = np.zeros(capacity, dtype=np.int32)
+        self.atom_serials = np.zeros(capacity, dtype=np.int64)
+        self.atom_flags = np.zeros(capacity, dtype=np.int32)
+        self.atom_cispro = np.zeros(capacity, dtype=bool)
+        self._shared = False
+
+    @property
+    def coords(self):
+        """The (natoms, 3) coordinates of the atoms."""
+        return self.atom_coords[:self.natoms]
+
+    @property
+    def dtype(self):
+        """The float type the coordinates are stored and rebuilt in."""
+        return self.atom_coords.dtype
+
+    @property
+    def name_codes(self):
+        """The name code of each atom."""
+        return self.atom_name_codes[:self.natoms]
+
+    @property
+    def serials(self):
+        """The serial number of each atom."""
+        return self.atom_serials[:self.natoms]
+
+    @property
+    def flags(self):
+        """The flags of each atom."""
+        return self.atom_flags[:self.natoms]
+
+    @property
+    def cispro(self):
+        """The cis-proline flag of each atom."""
+        return self.atom_cispro[:self.natoms]
+
+    def name_code(self, name):
+        """Returns the code of an atom name, adding it to ``atom_names`` if new."""
+        code = self._name_lookup.get(name)
+        if code is None:
+            code = self._name_lookup[name] = len(self.atom_names)
+            self.atom_names.append(name)
+        return code
+
+    def reserve(self, capacity):
+        """Grows the atom buffers, keeping their contents, to hold ``capacity`` atoms."""
+        if capacity <= len(self.atom_coords):
+            return
+        old = [getattr(self, field) for field in self.BUFFERS]
+        self._allocate(capacity, self.dtype)
+        for source, field in zip(old, self.BUFFERS):
+            getattr(self, field)[:self.natoms] = source[:self.natoms]
+
+    def own_buffers(self):
+        """
+        Copies the atom buffers if they are shared with a fork, and returns the molecule.
+        """
+        if self._shared:
+            for field in self.BUFFERS:
+                setattr(self, field, np.array(getattr(self, field)))
+            self._shared = False
+        return self
+
+    def set_precision(self, dtype):
+        """
+        Converts the coordinates to another float type, such as np.float32.
+
+        The reconstruction stages compute in the float type of the coordinates,
+        so single precision halves the memory of the coordinates and of the
+        arrays derived from them, at the cost of accuracy in the last printed
+        digit (see README).
+        """
+        self.atom_coords = self.atom_coords.astype(dtype, copy=False)
+
+    def fork(self, name=None):
+        """
+        Returns a copy of the molecule whose atom buffers are shared until written.
+
+        The residues and their Atom views are new objects; each molecule copies
+        the atom buffers only when it is first changed, so a parsed molecule can
+        feed several reconstructions without being parsed again.
+        """
+        fork = Molecule(self.name if name is None else name)
+        fork.model = self.model
+        fork.natoms = self.natoms
+        fork.atom_names = list(self.atom_names)
+        fork._name_lookup = dict(self._name_lookup)
+        for field in self.BUFFERS:
+            shared = getattr(self, field).view()
+            shared.flags.writeable = False
+            setattr(self, field, shared)
+            setattr(fork, field, shared)
+        self._shared = fork._shared = True
+
+        view = Atom.view
+        for res in self.residues:
+            copy = Residue(
+                res.num, res.locnum, 0, res.type, res.pdbsg, res.protein, res.name, res.chain,
+                fork,
+            )
+            copy.atoms = [view(copy, atom.index) for atom in res.atoms]
+            fork.residues.append(copy)
+        fork.nres = self.nres
+        return fork
+
+    def fill_atoms(self, coords, names, serials):
+        """
+        Replaces the atoms of the buffers with the given columns, in bulk.
+
+        ``names`` is an array of atom names, as str or bytes.
+        """
+        unique, codes = np.unique(names, return_inverse=True)
+        self.atom_names = unique.astype(str).tolist()
+        self._name_lookup = {name: code for code, name in enumerate(self.atom_names)}
+        self.natoms = 0
+        self._allocate(len(coords), self.dtype)
+        self.atom_coords[:] = coords
+        self.atom_name_codes[:] = codes.ravel()
+        self.atom_serials[:] = serials
+        self.natoms = len(coords)
+
+    def add_atom_row(self, x, y, z, name, num=0, flag=0, cispro=False):
+        """Appends an atom to the buffers and returns its row index."""
+        self.own_buffers()
+        index = self.natoms
+        if index == len(self.atom_coords):
+            self.reserve(max(16, 2 * index))
+        self.atom_coords[index] = (x, y, z)
+        self.atom_name_codes[index] = self.name_code(name)
+        self.atom_serials[index] = num
+        self.atom_flags[index] = flag
+        self.atom_cispro[index] = cispro
+        self.natoms += 1
+        return index
+
+    def atom_index(self, name):
+        """Returns the buffer rows of the atoms called ``name``, in residue order."""
+        code = self._name_lookup.get(name)
+        order, _ = self.residue_offsets()
+        if code is None:
+            return order[:0]
+        return order[self.atom_name_codes[order] == code]
+
+    def to_buffers(self):
+        """
+        Returns the molecule as a dict of NumPy arrays, for transfer to other processes.
+
+        The atom fields are the used rows of the atom buffers, the residues are
+        columns plus the (order, offsets) tables of residue_offsets, and names
+        are fixed-width unicode arrays, so the whole molecule is a handful of
+        flat buffers rather than a graph of objects. The arrays may be views of
+        the molecule's buffers. from_buffers rebuilds an equal molecule.
+        """
+        order, offsets = self.residue_offsets()
+        residues = self.residues
+        return {
+            "name": np.array([] if self.name is None else [self.name], dtype=str),
+            "model": np.array([] if self.model is None else [self.model], dtype=np.int64),
+            "atom_names": np.array(self.atom_names, dtype=str),
+            "coords": self.coords,
+            "name_codes": self.name_codes,
+            "serials": self.serials,
+            "flags": self.flags,
+            "cispro": self.cispro,
+            "order": order,
+            "offsets": offsets,
+            "res_num": np.array([res.num for res in residues], dtype=np.int64),
+            "res_locnum": np.array([res.locnum for res in residues], dtype=np.int64),
+            "res_type": np.array([res.type for res in residues], dtype=np.int64),
+            "res_pdbsg": np.array([res.pdbsg for res in residues], dtype=bool),
+            "res_protein": np.array([res.protein for res in residues], dtype=bool),
+            "res_name": np.array([res.name for res in residues], dtype=str),
+            "res_chain": np.array([res.chain for res in residues], dtype=str),
+        }
+
+    @classmethod
+    def from_buffers(cls, buffers):
+        """
+        Builds a Molecule from the arrays of to_buffers.
+
+        The arrays are copied, so they may live in memory that is released
+        afterwards, such as a shared memory block.
+        """
+        name = buffers["name"].tolist()
+        model = buffers["model"].tolist()
+        coords = buffers["coords"]
+        molecule = cls(name[0] if name else None, dtype=coords.dtype)
+        molecule.model = model[0] if model else None
+        molecule.atom_names = buffers["atom_names"].tolist()
+        molecule._name_lookup = {name: code for code, name in enumerate(molecule.atom_names)}
+        molecule._allocate(len(coords), coords.dtype)
+        for field, key in zip(cls.BUFFERS, ("coords", "name_codes", "serials", "flags", "cispro")):
+            getattr(molecule, field)[:] = buffers[key]
+        molecule.natoms = len(coords)
+
+        order = buffers["order"].tolist()
+        offsets = buffers["offsets"].tolist()
+        columns = zip(
+            buffers["res_num"].tolist(), buffers["res_locnum"].tolist(),
+            buffers["res_type"].tolist(), buffers["res_pdbsg"].tolist(),
+            buffers["res_protein"].tolist(), buffers["res_name"].tolist(),
+            buffers["res_chain"].tolist(), offsets[:-1], offsets[1:],
+        )
+        view = Atom.view
+        for num, locnum, type, pdbsg, protein, res_name, chain, lo, hi in columns:
+            res = Residue(num, locnum, 0, type, pdbsg, protein, res_name, chain, molecule)
+            res.atoms = [view(res, index) for index in order[lo:hi]]
+            molecule.residues.append(res)
+        molecule.nres = len(molecule.residues)
+        return molecule
+
+    def __reduce__(self):
+        """Pickles the molecule as flat arrays, not as the graph of residues and atom views."""
+        return Molecule.from_buffers, (self.to_buffers(),)
+
+    def encode_residues(self):
+        """
+        Sets the type and protein flag of every residue from its name.
+
+        Returns the residue type codes and protein mask, as encode_residue_names.
+        """
+        types, protein = encode_residue_names([res.name for res in self.residues])
+        for res, code, is_protein in zip(self.residues, types.tolist(), protein.tolist()):
+            res.type = code
+            res.protein = is_protein
+        return types, protein
+
+    def residue_offsets(self):
+        """
+        Returns the atoms grouped by residue as (order, offsets) integer tables.
+
+        ``order[offsets[i]:offsets[i + 1]]`` are the buffer rows of residue ``i``.
+        """
+        sizes = [len(res.atoms) for res in self.residues]
+        offsets = np.zeros(len(sizes) + 1, dtype=np.intp)
+        np.cumsum(sizes, out=offsets[1:])
+        order = np.array(
+            [atom.index for res in self.residues for atom in res.atoms], dtype=np.intp
+        )
+        return order, offsets
+
+class AtomTable:
+    """
+    Column-oriented ATOM/HETATM records, as decoded from a structure file.
+
+    Atom and residue names are byte strings stripped of their padding, the
+    single-character columns (altloc, chain, insertion code) are kept verbatim,
+    numeric fields are integer arrays and the coordinates form an (n, 3) float array.
+    ``segment`` counts the TER records that precede each record.
+
+    ``passthrough`` is None, or the RawRecords of the records that were set
+    aside undecoded when the table was read (see pdb_parser.read_pdb_table).
+    It is joined by concatenate but not carried over by take.
+    """
+
+    FIELDS = (
+        "hetatm", "serial", "name", "altloc", "resname", "chain", "resnum", "icode",
+        "segment", "coords",
+    )
+
+    def __init__(self, hetatm, serial, name, altloc, resname, chain, resnum, icode, segment,
+                 coords, passthrough=None):
+        self.hetatm = hetatm
+        self.serial = serial
+        self.name = name
+        self.altloc = altloc
+        self.resname = resname
+        self.chain = chain
+        self.resnum = resnum
+        self.icode = icode
+        self.segment = segment
+        self.coords = coords
+        self.passthrough = passthrough
+
+    def __len__(self):
+        """Returns the number of records."""
+        return len(self.serial)
+
+    @classmethod
+    def allocate(cls, n):
+        """Returns a zero-filled table with room for ``n`` records."""
+        return cls(
+            hetatm=np.zeros(n, dtype=bool),
+            serial=np.zeros(n, dtype=np.int64),
+            name=np.zeros(n, dtype="S4"),
+            altloc=np.zeros(n, dtype="S1"),
+            resname=np.zeros(n, dtype="S3"),
+            chain=np.zeros(n, dtype="S1"),
+            resnum=np.zeros(n, dtype=np.int64),
+            icode=np.zeros(n, dtype="S1"),
+            segment=np.zeros(n, dtype=np.int64),
+            coords=np.zeros((n, 3), dtype=np.float64),
+        )
+
+    @classmethod
+    def empty(cls):
+        """Returns a table with no records."""
+        return cls.allocate(0)
+
+    @classmethod
+    def concatenate(cls, tables):
+        """Joins several tables, in order, into one."""
+        tables = list(tables)
+        if not tables:
+            return cls.empty()
+        if len(tables) == 1:
+            return tables[0]
+        raw = [table.passthrough for table in tables if table.passthrough is not None]
+        return cls(
+            passthrough=RawRecords.concatenate(raw) if raw else None,
+            **{
+                field: np.concatenate([getattr(table, field) for table in tables])
+                for field in cls.FIELDS
+            },
+        )
+
+    def assign(self, index, other):
+        """Copies the records of ``other`` into the rows selected by ``index``."""
+        for field in self.FIELDS:
+            getattr(self, field)[index] = getattr(other, field)
+
+    def take(self, index):
+        """Returns the subset of records selected by an index or boolean mask."""
+        return AtomTable(**{field: getattr(self, field)[index] for field in self.FIELDS})
+
+    def residue_starts(self):
+        """
+        Returns the record indices at which a new residue begins.
+
+        Like the line-based reader, a residue starts whenever the residue number
+        differs from the one on the previous record.
+        """
+        if not len(self):
+            return np.zeros(0, dtype=np.intp)
+        changes = np.flatnonzero(self.resnum[1:] != self.resnum[:-1]) + 1
+        return np.concatenate(([0], changes))
+
+    def chain_starts(self):
+        """
+        Returns the record indices at which a new chain begins.
+
+        A chain ends at a TER record or wherever the chain identifier changes.
+        """
+        if not len(self):
+            return np.zeros(0, dtype=np.intp)
+        changes = np.flatnonzero(
+            (self.chain[1:] != self.chain[:-1]) | (self.segment[1:] != self.segment[:-1])
+        ) + 1
+        return np.concatenate(([0], changes))
+
+    def split_chains(self):
+        """Returns one table per chain, in file order."""
+        bounds = self.chain_starts().tolist() + [len(self)]
+        return [self.take(slice(lo, hi)) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+    def c_alpha(self):
+        """
+        Returns a mask of the C-alpha records: atoms named CA, except calcium ions.
+        """
+        return (self.name == b"CA") & (self.resname != b"CA")
+
+    def to_molecule(self, name):
+        """
+        Builds a Molecule with one Residue per residue run and one Atom per record.
+
+        The atom buffers of the molecule are filled from the columns in bulk,
+        with the atoms of each residue in output order (see Residue).
+        """
+        starts = self.residue_starts().tolist()
+        ends = starts[1:] + [len(self)]
+        table = self._output_order(starts)
+
+        molecule = Molecule(name)
+        molecule.fill_atoms(table.coords, table.name, table.serial)
+
+        res_names = self.resname[starts].astype(str).tolist()
+        chains = self.chain[starts].astype(str).tolist()
+        resnums = self.resnum[starts].tolist()
+        types, protein = encode_residue_names(self.resname[starts])
+        types, protein = types.tolist(), protein.tolist()
+        view = Atom.view
+
+        for locnum, (start, end) in enumerate(zip(starts, ends), start=1):
+            res = Residue(
+                num=resnums[locnum - 1],
+                locnum=locnum,
+                natoms=end - start,
+                type=types[locnum - 1],
+                pdbsg=False,
+                protein=protein[locnum - 1],
+                name=res_names[locnum - 1],
+                chain=chains[locnum - 1],
+                molecule=molecule,
+            )
+            res.atoms = [view(res, index) for index in range(start, end)]
+            molecule.residues.append(res)
+        molecule.nres = len(molecule.residues)
+        return molecule
+
+    def _output_order(self, starts):
+        """
+        Returns the table with the backbone atoms of each residue moved to its front.
+        """
+        rank = np.full(len(self), OTHER_RANK, dtype=np.int8)
+        for name, value in BACKBONE_ORDER.items():
+            rank[self.name == name.encode()] = value
+        residue = np.zeros(len(self), dtype=np.intp)
+        residue[starts[1:]] = 1
+        residue = np.cumsum(residue)
+        order = np.lexsort((rank, residue))
+        if np.array_equal(order, np.arange(len(self))):
+            return self
+        return self.take(order)
+
+
+class RawRecords:
+    """
+    Records kept verbatim, as line offsets into the buffer they were read from.
+
+    ``data`` is a uint8 array, usually a view of the input text, and ``starts``
+    and ``ends`` the offsets of each line without its terminator. Nothing is
+    decoded or copied until the lines are written; compact copies the lines
+    into a buffer of their own when the input buffer should not be kept alive.
+    """
+
+    def __init__(self, data, starts, ends):
+        self.data = data
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        """Returns the number of records."""
+        return len(self.starts)
+
+    @classmethod
+    def empty(cls):
+        """Returns a set of no records."""
+        return cls(np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.int64),
+                   np.zeros(0, dtype=np.int64))
+
+    @classmethod
+    def concatenate(cls, records):
+        """Joins several sets of records, in order, into one compact set."""
+        records = list(records)
+        if len(records) == 1:
+            return records[0]
+        return cls.from_bytes(b"".join(raw.tobytes() for raw in records))
+
+    @classmethod
+    def from_bytes(cls, text):
+        """Returns the records of a text made of whole lines, each ending with a newline."""
+        data = np.frombuffer(text, dtype=np.uint8)
+        ends = np.flatnonzero(data == ord("\n")).astype(np.int64)
+        starts = np.zeros(len(ends), dtype=np.int64)
+        starts[1:] = ends[:-1] + 1
+        return cls(data, starts, ends)
+
+    def compact(self):
+        """Returns the records in a buffer holding only their lines."""
+        return RawRecords.from_bytes(self.tobytes())
+
+    def tobytes(self):
+        """Returns the records as text, one newline-terminated line each."""
+        data = self.data
+        return b"".join(
+            data[lo:hi].tobytes() + b"\n"
+            for lo, hi in zip(self.starts.tolist(), self.ends.tolist())
+        )
+
+class CATrace:
+    """
+    The C-alpha trace of a chain: one row per residue, as needed for reconstruction.
+
+    ``coords`` is a contiguous (n, 3) float array. ``types`` holds residue type
+    codes from encode_residue_names, with unknown residue names mapped to UNK;
+    ``resname`` and ``chain`` are byte strings and ``resnum`` and ``segment``
+    integer arrays, as in AtomTable. ``name`` and ``model`` are passed on to the
+    Molecule built by to_molecule.
+    """
+
+    FIELDS = ("coords", "types", "resname", "chain", "resnum", "segment")
+
+    def __init__(self, coords, types, resname, chain, resnum, segment, name=None):
+        self.coords = coords
+        self.types = types
+        self.resname = resname
+        self.chain = chain
+        self.resnum = resnum
+        self.segment = segment
+        self.name = name
+        self.model = None
+
+    def __len__(self):
+        """Returns the number of residues."""
+        return len(self.coords)
+
+    @property
+    def dtype(self):
+        """The float type of the coordinates."""
+        return self.coords.dtype
+
+    def set_precision(self, dtype):
+        """Converts the coordinates to another float type, as Molecule.set_precision."""
+        self.coords = self.coords.astype(dtype, copy=False)
+
+    @classmethod
+    def from_table(cls, table, name=None):
+        """
+        Builds the trace of the C-alpha records of an AtomTable, in file order.
+        """
+        table = table.take(table.c_alpha())
+        types, _ = encode_residue_names(table.resname)
+        return cls(
+            coords=np.ascontiguousarray(table.coords),
+            types=types,
+            resname=table.resname,
+            chain=table.chain,
+            resnum=table.resnum,
+            segment=table.segment,
+            name=name,
+        )
+
+    def to_molecule(self, name=None):
+        """
+        Builds a Molecule with one Residue, holding its CA Atom, per trace row.
+        """
+        molecule = Molecule(self.name if name is None else name, dtype=self.dtype)
+        molecule.fill_atoms(self.coords, np.full(len(self), "CA"), np.arange(1, len(self) + 1))
+        res_names = self.resname.astype(str).tolist()
+        chains = self.chain.astype(str).tolist()
+        _, protein = encode_residue_names(self.resname)
+        for index, (code, is_protein, res_name, chain, num) in enumerate(
+            zip(self.types.tolist(), protein.tolist(), res_names, chains, self.resnum.tolist())
+        ):
+            res = Residue(num, index + 1, 1, code, False, is_protein, res_name, chain, molecule)
+            res.atoms = [Atom.view(res, index)]
+            molecule.residues.append(res)
+        molecule.nres = len(molecule.residues)
+        molecule.model = self.model
+        return molecule
@@ -1,12 +1,727 @@
-from .pdb_datastructures import Atom, Residue, Molecule
+import collections
+import contextlib
+import itertools
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
 
-def read_pdb_file(filename, realname):
+import numpy as np
+
+from .columns import field, fixed_width
+from .compression import detect_compression, open_input, open_input_text
+from .pdb_datastructures import (
+    Atom, Residue, Molecule, AtomTable, CATrace, RawRecords, encode_residue_names,
+)
+
+NEWLINE = ord("\n")
+CARRIAGE_RETURN = ord("\r")
+# Atom name columns of a C-alpha record; calcium is written "CA  ".
+CA_NAME = b" CA "
+# Columns holding every field the parser decodes (up to the end of z).
+RECORD_WIDTH = 54
+# Bytes of a memory-mapped file decoded at a time.
+MMAP_BLOCK_SIZE = 1 << 22
+# Smallest byte range handed to a parsing worker; smaller files are parsed serially.
+PARALLEL_CHUNK_SIZE = 1 << 22
+# Byte ranges per worker, so that uneven ranges still keep every worker busy.
+CHUNKS_PER_WORKER = 4
+# Bytes read at a time when streaming the models of a multi-model file.
+STREAM_CHUNK_SIZE = 1 << 20
+# MODEL, ENDMDL and END records, which delimit the models of a file.
+MODEL_MARK = re.compile(rb"^(MODEL|ENDMDL|END)", re.MULTILINE)
+
+
+def read_pdb_file(filename, realname, vectorized=True, use_mmap=False, cache=None, workers=1):
     """
     Reads a PDB file and returns a Molecule object.
+
+    With ``vectorized`` (the default) the records are decoded in bulk by
+    read_pdb_table; otherwise the file is walked line by line. Both modes return
+    identical molecules.
+    """
+    if not vectorized:
+        return _read_pdb_lines(filename, realname)
+    table = read_pdb_table(filename, use_mmap=use_mmap, cache=cache, workers=workers)
+    return table.to_molecule(realname)
+
+
+def read_pdb_chains(filename, realname, use_mmap=False, cache=None, workers=1,
+                    passthrough=False):
+    """
+    Reads every chain of a PDB file and returns one Molecule per chain.
+
+    Unlike read_pdb_file, reading goes on past TER records up to END; chains are
+    split at TER records and wherever the chain identifier changes, so each one
+    can be reconstructed independently.
+
+    With ``passthrough`` the non-protein records are set aside (see
+    read_pdb_table) and a (chains, RawRecords) pair is returned.
+    """
+    table = read_pdb_table(
+        filename, use_mmap=use_mmap, all_chains=True, cache=cache, workers=workers,
+        passthrough=passthrough,
+    )
+    chains = [chain.to_molecule(realname) for chain in table.split_chains()]
+    return (chains, _passthrough(table)) if passthrough else chains
+
+
+def read_pdb_table(filename, use_mmap=False, all_chains=False, ca_only=False, cache=None,
+                   workers=1, passthrough=False):
+    """
+    Reads the ATOM/HETATM records of a PDB file into an AtomTable.
+
+    The file is read as bytes once; records are located and their fixed columns
+    decoded with a few NumPy passes instead of per-line string slicing. Reading
+    stops at the first END or TER record and only the first alternate location
+    (' ' or 'A') is kept, as in the line-based reader. With ``all_chains`` only END
+    stops reading and TER records just advance ``AtomTable.segment``.
+
+    With ``use_mmap`` the file is memory-mapped instead and decoded block by block
+    straight from the mapping, so resident memory stays close to the size of the
+    output arrays rather than the size of the file.
+
+    gzip, bzip2 and xz files are recognized by their magic bytes and decompressed
+    incrementally, one block at a time; ``use_mmap`` does not apply to them.
+
+    mmCIF files, recognized by their suffix or a leading ``data_`` block, are
+    read from their _atom_site loop by mmcif.read_mmcif_table.
+
+    With ``ca_only`` only the C-alpha records are kept; in PDB files the others
+    are dropped before any of their columns is decoded.
+
+    With a cache.StructureCache as ``cache`` the table is reloaded from it when
+    the same content was read before with the same options, and stored in it
+    otherwise.
+
+    With ``workers`` > 1, a large uncompressed PDB file is split into byte
+    ranges at line boundaries that are decoded in a pool of that many processes;
+    the result is identical to a serial read.
+
+    With ``passthrough`` the records of residues that are not amino acids
+    (ligands, waters, ions; see encode_residue_names) are left out of the
+    columns and only located: ``AtomTable.passthrough`` holds their line
+    offsets as RawRecords, so they can be written back verbatim at no decoding
+    cost. When the file was read into memory the offsets point into its text;
+    the other readers copy out just those lines. mmCIF files have no record
+    lines, so there every record is decoded as usual and ``passthrough`` is None.
+    """
+    if cache is not None:
+        return cache.read_table(
+            filename, all_chains=all_chains, ca_only=ca_only, use_mmap=use_mmap,
+            workers=workers, passthrough=passthrough,
+        )
+
+    from .mmcif import is_mmcif, read_mmcif_table
+
+    options = dict(all_chains=all_chains, ca_only=ca_only, passthrough=passthrough)
+    if is_mmcif(filename):
+        table = read_mmcif_table(filename, all_chains=all_chains)
+        return table.take(table.c_alpha()) if ca_only else table
+    if detect_compression(filename) is not None:
+        with open_input(filename) as stream:
+            return _read_pdb_table_stream(stream, **options)
+    if workers > 1 and os.path.getsize(filename) > PARALLEL_CHUNK_SIZE:
+        return _read_pdb_table_parallel(filename, workers, **options)
+    if use_mmap:
+        return _read_pdb_table_mmap(filename, **options)
+    data = Path(filename).read_bytes()
+    return parse_pdb_bytes(data, **options)
+
+
+def parse_pdb_bytes(data, all_chains=False, ca_only=False, passthrough=False):
+    """
+    Decodes the ATOM/HETATM records of an in-memory PDB text into an AtomTable.
+    """
+    table, _, _ = _parse_block(
+        np.frombuffer(data, dtype=np.uint8), all_chains, ca_only, passthrough
+    )
+    return table
+
+
+def _passthrough(table):
+    """
+    Returns the passthrough records of a table, empty if it has none.
+    """
+    return RawRecords.empty() if table.passthrough is None else table.passthrough
+
+
+def read_ca_trace(filename, realname, use_mmap=False, cache=None, workers=1):
+    """
+    Reads the C-alpha trace of the first chain of a structure file.
+
+    Only the C-alpha records are decoded (see read_pdb_table), into a CATrace
+    holding one contiguous coordinate row per residue. This is all the
+    reconstruction needs, so it is a fast path for large inputs whose other
+    atoms would be discarded anyway.
+    """
+    table = read_pdb_table(
+        filename, use_mmap=use_mmap, ca_only=True, cache=cache, workers=workers
+    )
+    return CATrace.from_table(table, realname)
+
+
+def read_ca_chains(filename, realname, use_mmap=False, cache=None, workers=1,
+                   passthrough=False):
+    """
+    Reads the C-alpha trace of every chain of a structure file, one CATrace each.
+
+    Chains are split as in read_pdb_chains; chains without C-alpha atoms do not
+    appear at all. ``passthrough`` is as for read_pdb_chains.
+    """
+    table = read_pdb_table(
+        filename, use_mmap=use_mmap, all_chains=True, ca_only=True, cache=cache,
+        workers=workers, passthrough=passthrough,
+    )
+    chains = _ca_chains(table, realname)
+    return (chains, _passthrough(table)) if passthrough else chains
+
+
+def _ca_chains(table, realname):
+    """
+    Returns the CATrace of each chain of a table that has C-alpha atoms.
+    """
+    traces = [CATrace.from_table(chain, realname) for chain in table.split_chains()]
+    return [trace for trace in traces if len(trace)]
+
+
+def iter_models(filename, realname, frames=None, workers=1, save_index=False):
+    """
+    Yields one Molecule per model (MODEL/ENDMDL block) of a PDB file.
+
+    The file is streamed, so only the model being decoded is held in memory.
+    Each model is parsed like a single-model file and its MODEL serial is stored
+    in ``Molecule.model``. A file without MODEL records yields a single model.
+    ``frames``, ``workers`` and ``save_index`` are as for iter_model_tables.
+    """
+    for number, table in iter_model_tables(
+        filename, frames=frames, workers=workers, save_index=save_index
+    ):
+        molecule = table.to_molecule(realname)
+        molecule.model = number
+        yield molecule
+
+
+def iter_model_chains(filename, realname, ca_only=False, frames=None, workers=1,
+                      passthrough=False, save_index=False):
+    """
+    Yields, for each model of a PDB file, the list of its chains as Molecules.
+
+    This is the multi-model counterpart of read_pdb_chains, or of read_ca_chains
+    with ``ca_only``, in which case the chains are CATrace objects. ``frames``,
+    ``workers`` and ``save_index`` are as for iter_model_tables. With
+    ``passthrough`` each model is yielded as a (chains, RawRecords) pair holding
+    its non-protein records, as for read_pdb_chains.
+    """
+    for number, table in iter_model_tables(
+        filename, all_chains=True, ca_only=ca_only, frames=frames, workers=workers,
+        passthrough=passthrough, save_index=save_index,
+    ):
+        if ca_only:
+            chains = _ca_chains(table, realname)
+        else:
+            chains = [chain.to_molecule(realname) for chain in table.split_chains()]
+        for molecule in chains:
+            molecule.model = number
+        yield (chains, _passthrough(table)) if passthrough else chains
+
+
+def iter_model_tables(filename, chunk_size=STREAM_CHUNK_SIZE, all_chains=False, ca_only=False,
+                      frames=None, workers=1, passthrough=False, save_index=False):
+    """
+    Yields (model number, AtomTable) pairs for the models of a PDB or mmCIF file.
+
+    ``frames`` is a slice or range of model positions (0 for the first model)
+    to read instead of all of them. For an uncompressed PDB file the models are
+    found through the frame index of the file (see frame_index.FrameIndex),
+    and each selected model is read straight from its offset. The index is
+    loaded from the ``<file>.idx`` sidecar if that is up to date, and built
+    otherwise; only with ``save_index`` is a built index saved as the sidecar
+    for later reads. Other files are scanned from the top, and the selection
+    may not count from the end.
+
+    With ``workers`` > 1, the models of a large PDB file are decoded in a pool
+    of that many processes while the file is split into models. Only a few
+    models per worker are in flight at a time, so memory stays bounded and
+    stopping early leaves the rest of the file unread.
+
+    ``passthrough`` is as for read_pdb_table; the passthrough records of each
+    model are copied out of the model text.
+    """
+    from .frame_index import FrameIndex
+    from .mmcif import is_mmcif, iter_mmcif_tables
+
+    if frames is not None and not is_mmcif(filename) and detect_compression(filename) is None:
+        rows = FrameIndex.for_file(filename, save=save_index).select(frames).tolist()
+        with open(filename, "rb") as f, _model_pool(filename, workers) as executor:
+            models = (
+                (number, _read_range(f, start, end), True) for number, start, end in rows
+            )
+            parsed = _parse_models(models, executor, workers, all_chains, ca_only, passthrough)
+            for number, _, table in parsed:
+                yield number, table
+        return
+    if frames is not None:
+        if isinstance(frames, range):
+            frames = slice(frames.start, frames.stop, frames.step)
+        models = iter_model_tables(
+            filename, chunk_size, all_chains, ca_only, workers=workers, passthrough=passthrough
+        )
+        yield from itertools.islice(models, frames.start, frames.stop, frames.step)
+        return
+    if is_mmcif(filename):
+        for number, table in iter_mmcif_tables(filename, all_chains=all_chains):
+            yield number, table.take(table.c_alpha()) if ca_only else table
+        return
+    with open_input(filename) as stream, _model_pool(filename, workers) as executor:
+        yield from _iter_model_tables(
+            stream, chunk_size, all_chains, ca_only, executor, workers, passthrough
+        )
+
+
+def _iter_model_tables(stream, chunk_size, all_chains=False, ca_only=False, executor=None,
+                       workers=1, passthrough=False):
+    """
+    Splits a binary PDB stream into models and decodes each one.
+
+    The models are decoded in ``executor``, a pool of ``workers`` processes,
+    when it is not None. Text outside MODEL/ENDMDL pairs is emitted as a model
+    only if it holds records.
+    """
+    models = _split_models(stream, chunk_size)
+    count = 0
+    parsed = _parse_models(models, executor, workers, all_chains, ca_only, passthrough)
+    for number, always, table in parsed:
+        if always or len(table) or (passthrough and len(table.passthrough)):
+            count += 1
+            yield (count if number is None else number), table
+
+
+def _model_pool(filename, workers):
+    """
+    Returns a process pool for decoding the models of a file.
+
+    When the file is decoded serially, this is a null context yielding None.
+    """
+    if workers > 1 and os.path.getsize(filename) > PARALLEL_CHUNK_SIZE:
+        return ProcessPoolExecutor(workers)
+    return contextlib.nullcontext()
+
+
+def _read_range(f, start, end):
+    f.seek(start)
+    return f.read(end - start)
+
+
+def _parse_models(models, executor, workers, all_chains=False, ca_only=False,
+                  passthrough=False):
+    """
+    Decodes the (number, text, always) triples of _split_models, in order.
+
+    Yields (number, always, AtomTable) triples, decoded in ``executor`` (a pool
+    of ``workers`` processes) when it is not None.
+    """
+    parse = partial(_parse_model, all_chains=all_chains, ca_only=ca_only, passthrough=passthrough)
+    if executor is None:
+        return map(parse, models)
+    return _ordered_map(executor, parse, models, workers * CHUNKS_PER_WORKER)
+
+
+def _parse_model(model, all_chains=False, ca_only=False, passthrough=False):
+    """
+    Decodes one (number, text, always) triple of _split_models.
+    """
+    number, text, always = model
+    table = parse_pdb_bytes(text, all_chains, ca_only, passthrough)
+    if passthrough:
+        table.passthrough = table.passthrough.compact()
+    return number, always, table
+
+
+def _ordered_map(executor, func, items, window):
+    """
+    Yields ``func(item)`` for each item, computed in an executor, in order.
+
+    Items are submitted as results are taken, with at most ``window`` of them
+    in flight, so a consumer that stops early stops the work too.
+    """
+    pending = collections.deque()
+    try:
+        for item in items:
+            if len(pending) >= window:
+                yield pending.popleft().result()
+            pending.append(executor.submit(func, item))
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _split_models(stream, chunk_size):
+    """
+    Splits a binary PDB stream into the texts of its models.
+
+    Yields (number, text, always) triples, where ``number`` is the MODEL serial,
+    or None when the model is numbered by its position, and ``always`` tells
+    whether the text is a model even if it holds no records: it was opened by a
+    MODEL record. Text outside MODEL/ENDMDL pairs is yielded with ``always``
+    False. The stream is read in chunks; ``pending`` holds the text of the
+    model being collected plus the unscanned tail, and is trimmed once a model
+    is yielded.
+    """
+    pending = bytearray()
+    frame_start = 0
+    scanned = 0
+    number = None
+    in_model = False
+    eof = False
+    while not eof:
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        pending += chunk
+        limit = len(pending) if eof else pending.rfind(b"\n") + 1
+
+        for mark in MODEL_MARK.finditer(pending, scanned, limit):
+            line_end = pending.find(b"\n", mark.start(), limit)
+            line_end = limit if line_end < 0 else line_end + 1
+            kind = mark.group(1)
+            if kind == b"ENDMDL" or not in_model:
+                yield number, bytes(pending[frame_start:mark.start()]), kind == b"ENDMDL"
+                number = None
+                in_model = False
+            if kind == b"END":
+                return
+            if kind == b"MODEL":
+                fields = pending[mark.end():line_end].split()
+                number = int(fields[0]) if fields else None
+                in_model = True
+            frame_start = line_end
+
+        scanned = limit - frame_start
+        del pending[:frame_start]
+        frame_start = 0
+
+    yield number, bytes(pending), in_model
+
+
+def _read_pdb_table_stream(stream, chunk_size=STREAM_CHUNK_SIZE, all_chains=False,
+                           ca_only=False, passthrough=False):
+    """
+    Decodes a binary PDB stream block by block as it is read.
+
+    Only the current chunk (plus the partial line carried over from the previous
+    one) is held in memory besides the decoded tables.
+    """
+    tables = []
+    carry = b""
+    nter = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        data = carry + chunk
+        if chunk:
+            cut = data.rfind(b"\n") + 1
+            data, carry = data[:cut], data[cut:]
+        table, block_nter, terminated = _parse_block(
+            np.frombuffer(data, dtype=np.uint8), all_chains, ca_only, passthrough
+        )
+        if passthrough:
+            table.passthrough = table.passthrough.compact()
+        table.segment += nter
+        nter += block_nter
+        tables.append(table)
+        if terminated or not chunk:
+            break
+    return AtomTable.concatenate(tables)
+
+
+def _read_pdb_table_mmap(filename, block_size=MMAP_BLOCK_SIZE, all_chains=False,
+                         ca_only=False, passthrough=False):
+    """
+    Decodes a memory-mapped PDB file without holding its text in memory.
+
+    A first pass over line-aligned blocks builds the line-offset index of the
+    records to keep; the output table is then allocated once and filled by
+    decoding the indexed records straight from the mapping. Pages are dropped
+    from memory as soon as each pass is done with them.
+    """
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            table = AtomTable.empty()
+            if passthrough:
+                table.passthrough = RawRecords.empty()
+            return table
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            buf = np.frombuffer(mapped, dtype=np.uint8)
+            try:
+                starts, ends, segment, raw = [], [], [], []
+                nter = 0
+                for lo, hi in _block_ranges(mapped, block_size):
+                    block_starts, block_ends, block_segment, block_nter, terminated = (
+                        _index_records(buf[lo:hi], all_chains, ca_only and not passthrough)
+                    )
+                    if passthrough:
+                        block_raw, keep = _split_passthrough(
+                            buf[lo:hi], block_starts, block_ends, ca_only
+                        )
+                        # A copy, so that nothing refers to the mapping once it is closed.
+                        raw.append(block_raw.compact())
+                        del block_raw
+                        block_starts, block_ends, block_segment = (
+                            block_starts[keep], block_ends[keep], block_segment[keep]
+                        )
+                    starts.append(block_starts + lo)
+                    ends.append(block_ends + lo)
+                    segment.append(block_segment + nter)
+                    nter += block_nter
+                    _release_pages(mapped, lo, hi)
+                    if terminated:
+                        break
+                starts = np.concatenate(starts)
+                ends = np.concatenate(ends)
+                segment = np.concatenate(segment)
+
+                table = AtomTable.allocate(len(starts))
+                step = max(1, block_size // 128)
+                for lo in range(0, len(starts), step):
+                    hi = min(lo + step, len(starts))
+                    table.assign(
+                        slice(lo, hi),
+                        _decode_records(buf, starts[lo:hi], ends[lo:hi], segment[lo:hi]),
+                    )
+                    _release_pages(mapped, starts[lo], ends[hi - 1])
+                if passthrough:
+                    table.passthrough = RawRecords.concatenate(raw)
+            finally:
+                del buf
+    return table
+
+
+def _read_pdb_table_parallel(filename, workers, chunk_size=None, all_chains=False,
+                             ca_only=False, passthrough=False):
+    """
+    Decodes byte ranges of a PDB file in a process pool and joins them in order.
+
+    Records never span lines, so ranges are cut at line boundaries; each worker
+    reads and decodes its own range and the tables are joined in file order.
+    TER counts are carried across ranges as in _read_pdb_table_stream. The
+    first stopping record is found before any range is handed out, and only
+    the text before it is split, so the workers decode nothing a serial read
+    would not; in a file of concatenated decoys they share the first one.
+    """
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        size = _stop_offset(mapped, all_chains)
+        if chunk_size is None:
+            chunk_size = max(PARALLEL_CHUNK_SIZE, -(-size // (workers * CHUNKS_PER_WORKER)))
+        ranges = list(_block_ranges(mapped, chunk_size, size))
+    if not ranges:
+        return parse_pdb_bytes(b"", all_chains, ca_only, passthrough)
+
+    parse = partial(
+        _parse_file_range, filename, all_chains=all_chains, ca_only=ca_only,
+        passthrough=passthrough,
+    )
+    tables = []
+    nter = 0
+    with ProcessPoolExecutor(workers) as executor:
+        for table, block_nter, _ in executor.map(parse, ranges):
+            table.segment += nter
+            nter += block_nter
+            tables.append(table)
+    return AtomTable.concatenate(tables)
+
+
+def _parse_file_range(filename, byte_range, all_chains=False, ca_only=False,
+                      passthrough=False):
+    """
+    Reads and decodes the complete lines in a byte range of a PDB file.
+    """
+    lo, hi = byte_range
+    with open(filename, "rb") as f:
+        f.seek(lo)
+        data = f.read(hi - lo)
+    table, nter, terminated = _parse_block(
+        np.frombuffer(data, dtype=np.uint8), all_chains, ca_only, passthrough
+    )
+    if passthrough:
+        # Only the set-aside lines are sent back, not the whole range.
+        table.passthrough = table.passthrough.compact()
+    return table, nter, terminated
+
+
+def _stop_offset(mapped, all_chains=False):
+    """
+    Returns the offset of the first line of a mapped PDB file that stops reading.
+
+    That is END or, unless ``all_chains``, TER; without one it is the size of
+    the file.
+    """
+    stop = len(mapped)
+    for mark in (b"END",) if all_chains else (b"END", b"TER"):
+        if mapped[:len(mark)] == mark:
+            return 0
+        found = mapped.find(b"\n" + mark, 0, stop)
+        if found >= 0:
+            stop = found + 1
+    return stop
+
+
+def _release_pages(mapped, lo, hi):
+    """
+    Tells the kernel the mapped bytes ``lo:hi`` are no longer needed.
+    """
+    if hasattr(mapped, "madvise"):
+        aligned = lo - lo % mmap.PAGESIZE
+        mapped.madvise(mmap.MADV_DONTNEED, aligned, hi - aligned)
+
+
+def _block_ranges(mapped, block_size, size=None):
+    """
+    Yields (lo, hi) byte ranges of roughly ``block_size`` that end on a line boundary.
+
+    ``size``, which must be at a line boundary, ends the ranges before the end
+    of the mapping.
+    """
+    size = len(mapped) if size is None else size
+    lo = 0
+    while lo < size:
+        hi = min(lo + block_size, size)
+        if hi < size:
+            newline = mapped.rfind(b"\n", lo, hi)
+            if newline < 0:
+                newline = mapped.find(b"\n", hi)
+            hi = size if newline < 0 else newline + 1
+        yield lo, hi
+        lo = hi
+
+
+def _parse_block(buf, all_chains=False, ca_only=False, passthrough=False):
+    """
+    Decodes the ATOM/HETATM records of a block of complete lines.
+
+    Returns the AtomTable, the number of TER records crossed and whether reading
+    was stopped, in which case nothing after the block should be read. With
+    ``passthrough`` the non-protein records are set aside as RawRecords into
+    ``buf`` instead of being decoded.
+    """
+    starts, ends, segment, nter, terminated = _index_records(
+        buf, all_chains, ca_only and not passthrough
+    )
+    raw = None
+    if passthrough:
+        raw, keep = _split_passthrough(buf, starts, ends, ca_only)
+        starts, ends, segment = starts[keep], ends[keep], segment[keep]
+    table = _decode_records(buf, starts, ends, segment)
+    table.passthrough = raw
+    return table, nter, terminated
+
+
+def _split_passthrough(buf, starts, ends, ca_only=False):
+    """
+    Sets aside the records whose residue name is not an amino acid.
+
+    Returns their RawRecords and the mask of the records to decode: the others,
+    or with ``ca_only`` just their C-alpha records.
+    """
+    resname = np.strings.strip(field(fixed_width(buf, starts, ends, 17, 20), 0, 3))
+    _, protein = encode_residue_names(resname)
+    raw = RawRecords(buf, starts[~protein], ends[~protein])
+    if ca_only:
+        protein &= _c_alpha_records(buf, starts, ends)
+    return raw, protein
+
+
+def _index_records(buf, all_chains=False, ca_only=False):
+    """
+    Returns the line offsets of the records to decode from a block of complete lines.
+
+    Records are the ATOM/HETATM lines before the first END (or, unless
+    ``all_chains``, TER) record whose alternate location is ' ' or 'A'. Along with
+    the offsets come the number of TER records preceding each record, the number
+    of TER records crossed in the block and whether reading was stopped.
+    With ``ca_only`` only the records named " CA " (C-alpha, not calcium) are kept.
+    """
+    starts, ends = _line_bounds(buf)
+    head = field(fixed_width(buf, starts, ends, 0, 6), 0, 6)
+    ter = np.strings.startswith(head, b"TER")
+
+    # Everything from the first stopping record on is ignored.
+    stop = np.strings.startswith(head, b"END")
+    if not all_chains:
+        stop |= ter
+    stop = np.flatnonzero(stop)
+    terminated = len(stop) > 0
+    if terminated:
+        starts, ends, head, ter = starts[:stop[0]], ends[:stop[0]], head[:stop[0]], ter[:stop[0]]
+    segment = np.cumsum(ter)
+
+    records = np.strings.startswith(head, b"ATOM") | (head == b"HETATM")
+    starts, ends, segment = starts[records], ends[records], segment[records]
+
+    altloc = field(fixed_width(buf, starts, ends, 16, 17), 0, 1)
+    keep = (altloc == b" ") | (altloc == b"A")
+    if ca_only:
+        keep &= _c_alpha_records(buf, starts, ends)
+    return starts[keep], ends[keep], segment[keep], int(ter.sum()), terminated
+
+
+def _c_alpha_records(buf, starts, ends):
+    """
+    Returns the mask of the given records named " CA ".
+    """
+    return field(fixed_width(buf, starts, ends, 12, 16), 0, 4) == CA_NAME
+
+
+def _decode_records(buf, starts, ends, segment):
+    """
+    Decodes the fixed columns of the given record lines into an AtomTable.
+    """
+    rows = fixed_width(buf, starts, ends, 0, RECORD_WIDTH)
+
+    coords = np.empty((len(rows), 3), dtype=np.float64)
+    for axis, lo in enumerate((30, 38, 46)):
+        coords[:, axis] = field(rows, lo, lo + 8).astype(np.float64)
+
+    return AtomTable(
+        hetatm=field(rows, 0, 6) == b"HETATM",
+        serial=field(rows, 6, 11).astype(np.int64),
+        name=np.strings.strip(field(rows, 12, 16)),
+        altloc=field(rows, 16, 17),
+        resname=np.strings.strip(field(rows, 17, 20)),
+        chain=field(rows, 21, 22),
+        resnum=field(rows, 22, 26).astype(np.int64),
+        icode=field(rows, 26, 27),
+        segment=segment,
+        coords=coords,
+    )
+
+
+def _line_bounds(buf):
+    """
+    Returns the start and end offsets of every line in a byte buffer.
+
+    Ends exclude the line terminator, including the carriage return of CRLF files.
+    """
+    newlines = np.flatnonzero(buf == NEWLINE)
+    starts = np.concatenate(([0], newlines + 1))
+    ends = np.concatenate((newlines, [len(buf)]))
+    if starts[-1] == len(buf):
+        starts, ends = starts[:-1], ends[:-1]
+    if len(ends):
+        crlf = buf[np.maximum(ends - 1, 0)] == CARRIAGE_RETURN
+        ends = ends - (crlf & (ends > starts))
+    return starts, ends
+
+
+def _read_pdb_lines(filename, realname):
+    """
+    Reads a PDB file line by line, building one Atom per record.
     """
     molecules = Molecule(realname)
 
-    with open(filename, 'r') as inp:
+    with open_input_text(filename) as inp:
         prevresnum = -666
         locnum = 0
         res = None
@@ -33,11 +748,12 @@ def read_pdb_file(filename, realname):
                         num=resnum,
                         locnum=locnum,
                         natoms=0,
-                        type=0, # Will be set later
+                        type=0, # Set by encode_residues
                         pdbsg=False,
                         protein=False,
                         name=resname,
-                        chain=line[21]
+                        chain=line[21],
+                        molecule=molecules,
                     )
                     molecules.residues.append(res)
                     molecules.nres += 1
@@ -57,7 +773,7 @@ def read_pdb_file(filename, realname):
                     cispro=False,
                     res=res
                 )
-                res.atoms.append(atom)
-                res.natoms += 1
+                res.add_atom(atom)
 
+    molecules.encode_residues()
     return molecules
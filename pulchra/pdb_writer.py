@@ -1,21 +1,411 @@
-def write_pdb(molecule, filepath):
-    """
-    Writes a Molecule object to a PDB file.
-    """
-    with open(filepath, 'w') as f:
-        # Placeholder for writing the PDB file
-        f.write("REMARK 999 REBUILT BY PULCHRA V.3.04\n")
-        anum = 1
-        atom_order = {"N": 0, "CA": 1, "C": 2, "O": 3}
-        for res in molecule.residues:
-            # Sort atoms based on a predefined order (N, CA, C, O, then others)
-            print(f"Residue {res.num}: {[atom.name for atom in res.atoms]}")
-            sorted_atoms = sorted(res.atoms, key=lambda atom: atom_order.get(atom.name, 4))
-            print(f"Residue {res.num} sorted: {[atom.name for atom in sorted_atoms]}")
-            for atom in sorted_atoms:
-                f.write(
-                    f"ATOM  {anum:5d} {atom.name:<4s} {res.name:<3s}  {res.num:4d}    "
-                    f"{atom.x:8.3f}{atom.y:8.3f}{atom.z:8.3f}\n"
-                )
-                anum += 1
-        f.write("TER\nEND\n")
+import contextlib
+import io
+from pathlib import Path
+
+import numpy as np
+
+from .columns import SPACE, bytes_matrix, field, fixed_width, put_decimal, put_int
+from .compression import compression_suffix, open_output
+from .mmcif import is_mmcif_path, write_atom_site
+from .pdb_datastructures import Molecule
+
+REMARK = b"REMARK 999 REBUILT BY PULCHRA V.3.04\n"
+# Bytes of one ATOM record, newline included.
+RECORD_WIDTH = 81
+# Records formatted and written at a time.
+WRITE_CHUNK_SIZE = 1 << 16
+# Columns of the PDB record fields carried into the mmCIF rows of passthrough records.
+PASSTHROUGH_COLUMNS = {
+    "groups": (0, 6), "names": (12, 16), "altlocs": (16, 17), "resnames": (17, 20),
+    "chains": (21, 22), "resnums": (22, 26), "icodes": (26, 27), "occupancies": (54, 60),
+    "bfactors": (60, 66), "elements": (76, 78),
+}
+
+
+def write_pdb(molecule, filepath, passthrough=None):
+    """
+    Writes a Molecule object, or a list of chain Molecules, to a PDB file.
+
+    Each chain is closed by a TER record and atom serials run on across chains.
+    A ".gz", ".bz2" or ".xz" suffix compresses the output as it is written, and a
+    ".cif" or ".mmcif" suffix writes an mmCIF _atom_site loop instead.
+    ``filepath`` may also be a binary file-like object, such as a BytesIO or
+    ``sys.stdout.buffer``, which gets the PDB records and is left open.
+
+    ``passthrough`` is the RawRecords of records set aside by the reader; they
+    are written verbatim after the rebuilt chains. In an mmCIF file they become
+    _atom_site rows of their own, with the fields of the PDB lines.
+    """
+    if _is_path(filepath) and is_mmcif_path(filepath):
+        _write_mmcif([(molecule, passthrough)], filepath)
+        return
+    with _open_binary(filepath) as f:
+        f.write(REMARK)
+        _write_chains(f, molecule)
+        _write_passthrough(f, passthrough)
+        f.write(b"END\n")
+
+
+def write_pdb_models(molecules, filepath, passthrough=False):
+    """
+    Writes a sequence of molecules to a multi-model PDB file.
+
+    Each molecule (or list of chain Molecules) becomes a MODEL/ENDMDL block,
+    numbered after ``Molecule.model`` when it is set and by position otherwise.
+    ``molecules`` may be a generator; it is consumed one model at a time.
+    An mmCIF suffix writes the models to one _atom_site loop, told apart by
+    pdbx_PDB_model_num. As with write_pdb, ``filepath`` may be a binary
+    file-like object.
+
+    With ``passthrough`` each item is a (molecule, RawRecords) pair, as yielded
+    by pdb_parser.iter_model_chains with passthrough, and the records are
+    written as by write_pdb at the end of their model.
+    """
+    models = molecules if passthrough else ((molecule, None) for molecule in molecules)
+    if _is_path(filepath) and is_mmcif_path(filepath):
+        _write_mmcif(models, filepath)
+        return
+    with _open_binary(filepath) as f:
+        f.write(REMARK)
+        for number, chains, raw in _numbered_models(models):
+            f.write(b"MODEL     %4d\n" % number)
+            _write_chains(f, chains)
+            _write_passthrough(f, raw)
+            f.write(b"ENDMDL\n")
+        f.write(b"END\n")
+
+
+def format_pdb(molecule, passthrough=None):
+    """
+    Returns the PDB file write_pdb would write for a molecule, as bytes.
+    """
+    out = io.BytesIO()
+    write_pdb(molecule, out, passthrough)
+    return out.getvalue()
+
+
+def format_pdb_models(molecules, passthrough=False):
+    """
+    Returns the multi-model PDB file write_pdb_models would write, as bytes.
+    """
+    out = io.BytesIO()
+    write_pdb_models(molecules, out, passthrough)
+    return out.getvalue()
+
+
+class TrajectoryWriter:
+    """
+    Streams C-alpha snapshots to a multi-model PDB file as they are produced.
+
+    Each call to add_frame formats one MODEL/ENDMDL block of CA records; the
+    blocks are kept in memory until ``max_buffered`` of them are waiting and
+    then written out together, so long optimizations cost a bounded amount
+    of memory. Models are numbered from 1 across all the frames of the file.
+    ``stride`` is how many optimization steps separate two frames; it is read
+    by the producer (see core.ca_optimize). ``filepath`` may be a path or an
+    open binary file-like object, which is left open by close.
+
+    An uncompressed file gets a frame index (see frame_index.FrameIndex), which
+    is extended as each batch of frames is written, so readers can seek to any
+    frame of the trajectory while it is still being produced.
+    """
+
+    def __init__(self, filepath, stride=1, max_buffered=64):
+        from .frame_index import IndexAppender
+
+        if stride < 1:
+            raise ValueError("The trajectory stride must be at least 1.")
+        self.stride = stride
+        self.max_buffered = max_buffered
+        self.nframes = 0
+        self._buffer = []
+        self._owned = _is_path(filepath)
+        self._file = open_output(filepath, "wb") if self._owned else filepath
+        self._index = None
+        if self._owned and not compression_suffix(filepath):
+            self._index = IndexAppender(filepath)
+        # Bytes produced so far, and the (number, start, end) rows of the
+        # frames not yet in the index.
+        self._size = 0
+        self._rows = []
+
+    def add_frame(self, coords, resnames, resnums, chains):
+        """
+        Adds a model with one CA record per row of ``coords``.
+
+        ``resnames`` and ``chains`` are byte string arrays and ``resnums`` an
+        integer array, one entry per row, as in CATrace.
+        """
+        coords = np.asarray(coords, dtype=np.float64)
+        n = len(coords)
+        self.nframes += 1
+        frame = (
+            b"MODEL     %4d\n" % self.nframes
+            + _format_records(
+                np.arange(1, n + 1) % 100000, np.full(n, b" CA "), resnames, chains,
+                resnums, coords, np.full(n, b" C"),
+            )
+            + b"ENDMDL\n"
+        )
+        self._buffer.append(frame)
+        self._rows.append((self.nframes, self._size, self._size + len(frame)))
+        self._size += len(frame)
+        if len(self._buffer) >= self.max_buffered:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered frames out.
+        """
+        if self._buffer:
+            self._file.write(b"".join(self._buffer))
+            self._buffer.clear()
+        self._file.flush()
+        if self._index is not None:
+            self._index.append(self._rows)
+        self._rows.clear()
+
+    def close(self):
+        """
+        Writes the remaining frames and the END record.
+
+        The file is closed too if it was opened here.
+        """
+        if self._file is None:
+            return
+        self._buffer.append(b"END\n")
+        self.flush()
+        if self._owned:
+            self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        """Returns the writer itself."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Closes the writer."""
+        self.close()
+
+
+def _is_path(target):
+    return not hasattr(target, "write")
+
+
+def _open_binary(target):
+    """
+    Opens a path for binary writing, or passes an open file-like object through.
+    """
+    if _is_path(target):
+        return open_output(target, "wb")
+    return contextlib.nullcontext(target)
+
+
+def _write_passthrough(f, passthrough):
+    """
+    Writes passthrough records verbatim to an open binary file.
+    """
+    if passthrough is not None and len(passthrough):
+        f.write(passthrough.tobytes())
+
+
+def _write_mmcif(models, filepath):
+    """
+    Writes (molecule, passthrough) models to an mmCIF file.
+
+    The atoms and serials are the same as in a PDB file.
+    """
+    name = Path(filepath).name.split(".")[0]
+    models = (
+        (number, _chain_chunks(chains, raw)) for number, chains, raw in _numbered_models(models)
+    )
+    with open_output(filepath, "wb") as f:
+        write_atom_site(f, models, name)
+
+
+def _numbered_models(models):
+    """
+    Yields (model number, chains, passthrough) triples for (molecule, passthrough) pairs.
+
+    Models are numbered after ``Molecule.model`` if set and by position otherwise.
+    """
+    for number, (molecule, raw) in enumerate(models, start=1):
+        chains = _as_chains(molecule)
+        if chains and chains[0].model is not None:
+            number = chains[0].model
+        yield number, chains, raw
+
+
+def _as_chains(molecule):
+    return [molecule] if isinstance(molecule, Molecule) else list(molecule)
+
+
+def _write_chains(f, molecule):
+    """
+    Writes the ATOM records of each chain, followed by TER, to an open binary file.
+    """
+    anum = 1
+    for chain in _as_chains(molecule):
+        anum = _write_atoms(f, chain, anum)
+        f.write(b"TER\n")
+
+
+def _write_atoms(f, molecule, anum=1):
+    """
+    Writes the ATOM records of a molecule to an open binary file.
+
+    The records are formatted from the atom columns of _atom_chunks, with the
+    standard PDB columns: atom names aligned by element, chain identifier,
+    occupancy and temperature factor placeholders and element symbol. Serial
+    numbers past 99999 wrap around to keep their five columns.
+    Returns the serial number for the next atom.
+    """
+    for chunk in _atom_chunks(molecule, anum):
+        f.write(_format_records(
+            chunk["serials"] % 100000, chunk["fields"], chunk["resnames"],
+            chunk["chains"].astype("S1"), chunk["resnums"], chunk["coords"], chunk["elements"],
+        ))
+        anum += len(chunk["serials"])
+    return anum
+
+
+def _chain_chunks(chains, passthrough=None):
+    """
+    Yields the _atom_chunks of each chain, with serials running on across chains.
+
+    The columns of the passthrough records, if any, follow as a last chunk.
+    """
+    anum = 1
+    for chain in chains:
+        for chunk in _atom_chunks(chain, anum):
+            yield chunk
+            anum += len(chunk["serials"])
+    if passthrough is not None and len(passthrough):
+        yield _passthrough_chunk(passthrough, anum)
+
+
+def _atom_chunks(molecule, anum=1):
+    """
+    Yields the columns of the atom records of a molecule, WRITE_CHUNK_SIZE atoms at a time.
+
+    Each chunk is a dict of arrays with one entry per atom, in output order:
+    ``serials`` (numbered from ``anum``), ``names``, ``fields`` (the name as
+    aligned in a PDB atom name field), ``elements`` (right-aligned in two
+    columns), ``resnames``, ``chains``, ``resnums``, ``seqs`` (the position of
+    the residue in the chain, from 1) and ``coords``. Both the PDB and the mmCIF
+    writers format their records from these columns.
+    """
+    order, offsets = molecule.residue_offsets()
+    residues = molecule.residues
+    sizes = np.diff(offsets)
+    resnames = np.repeat(np.array([res.name for res in residues], dtype="S3"), sizes)
+    chains = np.repeat(np.array([res.chain for res in residues], dtype="S"), sizes)
+    resnums = np.repeat(np.array([res.num for res in residues], dtype=np.int64), sizes)
+    seqs = np.repeat(np.array([res.locnum for res in residues], dtype=np.int64), sizes)
+    names, fields, elements = _name_columns(molecule.atom_names)
+    codes = molecule.atom_name_codes[order]
+    coords = molecule.atom_coords[order].astype(np.float64)
+
+    for lo in range(0, len(order), WRITE_CHUNK_SIZE):
+        hi = min(lo + WRITE_CHUNK_SIZE, len(order))
+        chunk = slice(lo, hi)
+        name = names[codes[chunk]]
+        field = fields[codes[chunk]]
+        element = elements[codes[chunk]]
+        # Ions are named after their residue, and so is their element.
+        ion = name == resnames[chunk]
+        if ion.any():
+            field[ion] = np.char.ljust(name[ion], 4)
+            element[ion] = np.char.rjust(np.char.upper(name[ion]), 2)
+        yield {
+            "serials": np.arange(anum + lo, anum + hi),
+            "names": name,
+            "fields": field,
+            "elements": element,
+            "resnames": resnames[chunk],
+            "chains": chains[chunk],
+            "resnums": resnums[chunk],
+            "seqs": seqs[chunk],
+            "coords": coords[chunk],
+        }
+
+
+def _passthrough_chunk(passthrough, anum):
+    """
+    Returns the mmCIF columns of passthrough PDB records, numbered from ``anum``.
+
+    The chunk has the columns of _atom_chunks except ``fields`` and ``seqs``, as
+    passthrough residues are not part of the polymer, plus the ``groups``,
+    ``altlocs``, ``icodes``, ``occupancies`` and ``bfactors`` of the records.
+    Elements left blank in the records are guessed from the atom names.
+    """
+    rows = fixed_width(passthrough.data, passthrough.starts, passthrough.ends, 0, 78)
+    chunk = {
+        key: np.strings.strip(field(rows, lo, hi)) for key, (lo, hi) in PASSTHROUGH_COLUMNS.items()
+    }
+    blank = chunk["elements"] == b""
+    if blank.any():
+        chunk["elements"][blank] = [
+            name.lstrip(b"0123456789")[:1] or b"X" for name in chunk["names"][blank].tolist()
+        ]
+    chunk["serials"] = np.arange(anum, anum + len(passthrough))
+    chunk["resnums"] = chunk["resnums"].astype(np.int64)
+    chunk["coords"] = np.column_stack(
+        [field(rows, lo, lo + 8).astype(np.float64) for lo in (30, 38, 46)]
+    )
+    return chunk
+
+
+def _name_columns(atom_names):
+    """
+    Returns the names, atom name fields and element fields of a list of atom names.
+
+    Names shorter than four characters whose element has one letter start in
+    the second column of the field, as in " CA "; other names start in the first.
+    """
+    names = np.array(atom_names, dtype="S4")
+    fields = []
+    elements = []
+    for name in atom_names:
+        element = name.lstrip("0123456789")[:1].upper() or "X"
+        fields.append(f" {name:<3s}" if len(name) < 4 and name[:1] == element else f"{name:<4s}")
+        elements.append(f"{element:>2s}")
+    return names, np.array(fields, dtype="S4"), np.array(elements, dtype="S2")
+
+
+def _format_records(serials, names, resnames, chains, resnums, coords, elements):
+    """
+    Formats ATOM records into bytes, one 80-column line per atom.
+
+    The lines are assembled in a byte matrix. Numbers are written digit by digit
+    with array arithmetic. Rows a fixed-width field cannot hold, and coordinates
+    too close to a rounding tie to be sure of the last digit, are formatted with
+    Python instead, so the output is the same as "%8.3f" formatting.
+    """
+    n = len(serials)
+    rows = np.full((n, RECORD_WIDTH), SPACE, dtype=np.uint8)
+    rows[:, 0:6] = np.frombuffer(b"ATOM  ", dtype=np.uint8)
+    rows[:, 12:16] = bytes_matrix(names, 4)
+    rows[:, 17:20] = bytes_matrix(np.char.rjust(resnames, 3), 3)
+    rows[:, 21:22] = bytes_matrix(np.char.rjust(chains, 1), 1)
+    rows[:, 54:66] = np.frombuffer(b"  1.00  0.00", dtype=np.uint8)
+    rows[:, 76:78] = bytes_matrix(elements, 2)
+    rows[:, 80] = ord("\n")
+
+    put_int(rows, serials, 6, 5)
+    put_int(rows, resnums, 22, 4)
+    slow = (resnums > 9999) | (resnums < -999)
+    for axis, lo in enumerate((30, 38, 46)):
+        slow |= put_decimal(rows, coords[:, axis], lo, 8)
+
+    if not slow.any():
+        return rows.tobytes()
+    lines = [row.tobytes() for row in rows]
+    for i in np.flatnonzero(slow).tolist():
+        x, y, z = coords[i].tolist()
+        lines[i] = (
+            f"ATOM  {serials[i]:5d} {names[i].decode():4s} {resnames[i].decode():>3s} "
+            f"{chains[i].decode():1s}{resnums[i]:4d}    {x:8.3f}{y:8.3f}{z:8.3f}"
+            f"  1.00  0.00          {elements[i].decode():>2s}  \n"
+        ).encode()
+    return b"".join(lines)
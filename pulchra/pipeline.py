@@ -0,0 +1,109 @@
+from functools import partial
+
+import numpy as np
+
+from . import core
+from .pdb_datastructures import CATrace
+from .pdb_writer import TrajectoryWriter
+
+# Keyword options of rebuild, named after the command-line flags that set them.
+REBUILD_OPTIONS = (
+    "no_ca_optimize",
+    "ca_trajectory",
+    "ini_file",
+    "cispro",
+    "ca_random",
+    "ca_start_dist",
+    "no_rebuild_bb",
+    "no_rebuild_sc",
+    "add_hydrogens",
+    "float32",
+)
+
+
+def rebuild(
+    molecule,
+    no_ca_optimize=False,
+    ca_trajectory=None,
+    ini_file=None,
+    cispro=False,
+    ca_random=False,
+    ca_start_dist=3.0,
+    no_rebuild_bb=False,
+    no_rebuild_sc=False,
+    add_hydrogens=False,
+    float32=False,
+):
+    """
+    Runs the reconstruction stages on a molecule, in place, and returns it.
+
+    The options mirror the command-line flags of pulchra.py. ``molecule`` may
+    also be a CATrace: the C-alpha stages then work on its coordinate array and
+    the rebuilt atoms are returned as a new Molecule. With ``float32`` the
+    coordinates are converted to single precision first, and the stages that
+    work on arrays compute in it.
+
+    ``ca_trajectory`` is a TrajectoryWriter, or a path to write the C-alpha
+    optimization trajectory to as a multi-model PDB file.
+    """
+    trace = molecule if isinstance(molecule, CATrace) else None
+    if float32:
+        molecule.set_precision(np.float32)
+    if not no_ca_optimize:
+        trajectory = ca_trajectory or None
+        if trajectory is not None and not isinstance(trajectory, TrajectoryWriter):
+            trajectory = TrajectoryWriter(trajectory)
+        try:
+            core.ca_optimize(
+                chain=molecule,
+                ca_trajectory=trajectory,
+                ini_file=ini_file,
+                cispro=cispro,
+                ca_random=ca_random,
+                ca_start_dist=ca_start_dist
+            )
+        finally:
+            if trajectory is not None and trajectory is not ca_trajectory:
+                trajectory.close()
+
+    if trace is not None:
+        molecule = trace.to_molecule()
+
+    c_alpha, rbins = None, None
+    if not no_rebuild_bb:
+        c_alpha, rbins = core.rebuild_backbone(
+            molecule, ca_coords=None if trace is None else trace.coords
+        )
+
+    if not no_rebuild_sc and c_alpha and rbins:
+        core.rebuild_sidechains(molecule, c_alpha, rbins)
+
+    if add_hydrogens:
+        core.add_hydrogens(molecule)
+
+    return molecule
+
+
+def rebuild_chains(chains, executor=None, **options):
+    """
+    Reconstructs each chain independently and returns the rebuilt chains in order.
+
+    Chains without any C-alpha atom (ligands, waters, ions) are returned as they
+    are. With a concurrent.futures ``executor`` the chains are rebuilt in parallel.
+    """
+    chains = list(chains)
+    todo = [i for i, chain in enumerate(chains) if _has_c_alpha(chain)]
+    run = partial(rebuild, **options)
+    if executor is None:
+        rebuilt = map(run, (chains[i] for i in todo))
+    else:
+        rebuilt = executor.map(run, [chains[i] for i in todo])
+    for i, chain in zip(todo, rebuilt):
+        chains[i] = chain
+    return chains
+
+
+def _has_c_alpha(chain):
+    if isinstance(chain, CATrace):
+        return len(chain) > 0
+    return any(atom.name == "CA" for res in chain.residues for atom in res.atoms)
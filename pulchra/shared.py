@@ -0,0 +1,68 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .pdb_datastructures import Molecule
+
+# Byte alignment of each array in a shared block.
+ALIGNMENT = 64
+
+
+def share_buffers(buffers):
+    """
+    Copies a dict of arrays into one new shared memory block.
+
+    Returns the SharedMemory and its layout, a small picklable dict mapping
+    each key to the (dtype, shape, offset) of its array in the block. Another
+    process passes the block name and the layout to attach_buffers. The caller
+    owns the block: it closes and unlinks it once the other processes are done.
+    """
+    layout = {}
+    size = 0
+    for key, array in buffers.items():
+        size = -(-size // ALIGNMENT) * ALIGNMENT
+        layout[key] = (array.dtype.str, array.shape, size)
+        size += array.nbytes
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for key, array in buffers.items():
+        _view(block, layout[key])[...] = array
+    return block, layout
+
+
+def attach_buffers(name, layout):
+    """
+    Attaches to a shared memory block written by share_buffers.
+
+    Returns the SharedMemory and a dict of arrays that are views of it; the
+    arrays must not be used after the block is closed.
+    """
+    block = shared_memory.SharedMemory(name=name)
+    return block, {key: _view(block, spec) for key, spec in layout.items()}
+
+
+def share_molecule(molecule):
+    """
+    Copies a Molecule into a new shared memory block, as share_buffers.
+    """
+    return share_buffers(molecule.to_buffers())
+
+
+def attach_molecule(name, layout):
+    """
+    Rebuilds a Molecule from a shared memory block written by share_molecule.
+
+    The molecule has its own copy of the data, so the block is closed (but not
+    unlinked) before returning.
+    """
+    block, buffers = attach_buffers(name, layout)
+    try:
+        molecule = Molecule.from_buffers(buffers)
+    finally:
+        del buffers
+        block.close()
+    return molecule
+
+
+def _view(block, spec):
+    dtype, shape, offset = spec
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf, offset=offset)
@@ -0,0 +1,91 @@
+"""
+Times the backbone reconstruction stage.
+
+Reports the time to pick the NCO fragment of every bin triple by scanning the
+fragment table, as rebuild_backbone did, against looking it up in the
+precompiled grids. Then, for a synthetic C-alpha trace tiled from
+``c_legacy/examples/model.pdb``, the time to compute the distance bins of every
+residue one at a time, as rebuild_backbone did, against core._distance_bins,
+and the residues per second of the whole rebuild_backbone stage.
+Run from the repository root with ``python -m scripts.bench_backbone [nresidues]``.
+"""
+import contextlib
+import io
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from pulchra import core
+from pulchra.data import NCO_STAT
+from pulchra.geometry import calc_distance, calc_r14
+from pulchra.pdb_parser import read_pdb_file
+from scripts.bench_utils import PROJECT_ROOT, best_time, write_synthetic_pdb
+
+CA_PDB = PROJECT_ROOT / "c_legacy/examples/model.pdb"
+
+
+def scan(bin13_1, bin13_2, bin14):
+    """Picks the best NCO fragment by scanning the table, as rebuild_backbone used to."""
+    besthit = 1000.0
+    bestpos = 0
+    for j, (bins, _) in enumerate(NCO_STAT):
+        hit = abs(bins[0] - bin13_1) + abs(bins[1] - bin13_2) + 0.2 * abs(bins[2] - bin14)
+        if hit < besthit:
+            besthit = hit
+            bestpos = j
+    return bestpos
+
+
+def bins_per_residue(ca):
+    """Computes the distance bins one window at a time, as rebuild_backbone used to."""
+    rbins = []
+    for i in range(len(ca) - 3):
+        p1, p2, p3, p4 = (np.array(row) for row in ca[i:i + 4])
+        bin13_1 = min(max(int((calc_distance(p1, p3) - 4.6) / 0.3), 0), 9)
+        bin13_2 = min(max(int((calc_distance(p2, p4) - 4.6) / 0.3), 0), 9)
+        bin14 = min(max(int((calc_r14(p1, p2, p3, p4) + 11.0) / 0.3), 0), 73)
+        rbins.append([bin13_1, bin13_2, bin14])
+    return rbins
+
+
+def main():
+    """Times fragment selection, distance binning and the whole of rebuild_backbone."""
+    nresidues = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    triples = list(np.ndindex(*core.NCO_BINS))
+    grid = core._nco_grids()[0]
+    runs = [
+        ("table scan", lambda: [scan(*bins) for bins in triples]),
+        ("grid lookup", lambda: [int(grid[bins]) for bins in triples]),
+    ]
+    print(f"NCO fragment selection, {len(triples)} bin triples")
+    for label, func in runs:
+        elapsed = best_time(func)
+        print(f"  {label:<14s} {elapsed * 1e3:9.2f} ms  {len(triples) / elapsed:12,.0f} lookups/s")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = write_synthetic_pdb(Path(tmpdir) / "trace.pdb", nresidues, template=CA_PDB)
+        molecule = read_pdb_file(path, path.name)
+
+    ca = molecule.coords.tolist()
+    print(f"Distance bins, {len(ca) - 3} windows")
+    for label, func in [
+        ("per residue", lambda: bins_per_residue(ca)),
+        ("vectorized", lambda: core._distance_bins(np.array(ca))),
+    ]:
+        elapsed = best_time(func)
+        rate = (len(ca) - 3) / elapsed
+        print(f"  {label:<14s} {elapsed * 1e3:9.2f} ms  {rate:12,.0f} residues/s")
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            core.rebuild_backbone(molecule.fork())
+
+    elapsed = best_time(run)
+    print(f"rebuild_backbone, {molecule.nres} residues")
+    print(f"  {elapsed * 1e3:9.1f} ms  {molecule.nres / elapsed:12,.0f} residues/s")
+
+
+if __name__ == "__main__":
+    main()
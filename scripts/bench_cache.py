@@ -0,0 +1,37 @@
+"""
+Compares parsing a PDB file with reloading it from the structure cache.
+
+Reports the time of read_pdb_table without a cache, on a cache miss (parse and
+store) and on a hit (hash and memory-map) for a synthetic file. Run from the
+repository root with ``python -m scripts.bench_cache [natoms]``.
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from pulchra.cache import StructureCache
+from pulchra.pdb_parser import read_pdb_table
+from scripts.bench_utils import best_time, write_synthetic_pdb
+
+
+def main():
+    """Times parsing and cache misses and hits on a synthetic file."""
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        path = write_synthetic_pdb(tmpdir / "synthetic.pdb", natoms)
+        cache = StructureCache(tmpdir / "cache")
+        print(f"{path.name}: {natoms} atoms, {path.stat().st_size / 1e6:.1f} MB")
+
+        parse = best_time(lambda: read_pdb_table(path, all_chains=True))
+        start = time.perf_counter()
+        read_pdb_table(path, all_chains=True, cache=cache)
+        miss = time.perf_counter() - start
+        hit = best_time(lambda: read_pdb_table(path, all_chains=True, cache=cache))
+        for label, elapsed in (("parse", parse), ("cache miss", miss), ("cache hit", hit)):
+            print(f"  {label:<12s} {elapsed * 1e3:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
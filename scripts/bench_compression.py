@@ -0,0 +1,56 @@
+"""
+Compares reading and writing plain PDB files with gzip, bzip2 and xz ones.
+
+Reports MB/s of uncompressed text for read_pdb_table, the streaming model
+iterator and write_pdb (measured against the size of its plain output) on a
+synthetic file. Run from the repository root with
+``python -m scripts.bench_compression [natoms]``.
+"""
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from pulchra.compression import open_output
+from pulchra.pdb_parser import iter_model_tables, read_pdb_table
+from pulchra.pdb_writer import write_pdb
+from scripts.bench_utils import best_time, write_synthetic_pdb
+
+SUFFIXES = ["", ".gz", ".bz2", ".xz"]
+
+
+def main():
+    """Times reading and writing each compression format on a synthetic file."""
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        plain = write_synthetic_pdb(tmpdir / "synthetic.pdb", natoms)
+        size_mb = plain.stat().st_size / 1e6
+        molecule = read_pdb_table(plain).to_molecule("bench")
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            write_pdb(molecule, tmpdir / "out.pdb")
+        out_mb = (tmpdir / "out.pdb").stat().st_size / 1e6
+        print(f"{plain.name}: {natoms} atoms, {size_mb:.1f} MB uncompressed")
+
+        for suffix in SUFFIXES:
+            path = tmpdir / f"synthetic.pdb{suffix}"
+            if suffix:
+                with open(plain, "rb") as src, open_output(path, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+            read = best_time(lambda: read_pdb_table(path))
+            stream = best_time(lambda: sum(len(table) for _, table in iter_model_tables(path)))
+            out = tmpdir / f"out.pdb{suffix}"
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                write = best_time(lambda: write_pdb(molecule, out))
+            print(
+                f"  {suffix or 'plain':<6s} {path.stat().st_size / 1e6:7.1f} MB on disk"
+                f"  read {size_mb / read:7.1f} MB/s"
+                f"  stream {size_mb / stream:7.1f} MB/s"
+                f"  write {out_mb / write:7.1f} MB/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
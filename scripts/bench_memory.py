@@ -0,0 +1,58 @@
+"""
+Compares the peak resident memory of the PDB readers on a large synthetic file.
+
+Each reader runs in a fresh interpreter so its peak RSS (ru_maxrss) is measured
+in isolation; the size of the decoded AtomTable arrays is shown for reference.
+Run from the repository root with ``python -m scripts.bench_memory [natoms]``.
+"""
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from scripts.bench_utils import PROJECT_ROOT, write_synthetic_pdb
+
+READERS = {
+    "interpreter + numpy only": "pass",
+    "read_pdb_file (lines)": "read_pdb_file(path, 'bench', vectorized=False)",
+    "read_pdb_table": "table = read_pdb_table(path)",
+    "read_pdb_table (mmap)": "table = read_pdb_table(path, use_mmap=True)",
+}
+
+SCRIPT = """
+import resource, sys
+import numpy as np
+from pulchra.pdb_parser import read_pdb_file, read_pdb_table
+path = sys.argv[1]
+table = None
+{call}
+nbytes = sum(getattr(table, f).nbytes for f in table.FIELDS) if table is not None else 0
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, nbytes)
+"""
+
+
+def peak_rss(call, path):
+    """Runs one reader in a fresh interpreter and returns its peak RSS and table size."""
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(call=call), str(path)],
+        check=True, capture_output=True, text=True, cwd=PROJECT_ROOT,
+    )
+    maxrss_kib, nbytes = result.stdout.split()
+    return int(maxrss_kib) * 1024, int(nbytes)
+
+
+def main():
+    """Runs the benchmark on a synthetic file of the requested size."""
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = write_synthetic_pdb(Path(tmpdir) / "synthetic.pdb", natoms)
+        size = path.stat().st_size
+        print(f"{path.name}: {natoms} atoms, {size / 2**20:.1f} MiB")
+        for label, call in READERS.items():
+            rss, nbytes = peak_rss(call, path)
+            arrays = f"  (arrays {nbytes / 2**20:7.1f} MiB)" if nbytes else ""
+            print(f"  {label:<28s} peak RSS {rss / 2**20:8.1f} MiB{arrays}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Compares reading and writing mmCIF files with PDB files of the same atoms.
+
+Reports records per second for read_pdb_table and write_pdb on a synthetic
+file written in both formats (kept under 100k atoms, the
+limit of the five-column PDB serial). Run from the repository root with
+``python -m scripts.bench_mmcif [natoms]``.
+"""
+import contextlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from pulchra.pdb_parser import read_pdb_chains, read_pdb_table
+from pulchra.pdb_writer import write_pdb
+from scripts.bench_utils import best_time, write_synthetic_pdb
+
+
+def main():
+    """Times reading and writing both formats on a synthetic file."""
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 90_000
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        source = write_synthetic_pdb(tmpdir / "synthetic.pdb", natoms)
+        chains = read_pdb_chains(source, "bench")
+        print(f"{source.name}: {natoms} atoms")
+        for suffix in (".pdb", ".cif"):
+            path = tmpdir / f"out{suffix}"
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                write = best_time(lambda: write_pdb(chains, path))
+            read = best_time(lambda: read_pdb_table(path, all_chains=True))
+            print(
+                f"  {suffix:<5s} {path.stat().st_size / 1e6:7.1f} MB"
+                f"  read {natoms / read:12,.0f} records/s"
+                f"  write {natoms / write:12,.0f} records/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Compares serial and multi-process parsing of a large PDB file.
+
+Reports records per second for read_pdb_table with 1, 2, 4 and 8 workers on a
+synthetic file. Run from the repository root with
+``python -m scripts.bench_parallel [natoms]``.
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+from pulchra.pdb_parser import read_pdb_table
+from scripts.bench_utils import best_time, write_synthetic_pdb
+
+
+def main():
+    """Times read_pdb_table with each number of workers on a synthetic file."""
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = write_synthetic_pdb(Path(tmpdir) / "synthetic.pdb", natoms)
+        print(f"{path.name}: {natoms} atoms, {path.stat().st_size / 1e6:.1f} MB")
+        for workers in (1, 2, 4, 8):
+            elapsed = best_time(lambda: read_pdb_table(path, all_chains=True, workers=workers))
+            print(
+                f"  workers={workers:<3d} {elapsed * 1e3:9.2f} ms"
+                f"  {natoms / elapsed:12,.0f} records/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Compares the line-based and vectorized PDB parsers and the C-alpha loader.
+
+Reports records per second for ``tests/7laf.pdb`` and a synthetic 100k-atom
+file. Run from the repository root with ``python -m scripts.bench_parser``.
+"""
+import tempfile
+from pathlib import Path
+
+from pulchra.pdb_parser import read_ca_trace, read_pdb_file, read_pdb_table
+from scripts.bench_utils import PROJECT_ROOT, best_time, write_synthetic_pdb
+
+
+def bench_file(path):
+    """Times each parser on one file."""
+    nrecords = len(read_pdb_table(path))
+    runs = [
+        ("read_pdb_file (lines)", lambda: read_pdb_file(path, path.name, vectorized=False)),
+        ("read_pdb_file (vectorized)", lambda: read_pdb_file(path, path.name)),
+        ("read_pdb_table", lambda: read_pdb_table(path)),
+        ("read_ca_trace", lambda: read_ca_trace(path, path.name)),
+    ]
+    print(f"{path.name}: {nrecords} records")
+    for label, func in runs:
+        elapsed = best_time(func)
+        print(f"  {label:<28s} {elapsed * 1e3:9.2f} ms  {nrecords / elapsed:12,.0f} records/s")
+
+
+def main():
+    """Runs the benchmark on the bundled and synthetic files."""
+    bench_file(PROJECT_ROOT / "tests/7laf.pdb")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        bench_file(write_synthetic_pdb(Path(tmpdir) / "synthetic_100k.pdb", 100_000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Compares ways of handing a Molecule to another process.
+
+Reports the payload size and the time to serialize and rebuild a molecule
+read from a synthetic file with:
+
+- pickle of the object graph (residues and atom views), as Molecule was
+  pickled before it reduced to its buffers;
+- pickle, which now goes through Molecule.to_buffers/from_buffers;
+- a shared memory block written by share_molecule and read back by
+  attach_molecule.
+
+Run from the repository root with ``python -m scripts.bench_transfer [natoms]``.
+"""
+import copyreg
+import io
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+
+from pulchra.pdb_datastructures import Atom, Molecule, Residue
+from pulchra.pdb_parser import read_pdb_file
+from pulchra.shared import attach_molecule, share_molecule
+from scripts.bench_utils import best_time, write_synthetic_pdb
+
+
+def _reduce_slots(obj):
+    """Reduces a slotted object to its slot values, as pickle does for a __dict__."""
+    state = {
+        name: getattr(obj, name)
+        for cls in type(obj).__mro__ for name in getattr(cls, "__slots__", ())
+        if hasattr(obj, name)
+    }
+    return copyreg.__newobj__, (type(obj),), (None, state)
+
+
+def dumps_graph(molecule):
+    """Pickles a molecule as the graph of its objects."""
+    out = io.BytesIO()
+    pickler = pickle.Pickler(out, pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = copyreg.dispatch_table.copy()
+    for cls in (Molecule, Residue, Atom):
+        pickler.dispatch_table[cls] = _reduce_slots
+    pickler.dump(molecule)
+    return out.getvalue()
+
+
+def shared_round_trip(molecule):
+    """Copies a molecule into shared memory and attaches a copy of it."""
+    block, layout = share_molecule(molecule)
+    try:
+        return attach_molecule(block.name, layout)
+    finally:
+        block.close()
+        block.unlink()
+
+
+def main():
+    """Times each way of sending a synthetic molecule to another process."""
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 100_000))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = write_synthetic_pdb(Path(tmpdir) / "synthetic.pdb", natoms)
+        molecule = read_pdb_file(path, path.name)
+    print(f"{natoms} atoms, {molecule.nres} residues")
+
+    graph = dumps_graph(molecule)
+    flat = pickle.dumps(molecule, pickle.HIGHEST_PROTOCOL)
+    rows = [
+        ("pickle, object graph", len(graph),
+         best_time(lambda: pickle.loads(dumps_graph(molecule)))),
+        ("pickle, buffers", len(flat),
+         best_time(lambda: pickle.loads(pickle.dumps(molecule, pickle.HIGHEST_PROTOCOL)))),
+        ("shared memory", sum(array.nbytes for array in molecule.to_buffers().values()),
+         best_time(lambda: shared_round_trip(molecule))),
+    ]
+    for label, size, seconds in rows:
+        print(f"  {label:<22s} {size / 1e6:8.2f} MB  {seconds * 1e3:8.1f} ms round trip")
+
+
+if __name__ == "__main__":
+    main()
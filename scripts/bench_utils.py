@@ -0,0 +1,68 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Run the benchmarks from the repository root as modules, e.g.
+``python -m scripts.bench_parser``.
+"""
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+TEMPLATE_PDB = PROJECT_ROOT / "tests/7laf.pdb"
+CHAIN_IDS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def write_synthetic_pdb(path, natoms, template=TEMPLATE_PDB):
+    """
+    Writes a PDB file with ``natoms`` ATOM records tiled from ``template``.
+
+    The protein atoms of the template are copied with serials and residues
+    renumbered, and each copy is shifted in space.
+
+    A new chain ID is used whenever the residue numbers would overflow their four
+    columns. The file is written as it is generated, so the generator itself stays
+    small in memory.
+    """
+    template_lines = [
+        line for line in Path(template).read_text().splitlines() if line.startswith("ATOM")
+    ]
+    template_resnums = sorted({int(line[22:26]) for line in template_lines})
+    residues_per_copy = len(template_resnums)
+    resnum_offset = {num: i for i, num in enumerate(template_resnums)}
+
+    serial = 0
+    copy = 0
+    chain = 0
+    with open(path, "w") as out:
+        while serial < natoms:
+            base = copy * residues_per_copy
+            if base + residues_per_copy > 9999:
+                copy = 0
+                base = 0
+                chain = (chain + 1) % len(CHAIN_IDS)
+            shift = 10.0 * (copy % 50)
+            for line in template_lines:
+                if serial >= natoms:
+                    break
+                serial += 1
+                resnum = base + resnum_offset[int(line[22:26])] + 1
+                x = float(line[30:38]) + shift
+                y = float(line[38:46])
+                z = float(line[46:54]) - shift
+                out.write(
+                    f"ATOM  {serial % 100000:5d} {line[12:16]}{line[16:21]}{CHAIN_IDS[chain]}"
+                    f"{resnum:4d}    {x:8.3f}{y:8.3f}{z:8.3f}{line[54:]}\n"
+                )
+            copy += 1
+        out.write("END\n")
+    return Path(path)
+
+
+def best_time(func, repeat=3):
+    """Returns the best wall-clock time, in seconds, of ``repeat`` calls to ``func``."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
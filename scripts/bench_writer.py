@@ -0,0 +1,50 @@
+"""
+Compares the per-atom and bulk PDB writers.
+
+Writes a molecule read from a synthetic file with one formatted f.write per
+atom, as write_pdb did before, and with write_pdb, which formats the ATOM
+records from the atom buffers in bulk. Reports lines written per second.
+Run from the repository root with ``python -m scripts.bench_writer [natoms]``.
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+from pulchra.pdb_parser import read_pdb_table
+from pulchra.pdb_writer import write_pdb
+from scripts.bench_utils import best_time, write_synthetic_pdb
+
+
+def write_per_atom(molecule, path):
+    """Writes the ATOM records one f-string at a time."""
+    with open(path, "w") as f:
+        f.write("REMARK 999 REBUILT BY PULCHRA V.3.04\n")
+        anum = 1
+        for res in molecule.residues:
+            for atom in res.atoms:
+                f.write(
+                    f"ATOM  {anum:5d} {atom.name:<4s} {res.name:<3s}  {res.num:4d}    "
+                    f"{atom.x:8.3f}{atom.y:8.3f}{atom.z:8.3f}\n"
+                )
+                anum += 1
+        f.write("TER\nEND\n")
+
+
+def main():
+    """Times the bulk writer against one f.write per atom on a synthetic molecule."""
+    natoms = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = write_synthetic_pdb(Path(tmpdir) / "synthetic.pdb", natoms)
+        molecule = read_pdb_table(path, all_chains=True).to_molecule(path.name)
+        print(f"{natoms} atoms, {molecule.nres} residues")
+        out = Path(tmpdir) / "out.pdb"
+        for label, func in [
+            ("f.write per atom", lambda: write_per_atom(molecule, out)),
+            ("write_pdb (bulk)", lambda: write_pdb(molecule, out)),
+        ]:
+            elapsed = best_time(func)
+            print(f"  {label:<20s} {elapsed * 1e3:9.1f} ms  {natoms / elapsed:12,.0f} lines/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import numpy as np
+
+
+def assert_same_table(table, expected, fields=None):
+    """
+    Asserts that two AtomTables hold the same columns, all of them by default.
+    """
+    for field in expected.FIELDS if fields is None else fields:
+        assert np.array_equal(getattr(table, field), getattr(expected, field)), field
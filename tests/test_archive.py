@@ -0,0 +1,118 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pulchra.archive import ArchiveWriter, read_archive, write_archive, write_archive_models
+from pulchra.pdb_parser import iter_models, read_pdb_chains, read_pdb_file
+from pulchra.pdb_writer import format_pdb
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INPUT_PDB = PROJECT_ROOT / "tests/7laf.pdb"
+CA_PDB = PROJECT_ROOT / "c_legacy/examples/model.pdb"
+TRAJECTORY = PROJECT_ROOT / "c_legacy/examples/model.pdb.tra"
+
+
+def test_archive_round_trip(tmp_path):
+    molecule = read_pdb_file(INPUT_PDB, "7laf")
+    write_archive(molecule, tmp_path / "7laf.coords")
+    archive = read_archive(tmp_path / "7laf.coords")
+
+    assert isinstance(archive.coords, np.memmap)
+    assert (len(archive), archive.natoms, archive.version) == (1, molecule.natoms, 1)
+    assert format_pdb(archive.molecule(0)) == format_pdb(molecule)
+    # The arrays load with NumPy alone.
+    order, _ = molecule.residue_offsets()
+    assert np.array_equal(np.load(tmp_path / "7laf.coords/coords.npy")[0], molecule.coords[order])
+    assert np.load(tmp_path / "7laf.coords/res_chain.npy").tolist() == (
+        [res.chain for res in molecule.residues]
+    )
+
+
+def test_chains_are_joined_into_one_frame(tmp_path):
+    chains, _ = read_pdb_chains(INPUT_PDB, "7laf", passthrough=True)
+    write_archive(chains, tmp_path / "7laf.coords")
+    molecule = read_archive(tmp_path / "7laf.coords").molecule()
+
+    assert [res.chain for res in molecule.residues] == (
+        [res.chain for chain in chains for res in chain.residues]
+    )
+    assert [atom.name for res in molecule.residues for atom in res.atoms] == (
+        [atom.name for chain in chains for res in chain.residues for atom in res.atoms]
+    )
+
+
+@pytest.mark.parametrize("dtype, tolerance", [("float32", 1e-4), ("float16", 0.04)])
+def test_quantized_coordinates(tmp_path, dtype, tolerance):
+    molecule = read_pdb_file(CA_PDB, "model")
+    write_archive(molecule, tmp_path / "model.coords", dtype)
+    archive = read_archive(tmp_path / "model.coords", mmap=False)
+
+    assert archive.coords.dtype == np.dtype(dtype)
+    assert np.abs(archive.coords[0] - molecule.coords).max() < tolerance
+    assert archive.molecule().coords.dtype == np.float32
+
+
+def test_frames_are_appended(tmp_path):
+    models = list(iter_models(TRAJECTORY, TRAJECTORY.name))
+    path = tmp_path / "model.coords"
+    write_archive_models(models[:3], path, "float32")
+    files = {name.name: name.read_bytes() for name in path.iterdir() if name.name != "coords.npy"}
+    writer = ArchiveWriter(path)
+    for molecule in models[3:]:
+        writer.append(molecule)
+    archive = read_archive(path)
+
+    assert len(archive) == writer.nframes == len(models)
+    assert np.allclose(archive.coords, [molecule.coords for molecule in models], atol=1e-4)
+    assert archive.molecule(4).model == 5
+    assert files == {name: (path / name).read_bytes() for name in files}
+    with pytest.raises(ValueError):
+        ArchiveWriter(path, "float64")
+    with pytest.raises(ValueError):
+        writer.append(read_pdb_file(INPUT_PDB, "7laf"))
+
+
+def test_partial_frames_are_overwritten(tmp_path):
+    models = list(iter_models(TRAJECTORY, TRAJECTORY.name))
+    path = tmp_path / "model.coords"
+    write_archive_models(models[:2], path)
+    # What an append that failed between writing the frame and the header leaves.
+    with open(path / "coords.npy", "ab") as f:
+        f.write(b"\0" * 1000)
+    ArchiveWriter(path).append(models[2])
+    archive = read_archive(path)
+
+    assert len(archive) == 3
+    assert np.array_equal(archive.coords, [molecule.coords for molecule in models[:3]])
+    assert (path / "coords.npy").stat().st_size == archive.coords.offset + archive.coords.nbytes
+
+
+def test_newer_versions_are_refused(tmp_path):
+    write_archive(read_pdb_file(CA_PDB, "model"), tmp_path / "model.coords")
+    info_path = tmp_path / "model.coords/format.json"
+    info = json.loads(info_path.read_text())
+    info_path.write_text(json.dumps(dict(info, version=info["version"] + 1)))
+
+    with pytest.raises(ValueError, match="version"):
+        read_archive(tmp_path / "model.coords")
+
+
+def test_cli_writes_archive(tmp_path):
+    path = tmp_path / "model.pdb"
+    path.write_bytes(CA_PDB.read_bytes())
+    command = [sys.executable, str(PROJECT_ROOT / "pulchra.py"), "-c", str(path)]
+    subprocess.run(command, check=True, capture_output=True, cwd=PROJECT_ROOT)
+    subprocess.run(
+        command + ["--output", str(tmp_path / "model.coords")],
+        check=True, capture_output=True, cwd=PROJECT_ROOT,
+    )
+
+    rebuilt = read_pdb_file(tmp_path / "model.rebuilt.pdb", "model")
+    archive = read_archive(tmp_path / "model.coords")
+    assert format_pdb(archive.molecule()) == (tmp_path / "model.rebuilt.pdb").read_bytes()
+    # The archive atoms are in file order.
+    assert np.allclose(archive.coords[0], rebuilt.coords, atol=5e-4)
@@ -0,0 +1,58 @@
+import contextlib
+import io
+from pathlib import Path
+
+import numpy as np
+
+from pulchra import core
+from pulchra.data import NCO_STAT, NCO_STAT_PRO
+from pulchra.geometry import calc_distance, calc_r14
+from pulchra.pdb_parser import read_pdb_file
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CA_PDB = PROJECT_ROOT / "c_legacy/examples/model.pdb"
+
+
+def _scan(table, bin13_1, bin13_2, bin14):
+    besthit = 1000.0
+    bestpos = 0
+    for j, (bins, _) in enumerate(table):
+        hit = abs(bins[0] - bin13_1) + abs(bins[1] - bin13_2) + 0.2 * abs(bins[2] - bin14)
+        if hit < besthit:
+            besthit = hit
+            bestpos = j
+    return bestpos
+
+
+def test_nco_grids_match_the_linear_scan():
+    for table, grid in zip((NCO_STAT, NCO_STAT_PRO), core._nco_grids()):
+        assert grid.shape == core.NCO_BINS
+        for bins in np.ndindex(*core.NCO_BINS):
+            assert grid[bins] == _scan(table, *bins)
+
+
+def test_distance_bins_match_per_residue_bins():
+    rng = np.random.default_rng(3)
+    ca = np.concatenate([
+        read_pdb_file(CA_PDB, "model").coords,
+        np.cumsum(rng.normal(0.0, 2.5, (300, 3)), axis=0),
+    ])
+    expected = []
+    for p1, p2, p3, p4 in zip(ca[:-3], ca[1:-2], ca[2:-1], ca[3:]):
+        bin13_1 = min(max(int((calc_distance(p1, p3) - 4.6) / 0.3), 0), 9)
+        bin13_2 = min(max(int((calc_distance(p2, p4) - 4.6) / 0.3), 0), 9)
+        bin14 = min(max(int((calc_r14(p1, p2, p3, p4) + 11.0) / 0.3), 0), 73)
+        expected.append([bin13_1, bin13_2, bin14])
+
+    assert core._distance_bins(ca) == expected
+
+
+def test_backbone_is_rebuilt_for_every_residue():
+    molecule = read_pdb_file(CA_PDB, "model")
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, rbins = core.rebuild_backbone(molecule)
+
+    assert len(rbins) == molecule.nres + 1
+    assert all(
+        [atom.name for atom in res.atoms][:4] == ["N", "CA", "C", "O"] for res in molecule.residues
+    )
@@ -0,0 +1,122 @@
+import contextlib
+import gzip
+import io
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pulchra.data import AA_MAP_3_TO_NUM
+from pulchra.pdb_datastructures import CATrace
+from pulchra.pdb_parser import (
+    iter_model_chains, parse_pdb_bytes, read_ca_chains, read_ca_trace, read_pdb_file,
+    read_pdb_table,
+)
+from pulchra.pdb_writer import write_pdb
+from pulchra.pipeline import rebuild
+
+from helpers import assert_same_table
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INPUT_PDB = PROJECT_ROOT / "tests/7laf.pdb"
+CA_PDB = PROJECT_ROOT / "c_legacy/examples/model.pdb"
+TRAJECTORY = PROJECT_ROOT / "c_legacy/examples/model.pdb.tra"
+
+CALCIUM = (
+    b"ATOM      1  CA  GLY A   1       1.000   2.000   3.000  1.00  0.00           C\n"
+    b"HETATM    2 CA    CA A   2       4.000   5.000   6.000  1.00  0.00          CA\n"
+    b"ATOM      3  CA  XYZ A   3       7.000   8.000   9.000  1.00  0.00           C\n"
+)
+
+
+def quietly(func, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(*args, **kwargs)
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_ca_only_matches_filtered_table(use_mmap):
+    full = read_pdb_table(INPUT_PDB, all_chains=True)
+    table = read_pdb_table(INPUT_PDB, use_mmap=use_mmap, all_chains=True, ca_only=True)
+
+    assert_same_table(table, full.take(full.c_alpha()))
+
+
+def test_ca_only_compressed_and_mmcif(tmp_path):
+    expected = read_pdb_table(INPUT_PDB, ca_only=True)
+    compressed = tmp_path / "7laf.pdb.gz"
+    compressed.write_bytes(gzip.compress(INPUT_PDB.read_bytes()))
+    cif = tmp_path / "7laf.cif"
+    quietly(write_pdb, read_pdb_file(INPUT_PDB, INPUT_PDB.name), cif)
+
+    assert_same_table(read_pdb_table(compressed, ca_only=True), expected)
+    table = read_pdb_table(cif, ca_only=True)
+    assert np.array_equal(table.coords, expected.coords)
+    assert np.array_equal(table.resname, expected.resname)
+
+
+def test_trace_arrays():
+    trace = read_ca_trace(INPUT_PDB, "7laf")
+    residues = [
+        res for res in read_pdb_file(INPUT_PDB, "7laf").residues
+        if any(atom.name == "CA" for atom in res.atoms)
+    ]
+
+    assert len(trace) == len(residues)
+    assert trace.coords.shape == (len(trace), 3) and trace.coords.flags.c_contiguous
+    assert trace.types.tolist() == [AA_MAP_3_TO_NUM[res.name] for res in residues]
+    assert trace.resnum.tolist() == [res.num for res in residues]
+    assert set(trace.chain.tolist()) == {b"A"}
+
+
+def test_calcium_and_unknown_residues():
+    trace = CATrace.from_table(parse_pdb_bytes(CALCIUM))
+
+    assert trace.resname.tolist() == [b"GLY", b"XYZ"]
+    assert trace.types.tolist() == [AA_MAP_3_TO_NUM["GLY"], AA_MAP_3_TO_NUM["UNK"]]
+    assert len(parse_pdb_bytes(CALCIUM, ca_only=True)) == 2
+
+
+def test_chains_without_c_alpha_are_dropped():
+    assert [len(trace) for trace in read_ca_chains(INPUT_PDB, "7laf")] == [41]
+
+
+@pytest.mark.parametrize("options", [{}, {"no_ca_optimize": True}, {"cispro": True}])
+def test_rebuild_from_trace_matches_molecule(options):
+    trace = read_ca_trace(CA_PDB, "model")
+    expected = quietly(rebuild, read_pdb_file(CA_PDB, "model"), **options)
+    molecule = quietly(rebuild, trace, **options)
+
+    assert molecule.nres == expected.nres
+    for res, other in zip(molecule.residues, expected.residues):
+        assert [atom.name for atom in res.atoms] == [atom.name for atom in other.atoms]
+        assert np.allclose(
+            [[atom.x, atom.y, atom.z] for atom in res.atoms],
+            [[atom.x, atom.y, atom.z] for atom in other.atoms],
+        )
+
+
+def test_model_traces():
+    models = list(iter_model_chains(TRAJECTORY, "model", ca_only=True))
+
+    assert [(chains[0].model, len(chains[0])) for chains in models] == [
+        (number, 209) for number in range(1, 8)
+    ]
+
+
+def test_cli_ca_only(tmp_path):
+    path = tmp_path / "model.pdb"
+    path.write_bytes(CA_PDB.read_bytes())
+    output = tmp_path / "model.rebuilt.pdb"
+
+    outputs = []
+    for flags in ([], ["--ca-only"]):
+        subprocess.run(
+            [sys.executable, str(PROJECT_ROOT / "pulchra.py"), "-c", *flags, str(path)],
+            check=True, capture_output=True, text=True, cwd=PROJECT_ROOT,
+        )
+        outputs.append(output.read_bytes())
+
+    assert outputs[0] == outputs[1]
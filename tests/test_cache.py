@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from pulchra.cache import StructureCache
+from pulchra.pdb_parser import read_ca_trace, read_pdb_chains, read_pdb_table
+
+from helpers import assert_same_table
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INPUT_PDB = PROJECT_ROOT / "tests/7laf.pdb"
+CA_PDB = PROJECT_ROOT / "c_legacy/examples/model.pdb"
+
+
+def test_hit_is_memory_mapped_and_equal(tmp_path):
+    cache = StructureCache(tmp_path / "cache")
+    expected = read_pdb_table(INPUT_PDB, all_chains=True)
+
+    first = read_pdb_table(INPUT_PDB, all_chains=True, cache=cache)
+    second = read_pdb_table(INPUT_PDB, all_chains=True, cache=cache)
+
+    assert_same_table(first, expected)
+    assert_same_table(second, expected)
+    assert isinstance(second.coords, np.memmap)
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+
+def test_key_follows_content_and_options(tmp_path):
+    cache = StructureCache(tmp_path / "cache")
+    copy = tmp_path / "copy.pdb"
+    copy.write_bytes(INPUT_PDB.read_bytes())
+
+    assert cache.key(copy) == cache.key(INPUT_PDB)
+    assert cache.key(INPUT_PDB, all_chains=True) != cache.key(INPUT_PDB)
+    copy.write_bytes(INPUT_PDB.read_bytes().replace(b"  CA  SER", b"  CB  SER", 1))
+    assert cache.key(copy) != cache.key(INPUT_PDB)
+
+
+def test_cached_readers_match_uncached(tmp_path):
+    cache = StructureCache(tmp_path / "cache")
+
+    for _ in range(2):
+        chains = read_pdb_chains(INPUT_PDB, "7laf", cache=cache)
+        trace = read_ca_trace(CA_PDB, "model", cache=cache)
+
+    expected = read_pdb_chains(INPUT_PDB, "7laf")
+    assert [chain.nres for chain in chains] == [chain.nres for chain in expected]
+    assert np.array_equal(trace.coords, read_ca_trace(CA_PDB, "model").coords)
+    assert trace.coords.flags.writeable
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    directory = tmp_path / "cache"
+    cache = StructureCache(directory)
+    read_pdb_table(INPUT_PDB, cache=cache)
+    entry_size = sum(path.stat().st_size for path in next(directory.iterdir()).iterdir())
+
+    cache = StructureCache(directory, max_bytes=2 * entry_size)
+    inputs = []
+    for i in range(3):
+        path = tmp_path / f"input{i}.pdb"
+        path.write_bytes(INPUT_PDB.read_bytes() + b"REMARK %d\n" % i)
+        inputs.append(path)
+    read_pdb_table(inputs[0], cache=cache)
+    read_pdb_table(inputs[1], cache=cache)
+    # Make input0's entry the most recently used one.
+    for entry in directory.iterdir():
+        os.utime(entry, (0, 0))
+    read_pdb_table(inputs[0], cache=cache)
+    read_pdb_table(inputs[2], cache=cache)
+
+    kept = {entry.name for entry in directory.iterdir()}
+    assert cache.key(inputs[0]) in kept
+    assert cache.key(inputs[2]) in kept
+    assert cache.key(inputs[1]) not in kept
+    assert cache.key(INPUT_PDB) not in kept
+
+
+def test_cli_cache(tmp_path):
+    path = tmp_path / "model.pdb"
+    path.write_bytes(CA_PDB.read_bytes())
+    output = tmp_path / "model.rebuilt.pdb"
+
+    outputs = []
+    for _ in range(2):
+        subprocess.run(
+            [sys.executable, str(PROJECT_ROOT / "pulchra.py"), "-c",
+             "--cache", str(tmp_path / "cache"), str(path)],
+            check=True, capture_output=True, text=True, cwd=PROJECT_ROOT,
+        )
+        outputs.append(output.read_bytes())
+
+    assert outputs[0] == outputs[1]
+    assert len(list((tmp_path / "cache").iterdir())) == 1
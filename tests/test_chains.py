@@ -0,0 +1,85 @@
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from pulchra.pdb_parser import parse_pdb_bytes, read_pdb_chains, read_pdb_table, iter_model_chains
+from pulchra.pipeline import rebuild_chains
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INPUT_PDB = PROJECT_ROOT / "tests/7laf.pdb"
+
+TWO_CHAINS = (
+    b"ATOM      1  CA  GLY A   1       1.000   2.000   3.000\n"
+    b"ATOM      2  CA  ALA A   2       4.000   5.000   6.000\n"
+    b"TER\n"
+    b"ATOM      3  CA  GLY     1       7.000   8.000   9.000\n"
+    b"TER\n"
+    b"ATOM      4  CA  GLY     1      10.000  11.000  12.000\n"
+    b"ATOM      5  CA  SER B   2      13.000  14.000  15.000\n"
+    b"END\n"
+    b"ATOM      6  CA  SER C   2      13.000  14.000  15.000\n"
+)
+
+
+def test_all_chains_reads_past_ter():
+    assert len(parse_pdb_bytes(TWO_CHAINS)) == 2
+
+    table = parse_pdb_bytes(TWO_CHAINS, all_chains=True)
+    assert table.serial.tolist() == [1, 2, 3, 4, 5]
+    assert table.segment.tolist() == [0, 0, 1, 2, 2]
+    # Chains break at each TER and where the chain identifier changes.
+    assert table.chain_starts().tolist() == [0, 2, 3, 4]
+    assert [chain.serial.tolist() for chain in table.split_chains()] == [[1, 2], [3], [4], [5]]
+
+
+def test_read_pdb_chains_splits_7laf():
+    chains = read_pdb_chains(INPUT_PDB, INPUT_PDB.name)
+
+    assert [{res.chain for res in chain.residues} for chain in chains] == [{"A"}, {"B"}]
+    assert sum(chain.nres for chain in chains) == read_pdb_table(INPUT_PDB).to_molecule("").nres
+    assert [res.name for res in chains[1].residues] == ["ILE", "MN", "XRP"]
+
+
+def test_mmap_reader_keeps_segments(tmp_path):
+    path = tmp_path / "chains.pdb"
+    path.write_bytes(TWO_CHAINS)
+
+    table = read_pdb_table(path, use_mmap=True, all_chains=True)
+    assert table.segment.tolist() == [0, 0, 1, 2, 2]
+
+
+def test_iter_model_chains():
+    path = PROJECT_ROOT / "c_legacy/examples/model.pdb.tra"
+    models = list(iter_model_chains(path, path.name))
+
+    assert len(models) == 7
+    assert all(len(chains) == 1 and chains[0].nres == 209 for chains in models)
+
+
+def test_parallel_rebuild_matches_serial():
+    serial = rebuild_chains(read_pdb_chains(INPUT_PDB, INPUT_PDB.name), no_ca_optimize=True)
+    with ProcessPoolExecutor(2) as executor:
+        parallel = rebuild_chains(
+            read_pdb_chains(INPUT_PDB, INPUT_PDB.name), executor, no_ca_optimize=True
+        )
+
+    def coords(chains):
+        return [(atom.name, atom.x, atom.y, atom.z)
+                for chain in chains for res in chain.residues for atom in res.atoms]
+
+    assert coords(parallel) == coords(serial)
+
+
+def test_cli_writes_every_chain(tmp_path):
+    input_path = tmp_path / "7laf.pdb"
+    input_path.write_bytes(INPUT_PDB.read_bytes())
+
+    subprocess.run(
+        [sys.executable, str(PROJECT_ROOT / "pulchra.py"), "-c", str(input_path)],
+        check=True, capture_output=True, text=True, cwd=PROJECT_ROOT,
+    )
+
+    output = (tmp_path / "7laf.rebuilt.pdb").read_text()
+    assert output.count("TER\n") == 2
+    assert " ILE B 676 " in output
@@ -0,0 +1,82 @@
+import bz2
+import gzip
+import lzma
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from pulchra.compression import detect_compression
+from pulchra.pdb_parser import read_pdb_file, read_pdb_table, iter_models, _read_pdb_table_stream
+from pulchra.pdb_writer import write_pdb
+
+from helpers import assert_same_table
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INPUT_PDB = PROJECT_ROOT / "tests/7laf.pdb"
+TRAJECTORY = PROJECT_ROOT / "c_legacy/examples/model.pdb.tra"
+
+FORMATS = [(".gz", gzip), (".bz2", bz2), (".xz", lzma)]
+
+
+def compress(source, target, module):
+    target.write_bytes(module.compress(source.read_bytes()))
+    return target
+
+
+@pytest.mark.parametrize("suffix, module", FORMATS)
+def test_compressed_input_matches_plain(tmp_path, suffix, module):
+    path = compress(INPUT_PDB, tmp_path / f"7laf.pdb{suffix}", module)
+
+    assert detect_compression(path) is module
+    assert_same_table(read_pdb_table(path), read_pdb_table(INPUT_PDB))
+    assert_same_table(
+        read_pdb_table(path, all_chains=True), read_pdb_table(INPUT_PDB, all_chains=True)
+    )
+    lines = read_pdb_file(path, path.name, vectorized=False)
+    assert lines.nres == read_pdb_file(INPUT_PDB, INPUT_PDB.name).nres
+
+
+def test_compression_is_detected_by_magic_bytes(tmp_path):
+    path = compress(INPUT_PDB, tmp_path / "misnamed.pdb", gzip)
+
+    assert_same_table(read_pdb_table(path), read_pdb_table(INPUT_PDB))
+
+
+def test_stream_reader_handles_small_chunks():
+    with open(INPUT_PDB, "rb") as stream:
+        table = _read_pdb_table_stream(stream, chunk_size=50, all_chains=True)
+
+    assert_same_table(table, read_pdb_table(INPUT_PDB, all_chains=True))
+
+
+def test_compressed_trajectory_streams_models(tmp_path):
+    path = compress(TRAJECTORY, tmp_path / "model.pdb.tra.xz", lzma)
+
+    assert [molecule.nres for molecule in iter_models(path, path.name)] == [209] * 7
+
+
+@pytest.mark.parametrize("suffix, module", FORMATS)
+def test_write_pdb_compresses_by_suffix(tmp_path, suffix, module):
+    molecule = read_pdb_file(INPUT_PDB, INPUT_PDB.name)
+    write_pdb(molecule, tmp_path / "plain.pdb")
+    write_pdb(molecule, tmp_path / f"out.pdb{suffix}")
+
+    assert detect_compression(tmp_path / f"out.pdb{suffix}") is module
+    assert module.decompress((tmp_path / f"out.pdb{suffix}").read_bytes()) == (
+        (tmp_path / "plain.pdb").read_bytes()
+    )
+
+
+def test_cli_keeps_compression(tmp_path):
+    path = compress(INPUT_PDB, tmp_path / "7laf.pdb.gz", gzip)
+
+    subprocess.run(
+        [sys.executable, str(PROJECT_ROOT / "pulchra.py"), "-c", str(path)],
+        check=True, capture_output=True, text=True, cwd=PROJECT_ROOT,
+    )
+
+    output = tmp_path / "7laf.rebuilt.pdb.gz"
+    assert detect_compression(output) is gzip
+    assert len(read_pdb_table(output, all_chains=True)) > 0
@@ -0,0 +1,104 @@
+import contextlib
+import gzip
+import io
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from pulchra import core
+from pulchra import frame_index
+from pulchra.frame_index import FrameIndex, index_path
+from pulchra.pdb_parser import iter_model_tables, read_ca_trace
+from pulchra.pdb_writer import TrajectoryWriter
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+TRAJECTORY = PROJECT_ROOT / "c_legacy/examples/model.pdb.tra"
+CA_PDB = PROJECT_ROOT / "c_legacy/examples/model.pdb"
+
+
+def _copy(tmp_path, name="model.pdb"):
+    path = tmp_path / name
+    shutil.copy(TRAJECTORY, path)
+    return path
+
+
+def test_index_holds_model_offsets(tmp_path, monkeypatch):
+    path = _copy(tmp_path)
+    monkeypatch.setattr(frame_index, "SCAN_CHUNK_SIZE", 1000)
+    index = FrameIndex.build(path)
+    data = path.read_bytes()
+
+    assert index.numbers.tolist() == list(range(1, 8))
+    for number, start, end in index.rows.tolist():
+        assert data[start:end].startswith(b"MODEL  %d\n" % number)
+        assert data[start:end].endswith(b"ENDMDL\n")
+
+
+def test_selected_frames_match_a_full_scan(tmp_path):
+    path = _copy(tmp_path)
+    models = list(iter_model_tables(path))
+
+    for frames in (slice(2, 5), range(0, 7, 3), slice(-2, None)):
+        selected = list(iter_model_tables(path, frames=frames))
+        expected = models[frames] if isinstance(frames, slice) else [models[i] for i in frames]
+        assert [number for number, _ in selected] == [number for number, _ in expected]
+        for (_, table), (_, reference) in zip(selected, expected):
+            assert np.array_equal(table.coords, reference.coords)
+    # Reading writes nothing next to the file unless asked to.
+    assert not index_path(path).exists()
+    list(iter_model_tables(path, frames=slice(0, 1), save_index=True))
+    assert np.array_equal(FrameIndex.load(path).rows, FrameIndex.build(path).rows)
+
+
+def test_sidecar_is_reused_until_the_file_changes(tmp_path):
+    path = _copy(tmp_path)
+    list(iter_model_tables(path, frames=slice(0, 1), save_index=True))
+    # A sidecar whose rows are wrong but whose header matches is trusted.
+    index = FrameIndex.load(path)
+    FrameIndex(index.rows[:3]).save(path)
+    assert len(FrameIndex.for_file(path)) == 3
+
+    with open(path, "ab") as f:
+        f.write(b"REMARK changed\n")
+    assert FrameIndex.load(path) is None
+    assert len(FrameIndex.for_file(path)) == 7
+    assert FrameIndex.load(path) is None
+
+
+def test_compressed_files_are_scanned(tmp_path):
+    path = tmp_path / "model.pdb.gz"
+    path.write_bytes(gzip.compress(TRAJECTORY.read_bytes()))
+
+    assert [number for number, _ in iter_model_tables(path, frames=slice(1, 3))] == [2, 3]
+    assert not index_path(path).exists()
+
+
+def test_trajectory_writer_keeps_the_index(tmp_path):
+    path = tmp_path / "model.tra"
+    trace = read_ca_trace(CA_PDB, "model")
+    with TrajectoryWriter(path, max_buffered=4) as trajectory:
+        with contextlib.redirect_stdout(io.StringIO()):
+            core.ca_optimize(trace, trajectory, None, False, False, 3.0)
+        written = FrameIndex.load(path)
+        assert written is not None and 0 < len(written) <= trajectory.nframes
+
+    written = FrameIndex.load(path)
+    assert np.array_equal(written.rows, FrameIndex.build(path).rows)
+    assert len(written) == trajectory.nframes
+
+
+def test_cli_rebuilds_a_frame_range(tmp_path):
+    path = _copy(tmp_path)
+    command = [
+        sys.executable, str(PROJECT_ROOT / "pulchra.py"), "-c", "--all-models",
+        "--frames", "4:", "--output", str(tmp_path / "out.pdb"), str(path),
+    ]
+    subprocess.run(command, check=True, capture_output=True, cwd=PROJECT_ROOT)
+
+    assert [number for number, _ in iter_model_tables(tmp_path / "out.pdb")] == [5, 6, 7]
+    assert not index_path(path).exists()
+    subprocess.run(command + ["--save-index"], check=True, capture_output=True, cwd=PROJECT_ROOT)
+    assert FrameIndex.load(path) is not None
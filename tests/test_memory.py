@@ -0,0 +1,99 @@
+import tracemalloc
+from pathlib import Path
+
+from pulchra.pdb_datastructures import AtomTable
+from pulchra.pdb_parser import read_pdb_table
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INPUT_PDB = PROJECT_ROOT / "tests/7laf.pdb"
+NATOMS = 50_000
+
+
+class DictAtom:
+    """The per-atom layout used before the atom buffers: one __dict__ per atom."""
+
+    def __init__(self, x, y, z, name, num, locnum, flag, cispro, res):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.name = name
+        self.num = num
+        self.locnum = locnum
+        self.flag = flag
+        self.cispro = cispro
+        self.res = res
+        self.prev = None
+        self.next = None
+
+
+class DictResidue:
+    """The per-residue layout used before the slotted Residue."""
+
+    def __init__(self, num, locnum, natoms, type, pdbsg, protein, name, chain):
+        self.num = num
+        self.locnum = locnum
+        self.natoms = natoms
+        self.type = type
+        self.pdbsg = pdbsg
+        self.protein = protein
+        self.name = name
+        self.chain = chain
+        self.atoms = []
+        self.sgx = 0.0
+        self.sgy = 0.0
+        self.sgz = 0.0
+        self.cmx = 0.0
+        self.cmy = 0.0
+        self.cmz = 0.0
+        self.prev = None
+        self.next = None
+
+
+def build_dict_residues(table):
+    residues = []
+    starts = table.residue_starts().tolist() + [len(table)]
+    coords = table.coords.tolist()
+    names = [name.decode() for name in table.name.tolist()]
+    serials = table.serial.tolist()
+    for locnum, (lo, hi) in enumerate(zip(starts[:-1], starts[1:])):
+        res = DictResidue(
+            int(table.resnum[lo]), locnum, 0, 0, False, True,
+            table.resname[lo].decode(), table.chain[lo].decode(),
+        )
+        for i in range(lo, hi):
+            x, y, z = coords[i]
+            res.atoms.append(DictAtom(x, y, z, names[i], serials[i], 0, 0, False, res))
+            res.natoms += 1
+        residues.append(res)
+    return residues
+
+
+def bytes_per_atom(build, table):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        built = build(table)
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del built
+    return size / len(table)
+
+
+def large_table():
+    table = read_pdb_table(INPUT_PDB, all_chains=True)
+    copies = -(-NATOMS // len(table))
+    return AtomTable.concatenate([table] * copies)
+
+
+def test_molecule_bytes_per_atom():
+    table = large_table()
+
+    before = bytes_per_atom(build_dict_residues, table)
+    after = bytes_per_atom(lambda table: table.to_molecule("memory"), table)
+    print(
+        f"\n{len(table)} atoms: {before:.0f} bytes/atom with per-atom dicts, "
+        f"{after:.0f} bytes/atom with slotted views over the atom buffers"
+    )
+
+    assert after * 2 < before
@@ -0,0 +1,136 @@
+import contextlib
+import gzip
+import io
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from pulchra.mmcif import is_mmcif, parse_mmcif_bytes, read_mmcif_table
+from pulchra.pdb_parser import iter_model_tables, read_pdb_chains, read_pdb_table
+from pulchra.pdb_writer import write_pdb, write_pdb_models
+
+from helpers import assert_same_table
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INPUT_PDB = PROJECT_ROOT / "tests/7laf.pdb"
+
+QUOTED_CIF = b"""data_test
+#
+loop_
+_atom_site.group_PDB
+_atom_site.id
+_atom_site.label_atom_id
+_atom_site.label_alt_id
+_atom_site.label_comp_id
+_atom_site.label_asym_id
+_atom_site.label_seq_id
+_atom_site.Cartn_x
+_atom_site.Cartn_y
+_atom_site.Cartn_z
+_atom_site.auth_seq_id
+_atom_site.auth_asym_id
+_atom_site.pdbx_PDB_model_num
+ATOM 1 "O5'" . DG A 1 1.000 2.000 3.000 10 AA 1
+ATOM 2 'C5 X' A DG A 1 4.000 5.000 6.000 10 AA 1
+ATOM 3 C4 B DG A 1 7.000 8.000 9.000 10 AA 1
+HETATM 4 MG . MG B . 0.500 0.250 0.125 ? BB 1
+ATOM 5 "O5'" . DG A 1 9.000 9.000 9.000 10 AA 2
+#
+_other.item value
+"""
+
+
+def write_quietly(write, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        write(*args)
+
+
+def test_mmcif_roundtrip_matches_pdb(tmp_path):
+    chains = read_pdb_chains(INPUT_PDB, INPUT_PDB.name)
+    write_quietly(write_pdb, chains, tmp_path / "out.pdb")
+    write_quietly(write_pdb, chains, tmp_path / "out.cif")
+
+    pdb = read_pdb_table(tmp_path / "out.pdb", all_chains=True)
+    cif = read_pdb_table(tmp_path / "out.cif", all_chains=True)
+    assert len(cif) == len(pdb)
+    # PDB output carries no chain identifiers; mmCIF output keeps them.
+    fields = [field for field in pdb.FIELDS if field not in ("chain", "segment")]
+    assert_same_table(cif, pdb, fields)
+    assert cif.chain[0] == b"A" and cif.chain[-1] == b"B"
+    assert [len(chain) for chain in cif.split_chains()] == [
+        len(chain) for chain in pdb.split_chains()
+    ]
+
+
+def test_first_chain_only_by_default(tmp_path):
+    write_quietly(write_pdb, read_pdb_chains(INPUT_PDB, INPUT_PDB.name), tmp_path / "out.cif")
+
+    assert set(read_pdb_table(tmp_path / "out.cif").chain.tolist()) == {b"A"}
+
+
+def test_quoted_values_and_alternate_locations():
+    table = parse_mmcif_bytes(QUOTED_CIF, all_chains=True)
+
+    assert table.name.tolist() == [b"O5'", b"C5 X", b"MG"]
+    assert table.altloc.tolist() == [b" ", b"A", b" "]
+    assert table.chain.tolist() == [b"AA", b"AA", b"BB"]
+    assert table.resnum.tolist() == [10, 10, 0]
+    assert table.hetatm.tolist() == [False, False, True]
+    assert np.allclose(table.coords[-1], [0.5, 0.25, 0.125])
+
+
+def test_mmcif_models(tmp_path):
+    path = tmp_path / "quoted.cif"
+    path.write_bytes(QUOTED_CIF)
+
+    models = list(iter_model_tables(path, all_chains=True))
+    assert [(number, len(table)) for number, table in models] == [(1, 3), (2, 1)]
+    assert np.allclose(models[1][1].coords, [[9.0, 9.0, 9.0]])
+
+
+def test_write_pdb_models_to_mmcif(tmp_path):
+    molecule = read_pdb_table(INPUT_PDB).to_molecule("7laf")
+    write_quietly(write_pdb_models, [molecule, molecule], tmp_path / "models.cif")
+
+    models = list(iter_model_tables(tmp_path / "models.cif"))
+    assert [number for number, _ in models] == [1, 2]
+    assert np.array_equal(models[0][1].coords, models[1][1].coords)
+
+
+def test_mmcif_detected_by_content_and_compressed(tmp_path):
+    path = tmp_path / "structure.txt"
+    path.write_bytes(QUOTED_CIF)
+    compressed = tmp_path / "structure.cif.gz"
+    compressed.write_bytes(gzip.compress(QUOTED_CIF))
+
+    assert is_mmcif(path) and is_mmcif(compressed) and not is_mmcif(INPUT_PDB)
+    assert_same_table(read_pdb_table(path), read_mmcif_table(compressed))
+
+
+def test_cli_writes_mmcif(tmp_path):
+    cif = tmp_path / "7laf.cif"
+    write_quietly(write_pdb, read_pdb_chains(INPUT_PDB, INPUT_PDB.name), cif)
+
+    subprocess.run(
+        [sys.executable, str(PROJECT_ROOT / "pulchra.py"), "-c", str(cif)],
+        check=True, capture_output=True, text=True, cwd=PROJECT_ROOT,
+    )
+
+    output = tmp_path / "7laf.rebuilt.cif"
+    assert output.read_text().startswith("data_7laf")
+    assert len(read_pdb_table(output, all_chains=True)) > 0
+
+
+def test_mmcif_elements_match_pdb(tmp_path):
+    chains = read_pdb_chains(INPUT_PDB, INPUT_PDB.name)
+    write_quietly(write_pdb, chains, tmp_path / "out.pdb")
+    write_quietly(write_pdb, chains, tmp_path / "out.cif")
+
+    pdb = [line[76:78].strip() for line in (tmp_path / "out.pdb").read_text().splitlines()
+           if line.startswith("ATOM")]
+    cif = [line.split()[2] for line in (tmp_path / "out.cif").read_text().splitlines()
+           if line.startswith("ATOM")]
+    assert cif == pdb
+    assert "MN" in cif
@@ -0,0 +1,64 @@
+import io
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from pulchra.pdb_parser import iter_models, iter_model_tables, read_pdb_table, _iter_model_tables
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+TRAJECTORY = PROJECT_ROOT / "c_legacy/examples/model.pdb.tra"
+
+
+def test_iter_models_yields_every_frame():
+    models = list(iter_models(TRAJECTORY, TRAJECTORY.name))
+
+    assert [molecule.model for molecule in models] == list(range(1, 8))
+    assert all(molecule.nres == 209 for molecule in models)
+    # The first frame is what the single-model reader sees.
+    first = read_pdb_table(TRAJECTORY)
+    assert np.array_equal(
+        [[atom.x, atom.y, atom.z] for res in models[0].residues for atom in res.atoms],
+        first.coords,
+    )
+
+
+def test_model_split_does_not_depend_on_chunk_size():
+    expected = list(iter_model_tables(TRAJECTORY))
+    with open(TRAJECTORY, "rb") as stream:
+        tables = list(_iter_model_tables(stream, chunk_size=97))
+
+    assert [number for number, _ in tables] == [number for number, _ in expected]
+    for (_, table), (_, reference) in zip(tables, expected):
+        assert np.array_equal(table.coords, reference.coords)
+        assert np.array_equal(table.name, reference.name)
+
+
+def test_single_model_file_yields_one_model():
+    text = (
+        b"HEADER    TEST\n"
+        b"ATOM      1  CA  GLY A   1       1.000   2.000   3.000\n"
+        b"ATOM      2  CA  ALA A   2       4.000   5.000   6.000\n"
+        b"END\n"
+    )
+    tables = list(_iter_model_tables(io.BytesIO(text), chunk_size=16))
+
+    assert [(number, len(table)) for number, table in tables] == [(1, 2)]
+
+
+def test_cli_rebuilds_all_models(tmp_path):
+    input_path = tmp_path / TRAJECTORY.name
+    input_path.write_bytes(TRAJECTORY.read_bytes())
+
+    subprocess.run(
+        [sys.executable, str(PROJECT_ROOT / "pulchra.py"), "--all-models", "-c", str(input_path)],
+        check=True, capture_output=True, text=True, cwd=PROJECT_ROOT,
+    )
+
+    output = (tmp_path / "model.pdb.rebuilt.pdb").read_text()
+    assert output.count("\nMODEL ") == 7
+    assert output.count("\nENDMDL\n") == 7
+    models = list(iter_models(tmp_path / "model.pdb.rebuilt.pdb", "rebuilt"))
+    assert len(models) == 7
+    assert all(molecule.nres == 209 for molecule in models)
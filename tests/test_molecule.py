@@ -0,0 +1,160 @@
+import contextlib
+import io
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pulchra import core
+from pulchra.data import AA_MAP_3_TO_NUM
+from pulchra.pdb_datastructures import Atom, Molecule, Residue, encode_residue_names
+from pulchra.pdb_parser import read_pdb_file, read_pdb_table
+from pulchra.pdb_writer import write_pdb
+from pulchra.pipeline import rebuild
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INPUT_PDB = PROJECT_ROOT / "tests/7laf.pdb"
+CA_PDB = PROJECT_ROOT / "c_legacy/examples/model.pdb"
+
+
+def test_buffers_hold_the_table_columns():
+    table = read_pdb_table(INPUT_PDB)
+    molecule = table.to_molecule("7laf")
+
+    assert molecule.natoms == len(table)
+    assert np.array_equal(molecule.coords, table.coords)
+    assert np.array_equal(molecule.serials, table.serial)
+    assert [molecule.atom_names[code] for code in molecule.name_codes] == (
+        table.name.astype(str).tolist()
+    )
+
+
+def test_atoms_are_views_of_the_buffers():
+    molecule = read_pdb_file(INPUT_PDB, "7laf")
+    atom = molecule.residues[3].atoms[1]
+
+    molecule.coords[atom.index] = (1.0, 2.0, 3.0)
+    assert (atom.x, atom.y, atom.z) == (1.0, 2.0, 3.0)
+    atom.y = 5.0
+    assert molecule.coords[atom.index, 1] == 5.0
+    atom.flag |= 4
+    assert molecule.flags[atom.index] == 4
+
+
+def test_added_atoms_survive_buffer_growth():
+    molecule = Molecule("test")
+    res = Residue(1, 1, 0, 0, False, True, "ALA", "A", molecule)
+    molecule.residues.append(res)
+    for i in range(40):
+        res.add_or_replace_atom(f"X{i}", i, 2 * i, 3 * i, 1)
+    res.add_or_replace_atom("N", -1.0, -2.0, -3.0, 1)
+    res.add_or_replace_atom("X7", 0.5, 0.5, 0.5, 2)
+
+    assert molecule.natoms == 41
+    assert res.atoms[0].name == "N"
+    assert [atom.name for atom in res.atoms[1:]] == [f"X{i}" for i in range(40)]
+    assert (res.atoms[8].x, res.atoms[8].flag) == (0.5, 3)
+    assert np.array_equal(molecule.coords[res.atoms[40].index], [39, 78, 117])
+
+
+def test_standalone_residue():
+    res = Residue(1, 1, 0, 0, False, False, "GLY", "A")
+    res.atoms.append(Atom(1.0, 2.0, 3.0, "CA", 7, 0, 0, False, res))
+
+    assert res.molecule.natoms == 1
+    assert (res.atoms[0].name, res.atoms[0].num, res.atoms[0].z) == ("CA", 7, 3.0)
+
+
+def test_residue_offsets_and_atom_index():
+    molecule = read_pdb_file(INPUT_PDB, "7laf")
+    order, offsets = molecule.residue_offsets()
+
+    assert len(offsets) == molecule.nres + 1
+    for i, res in enumerate(molecule.residues):
+        assert order[offsets[i]:offsets[i + 1]].tolist() == [atom.index for atom in res.atoms]
+    ca = molecule.atom_index("CA")
+    assert {molecule.atom_names[code] for code in molecule.name_codes[ca]} == {"CA"}
+
+
+def test_stages_work_on_the_shared_buffer():
+    molecule = read_pdb_file(CA_PDB, "model")
+    before = molecule.coords.copy()
+    with contextlib.redirect_stdout(io.StringIO()):
+        core.ca_optimize(molecule, False, None, False, False, 3.0)
+        optimized = molecule.coords.copy()
+        core.rebuild_backbone(molecule)
+
+    assert optimized.shape == before.shape and not np.array_equal(optimized, before)
+    assert np.array_equal(molecule.coords[:len(before)], optimized)
+    assert molecule.natoms == len(before) + sum(len(res.atoms) - 1 for res in molecule.residues)
+
+
+def test_atoms_are_kept_in_output_order():
+    res = Residue(1, 1, 0, 0, False, True, "SER", "A")
+    for name in ["CB", "O", "OG", "CA", "N", "C"]:
+        res.add_or_replace_atom(name, 0.0, 0.0, 0.0, 1)
+    res.add_or_replace_atom("CA", 1.0, 2.0, 3.0, 2)
+
+    assert [atom.name for atom in res.atoms] == ["N", "CA", "C", "O", "CB", "OG"]
+    assert res.natoms == 6
+    assert (res.find_atom("CA").x, res.find_atom("CA").flag) == (1.0, 3)
+    assert res.find_atom("H") is None
+
+
+def test_table_atoms_are_put_in_output_order():
+    table = read_pdb_table(INPUT_PDB)
+    shuffled = table.take(np.r_[4:6, 2:4, 0:2, 6:len(table)])
+    molecule = shuffled.to_molecule("7laf")
+
+    assert [atom.name for atom in molecule.residues[0].atoms] == (
+        [atom.name for atom in table.to_molecule("7laf").residues[0].atoms]
+    )
+    assert np.array_equal(molecule.coords, table.coords)
+
+
+def test_fork_shares_buffers_until_written():
+    molecule = read_pdb_file(INPUT_PDB, "7laf")
+    fork = molecule.fork()
+
+    assert np.shares_memory(fork.coords, molecule.coords)
+    with pytest.raises(ValueError):
+        molecule.coords[0] = 0.0
+    fork.residues[0].atoms[0].x = 100.0
+    fork.residues[0].add_or_replace_atom("H", 1.0, 1.0, 1.0, 5)
+
+    assert not np.shares_memory(fork.coords, molecule.coords)
+    assert molecule.residues[0].atoms[0].x != 100.0
+    assert (molecule.natoms, fork.natoms) == (fork.natoms - 1, molecule.natoms + 1)
+    assert molecule.residues[0].find_atom("H") is None
+
+
+@pytest.mark.parametrize("options", [
+    {}, {"no_ca_optimize": True}, {"cispro": True}, {"add_hydrogens": True},
+])
+def test_forks_rebuild_like_fresh_parses(tmp_path, options):
+    parsed = read_pdb_file(CA_PDB, "model")
+    with contextlib.redirect_stdout(io.StringIO()):
+        write_pdb(rebuild(parsed.fork(), **options), tmp_path / "fork.pdb")
+        write_pdb(rebuild(read_pdb_file(CA_PDB, "model"), **options), tmp_path / "fresh.pdb")
+
+    assert (tmp_path / "fork.pdb").read_bytes() == (tmp_path / "fresh.pdb").read_bytes()
+    assert np.array_equal(parsed.coords, read_pdb_file(CA_PDB, "model").coords)
+
+
+def test_residue_names_are_encoded_with_aliases():
+    names = np.array([b"GLY", b"MSE", b"HOH", b"SEP", b"UNK", b"GLY"])
+    types, protein = encode_residue_names(names)
+
+    assert types.tolist() == [
+        AA_MAP_3_TO_NUM[name] for name in ["GLY", "MET", "UNK", "SER", "UNK", "GLY"]
+    ]
+    assert protein.tolist() == [True, True, False, True, True, True]
+
+
+def test_parsed_residues_are_typed():
+    molecule = read_pdb_file(INPUT_PDB, "7laf")
+
+    for res in molecule.residues:
+        assert res.type == AA_MAP_3_TO_NUM.get(res.name, AA_MAP_3_TO_NUM["UNK"])
+        assert res.protein == (res.name in AA_MAP_3_TO_NUM)
+    assert any(res.protein for res in molecule.residues)
@@ -0,0 +1,100 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pulchra import pdb_parser
+from pulchra.pdb_parser import (
+    _ordered_map, _read_pdb_table_parallel, _stop_offset, iter_model_tables, read_pdb_chains,
+    read_pdb_table,
+)
+
+from helpers import assert_same_table
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INPUT_PDB = PROJECT_ROOT / "tests/7laf.pdb"
+TRAJECTORY = PROJECT_ROOT / "c_legacy/examples/model.pdb.tra"
+
+
+@pytest.fixture
+def decoys(tmp_path):
+    """A multi-model file whose models hold TER records and several chains."""
+    model = b"".join(
+        line for line in INPUT_PDB.read_bytes().splitlines(keepends=True)
+        if not line.startswith(b"END")
+    )
+    path = tmp_path / "decoys.pdb"
+    path.write_bytes(
+        b"".join(b"MODEL     %4d\n%sENDMDL\n" % (i, model) for i in range(1, 6))
+        + TRAJECTORY.read_bytes()
+    )
+    return path
+
+
+@pytest.mark.parametrize("all_chains", [False, True])
+@pytest.mark.parametrize("ca_only", [False, True])
+@pytest.mark.parametrize("chunk_size", [1000, 30_000])
+def test_parallel_matches_serial(decoys, all_chains, ca_only, chunk_size):
+    expected = read_pdb_table(decoys, all_chains=all_chains, ca_only=ca_only)
+    table = _read_pdb_table_parallel(
+        decoys, 2, chunk_size=chunk_size, all_chains=all_chains, ca_only=ca_only
+    )
+
+    assert_same_table(table, expected)
+
+
+def test_parallel_stops_at_end(tmp_path):
+    path = tmp_path / "ended.pdb"
+    path.write_bytes(INPUT_PDB.read_bytes() * 20)
+
+    table = _read_pdb_table_parallel(path, 3, chunk_size=2000, all_chains=True)
+
+    assert_same_table(table, read_pdb_table(INPUT_PDB, all_chains=True))
+
+
+def test_parallel_splits_only_up_to_the_first_stop(decoys):
+    data = b"ATOM\nTER\nATOM\nENDMDL\nATOM\nEND\n"
+
+    assert _stop_offset(data) == data.index(b"TER")
+    assert _stop_offset(data, all_chains=True) == data.index(b"ENDMDL")
+    assert _stop_offset(b"END\nATOM\n") == 0
+    assert _stop_offset(b"ATOM\n") == 5
+    decoy_data = decoys.read_bytes()
+    assert decoy_data[_stop_offset(decoy_data):].startswith(b"ENDMDL\nMODEL        2")
+
+
+def test_workers_option_on_readers(decoys, monkeypatch):
+    monkeypatch.setattr(pdb_parser, "PARALLEL_CHUNK_SIZE", 1000)
+    chains = read_pdb_chains(decoys, "decoys", workers=2)
+
+    assert [chain.nres for chain in chains] == [
+        chain.nres for chain in read_pdb_chains(decoys, "decoys")
+    ]
+
+
+@pytest.mark.parametrize("frames", [None, slice(1, 6, 2)])
+def test_parallel_models_match_serial(decoys, monkeypatch, frames):
+    monkeypatch.setattr(pdb_parser, "PARALLEL_CHUNK_SIZE", 1000)
+    expected = list(iter_model_tables(decoys, all_chains=True, frames=frames))
+    models = list(iter_model_tables(decoys, all_chains=True, frames=frames, workers=2))
+
+    assert [number for number, _ in models] == [number for number, _ in expected]
+    for (_, table), (_, other) in zip(models, expected):
+        assert_same_table(table, other)
+
+
+def test_ordered_map_stays_ahead_by_the_window():
+    taken = []
+
+    def items():
+        for item in range(100):
+            taken.append(item)
+            yield item
+
+    with ThreadPoolExecutor(2) as executor:
+        results = _ordered_map(executor, np.square, items(), window=4)
+        assert next(results) == 0
+        assert len(taken) == 5
+        results.close()
+    assert len(taken) == 5
@@ -0,0 +1,180 @@
+import gzip
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from pulchra.cache import StructureCache
+from pulchra.mmcif import read_mmcif_table
+from pulchra.pdb_parser import (
+    _read_pdb_table_mmap, _read_pdb_table_parallel, iter_model_chains, parse_pdb_bytes,
+    read_pdb_chains, read_pdb_table,
+)
+from pulchra.pdb_writer import write_pdb, write_pdb_models
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INPUT_PDB = PROJECT_ROOT / "tests/7laf.pdb"
+
+MIXED = (
+    b"ATOM      1  N   GLY A   1       0.000   1.000   2.000\n"
+    b"ATOM      2  CA  GLY A   1       1.000   2.000   3.000\n"
+    b"HETATM    3 SE   MSE A   2       4.000   5.000   6.000\n"
+    b"HETATM    4  CA  MSE A   2       4.500   5.000   6.000\n"
+    b"HETATM    5 CA    CA A 101       7.000   8.000   9.000  1.00 20.00          CA\n"
+    b"TER\n"
+    b"HETATM    6  O   HOH A 201      10.000  11.000  12.000  1.00 30.00           O\n"
+    b"END\n"
+)
+
+
+def hetero_lines(data):
+    return [
+        line for line in data.splitlines(keepends=True)
+        if line.startswith((b"ATOM", b"HETATM")) and line[17:20].strip() in (b"CA", b"HOH")
+    ]
+
+
+def test_non_protein_records_are_set_aside():
+    table = parse_pdb_bytes(MIXED, all_chains=True, passthrough=True)
+
+    assert table.serial.tolist() == [1, 2, 3, 4]
+    assert table.passthrough.tobytes() == b"".join(hetero_lines(MIXED))
+    # The records are offsets into the input text, not copies.
+    assert np.shares_memory(table.passthrough.data, np.frombuffer(MIXED, dtype=np.uint8))
+
+
+def test_ca_only_keeps_the_passthrough_records():
+    table = parse_pdb_bytes(MIXED, all_chains=True, ca_only=True, passthrough=True)
+
+    assert table.serial.tolist() == [2, 4]
+    assert len(table.passthrough) == 2
+
+
+def test_readers_agree_on_passthrough(tmp_path):
+    expected = read_pdb_table(INPUT_PDB, all_chains=True, passthrough=True)
+    gz = tmp_path / "7laf.pdb.gz"
+    gz.write_bytes(gzip.compress(INPUT_PDB.read_bytes()))
+    cache = StructureCache(tmp_path / "cache")
+    cache.read_table(INPUT_PDB, all_chains=True, passthrough=True)
+
+    tables = [
+        _read_pdb_table_mmap(INPUT_PDB, block_size=4096, all_chains=True, passthrough=True),
+        _read_pdb_table_parallel(
+            INPUT_PDB, 2, chunk_size=50_000, all_chains=True, passthrough=True
+        ),
+        read_pdb_table(gz, all_chains=True, passthrough=True),
+        cache.read_table(INPUT_PDB, all_chains=True, passthrough=True),
+    ]
+
+    assert len(expected.passthrough) == 36
+    for table in tables:
+        assert table.passthrough.tobytes() == expected.passthrough.tobytes()
+        assert table.serial.tolist() == expected.serial.tolist()
+
+
+def test_passthrough_is_written_verbatim(tmp_path):
+    chains, passthrough = read_pdb_chains(INPUT_PDB, INPUT_PDB.name, passthrough=True)
+    write_pdb(chains, tmp_path / "out.pdb", passthrough)
+
+    lines = (tmp_path / "out.pdb").read_bytes().splitlines(keepends=True)
+    assert b"".join(lines[-len(passthrough) - 1:-1]) == passthrough.tobytes()
+    assert lines[-len(passthrough) - 2] == b"TER\n"
+
+
+def test_passthrough_is_written_to_mmcif_rows(tmp_path):
+    chains, passthrough = read_pdb_chains(INPUT_PDB, INPUT_PDB.name, passthrough=True)
+    write_pdb(chains, tmp_path / "out.cif", passthrough)
+
+    table = read_mmcif_table(tmp_path / "out.cif", all_chains=True)
+    expected = parse_pdb_bytes(passthrough.tobytes(), all_chains=True)
+    rows = table.take(np.arange(len(table) - len(expected), len(table)))
+    for field in ("hetatm", "name", "resname", "chain", "resnum", "coords"):
+        assert np.array_equal(getattr(rows, field), getattr(expected, field)), field
+    # Occupancy and B-factor are those of the records, not the rebuilt defaults.
+    manganese = [
+        line.split() for line in (tmp_path / "out.cif").read_text().splitlines()
+        if line.startswith("HETATM") and " MN " in line
+    ]
+    assert [row[12:14] for row in manganese] == [["1.00", "29.26"]]
+
+
+def write_two_models(path):
+    records = [line for line in INPUT_PDB.read_bytes().splitlines(keepends=True)
+               if line.startswith((b"ATOM", b"HETATM", b"TER"))]
+    path.write_bytes(b"".join(
+        b"MODEL     %4d\n" % number + b"".join(records) + b"ENDMDL\n" for number in (1, 2)
+    ) + b"END\n")
+    return path
+
+
+def test_models_keep_their_passthrough_records(tmp_path):
+    path = write_two_models(tmp_path / "models.pdb")
+
+    _, expected = read_pdb_chains(INPUT_PDB, INPUT_PDB.name, passthrough=True)
+    models = list(iter_model_chains(path, path.name, passthrough=True))
+    assert len(models) == 2
+    for chains, passthrough in models:
+        assert passthrough.tobytes() == expected.tobytes()
+
+    write_pdb_models(models, tmp_path / "out.pdb", passthrough=True)
+    blocks = (tmp_path / "out.pdb").read_bytes().split(b"ENDMDL\n")
+    assert all(block.endswith(models[0][1].tobytes()) for block in blocks[:2])
+
+
+def test_selected_frames_keep_their_passthrough_records(tmp_path):
+    path = write_two_models(tmp_path / "models.pdb")
+    gzipped = tmp_path / "models.pdb.gz"
+    gzipped.write_bytes(gzip.compress(path.read_bytes()))
+
+    _, expected = read_pdb_chains(INPUT_PDB, INPUT_PDB.name, passthrough=True)
+    for source in (path, gzipped):
+        models = list(iter_model_chains(source, source.name, frames=slice(1, 2), passthrough=True))
+        assert [chains[0].model for chains, _ in models] == [2]
+        assert models[0][1].tobytes() == expected.tobytes()
+
+def test_cli_copies_ligands(tmp_path):
+    input_path = tmp_path / "7laf.pdb"
+    input_path.write_bytes(INPUT_PDB.read_bytes())
+
+    subprocess.run(
+        [sys.executable, str(PROJECT_ROOT / "pulchra.py"), "-c", str(input_path)],
+        check=True, capture_output=True, cwd=PROJECT_ROOT,
+    )
+
+    output = (tmp_path / "7laf.rebuilt.pdb").read_bytes()
+    hetatm = [line for line in INPUT_PDB.read_bytes().splitlines(keepends=True)
+              if line.startswith(b"HETATM")]
+    assert b"".join(hetatm) in output
+    assert b" XRP " not in output.replace(b"".join(hetatm), b"")
+
+
+def test_cli_copies_ligands_of_every_model(tmp_path):
+    path = write_two_models(tmp_path / "models.pdb")
+
+    subprocess.run(
+        [sys.executable, str(PROJECT_ROOT / "pulchra.py"), "-c", "--all-models", str(path)],
+        check=True, capture_output=True, cwd=PROJECT_ROOT,
+    )
+
+    hetatm = b"".join(line for line in INPUT_PDB.read_bytes().splitlines(keepends=True)
+                      if line.startswith(b"HETATM"))
+    blocks = (tmp_path / "models.rebuilt.pdb").read_bytes().split(b"ENDMDL\n")
+    assert len(blocks) == 3
+    assert all(block.endswith(hetatm) for block in blocks[:2])
+
+
+def test_cli_writes_ligands_to_mmcif(tmp_path):
+    input_path = tmp_path / "7laf.pdb"
+    input_path.write_bytes(INPUT_PDB.read_bytes())
+
+    subprocess.run(
+        [sys.executable, str(PROJECT_ROOT / "pulchra.py"), "-c", str(input_path),
+         "--output", str(tmp_path / "out.cif")],
+        check=True, capture_output=True, cwd=PROJECT_ROOT,
+    )
+
+    table = read_mmcif_table(tmp_path / "out.cif", all_chains=True)
+    _, passthrough = read_pdb_chains(INPUT_PDB, INPUT_PDB.name, passthrough=True)
+    assert table.hetatm.sum() == len(passthrough)
+    assert table.hetatm[-len(passthrough):].all()
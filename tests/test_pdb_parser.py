@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from pathlib import Path
+
+from pulchra.pdb_parser import read_pdb_file, read_pdb_table, parse_pdb_bytes, _read_pdb_table_mmap
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+INPUTS = [
+    PROJECT_ROOT / "tests/7laf.pdb",
+    PROJECT_ROOT / "tests/7laf_ca.pdb",
+    PROJECT_ROOT / "c_legacy/examples/model.pdb",
+    PROJECT_ROOT / "c_legacy/examples/model.pdb.tra",
+    PROJECT_ROOT / "1L2K.pdb",
+]
+
+
+def molecule_summary(molecule):
+    return [
+        (res.num, res.locnum, res.natoms, res.name, res.chain, res.type, res.protein,
+         [(atom.name, atom.num, atom.x, atom.y, atom.z) for atom in res.atoms])
+        for res in molecule.residues
+    ]
+
+
+@pytest.mark.parametrize("path", INPUTS, ids=lambda path: path.name)
+def test_vectorized_parser_matches_line_parser(path):
+    expected = read_pdb_file(path, path.name, vectorized=False)
+    molecule = read_pdb_file(path, path.name)
+
+    assert molecule.nres == expected.nres
+    assert molecule_summary(molecule) == molecule_summary(expected)
+
+
+@pytest.mark.parametrize("path", INPUTS, ids=lambda path: path.name)
+@pytest.mark.parametrize("block_size", [256, 1 << 22])
+def test_mmap_reader_matches_in_memory_reader(path, block_size):
+    expected = read_pdb_table(path)
+    table = _read_pdb_table_mmap(path, block_size=block_size)
+
+    for field in table.FIELDS:
+        assert np.array_equal(getattr(table, field), getattr(expected, field)), field
+
+
+def test_read_pdb_file_mmap(tmp_path):
+    path = PROJECT_ROOT / "tests/7laf.pdb"
+    molecule = read_pdb_file(path, path.name, use_mmap=True)
+
+    assert molecule_summary(molecule) == molecule_summary(read_pdb_file(path, path.name))
+    empty = tmp_path / "empty.pdb"
+    empty.write_bytes(b"")
+    assert len(read_pdb_table(empty, use_mmap=True)) == 0
+
+
+def test_parse_pdb_bytes_edge_cases():
+    text = (
+        "REMARK   1 NOT A RECORD\r\n"
+        "ATOM      1  N   ALA A   1      -1.000   2.500 -10.125\r\n"
+        "ATOM      2  CA AALA A   1       1.000   2.000   3.000\r\n"
+        "ATOM      3  CA BALA A   1       9.000   9.000   9.000\r\n"
+        "HETATM    4 MN    MN A 101     100.500-200.250 300.125\r\n"
+        "TER\r\n"
+        "ATOM      5  CA  GLY B   1       0.000   0.000   0.000\r\n"
+    )
+    table = parse_pdb_bytes(text.encode())
+
+    assert len(table) == 3
+    assert table.name.tolist() == [b"N", b"CA", b"MN"]
+    assert table.resname.tolist() == [b"ALA", b"ALA", b"MN"]
+    assert table.serial.tolist() == [1, 2, 4]
+    assert table.resnum.tolist() == [1, 1, 101]
+    assert table.hetatm.tolist() == [False, False, True]
+    assert table.chain.tolist() == [b"A", b"A", b"A"]
+    assert np.array_equal(table.coords[0], [-1.0, 2.5, -10.125])
+    assert np.array_equal(table.coords[2], [100.5, -200.25, 300.125])
+
+
+def test_short_lines_are_padded():
+    table = parse_pdb_bytes(b"ATOM      1  CA  GLY     7       1.000   2.000   3.000")
+
+    assert len(table) == 1
+    assert table.chain.tolist() == [b" "]
+    assert np.array_equal(table.coords, [[1.0, 2.0, 3.0]])
+
+
+def test_read_pdb_table_residue_starts():
+    table = read_pdb_table(PROJECT_ROOT / "c_legacy/examples/model.pdb")
+
+    assert len(table.residue_starts()) == len(table) == 209
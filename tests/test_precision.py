@@ -0,0 +1,67 @@
+import contextlib
+import io
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pulchra.geometry import superimpose
+from pulchra.pdb_parser import read_pdb_file, read_pdb_table
+from pulchra.pdb_writer import write_pdb
+from pulchra.pipeline import rebuild
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INPUT_PDB = PROJECT_ROOT / "c_legacy/examples/model.pdb"
+GOLDEN_OUTPUTS_DIR = PROJECT_ROOT / "tests/golden_outputs"
+
+# Coordinates are written with 3 decimals: single precision may change the last one.
+WRITTEN_TOLERANCE = 0.0011
+
+CASES = [
+    ({}, "model.rebuilt.default.pdb"),
+    ({"no_ca_optimize": True}, "model.rebuilt.no_ca_opt.pdb"),
+    ({"cispro": True}, "model.rebuilt.cis_prolin.pdb"),
+    ({"add_hydrogens": True}, "model.rebuilt.with_hydrogens.pdb"),
+]
+
+
+def rebuilt_atoms(path, **options):
+    with contextlib.redirect_stdout(io.StringIO()):
+        write_pdb(rebuild(read_pdb_file(INPUT_PDB, "model"), **options), path)
+    return read_atoms(path)
+
+
+def read_atoms(path):
+    table = read_pdb_table(path)
+    keys = zip(table.resnum.tolist(), table.name.tolist())
+    return dict(zip(keys, table.coords))
+
+
+def rms_deviation(atoms, golden):
+    common = [key for key in atoms if key in golden]
+    return np.sqrt(np.mean([np.sum((atoms[key] - golden[key]) ** 2) for key in common]))
+
+
+@pytest.mark.parametrize("options, golden_file_name", CASES)
+def test_float32_matches_default_precision(tmp_path, options, golden_file_name):
+    double = rebuilt_atoms(tmp_path / "double.pdb", **options)
+    single = rebuilt_atoms(tmp_path / "single.pdb", float32=True, **options)
+    golden = read_atoms(GOLDEN_OUTPUTS_DIR / golden_file_name)
+
+    assert single.keys() == double.keys()
+    assert max(np.abs(single[key] - double[key]).max() for key in double) <= WRITTEN_TOLERANCE
+    assert abs(rms_deviation(single, golden) - rms_deviation(double, golden)) < 1e-3
+
+
+def test_superimpose_computes_in_the_given_dtype():
+    rng = np.random.default_rng(0)
+    coords = rng.normal(size=(6, 3))
+    rotation, _ = np.linalg.qr(rng.normal(size=(3, 3)))
+    rotation *= np.linalg.det(rotation)
+    moved = coords @ rotation.T + 1.5
+
+    rmsd, fitted = superimpose(coords, moved, moved, dtype=np.float32)
+
+    assert fitted.dtype == np.float32
+    assert rmsd < 1e-5
+    assert np.allclose(fitted, coords, atol=1e-5)
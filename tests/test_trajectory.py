@@ -0,0 +1,91 @@
+import contextlib
+import io
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from pulchra import core
+from pulchra.pdb_parser import iter_model_tables, read_ca_trace, read_pdb_file
+from pulchra.pdb_writer import TrajectoryWriter
+from pulchra.pipeline import rebuild
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CA_PDB = PROJECT_ROOT / "c_legacy/examples/model.pdb"
+
+
+class CountingFile(io.BytesIO):
+    """A BytesIO counting its write calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, data):
+        """Counts the call and writes the data."""
+        self.writes += 1
+        return super().write(data)
+
+
+def _optimize(chain, trajectory):
+    with contextlib.redirect_stdout(io.StringIO()):
+        core.ca_optimize(chain, trajectory, None, False, False, 3.0)
+
+
+def test_trajectory_frames_read_back(tmp_path):
+    trace = read_ca_trace(CA_PDB, "model")
+    start = trace.coords.copy()
+    with TrajectoryWriter(tmp_path / "model.tra") as trajectory:
+        _optimize(trace, trajectory)
+    models = list(iter_model_tables(tmp_path / "model.tra"))
+
+    assert [number for number, _ in models] == list(range(1, trajectory.nframes + 1))
+    assert trajectory.nframes > 2
+    assert np.array_equal(models[0][1].coords, start)
+    assert np.allclose(models[-1][1].coords, trace.coords, atol=5e-4)
+    assert np.array_equal(models[0][1].resname, trace.resname)
+    assert np.array_equal(models[0][1].resnum, trace.resnum)
+    assert (tmp_path / "model.tra").read_bytes().endswith(b"ENDMDL\nEND\n")
+
+
+def test_trajectory_stride_and_buffering():
+    every_step = TrajectoryWriter(io.BytesIO())
+    _optimize(read_pdb_file(CA_PDB, "model"), every_step)
+    out = CountingFile()
+    strided = TrajectoryWriter(out, stride=5, max_buffered=2)
+    _optimize(read_pdb_file(CA_PDB, "model"), strided)
+
+    nsteps = every_step.nframes - 1
+    assert strided.nframes == -(-nsteps // 5) + 1
+    # Frames are written two at a time as they are produced, not all at the end.
+    assert out.writes >= strided.nframes // 2
+    strided.close()
+    assert not out.closed and out.getvalue().count(b"MODEL") == strided.nframes
+
+
+def test_rebuild_writes_trajectory_to_path(tmp_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        rebuild(read_pdb_file(CA_PDB, "model"), ca_trajectory=tmp_path / "model.tra")
+
+    assert len(list(iter_model_tables(tmp_path / "model.tra"))) > 1
+
+
+def test_stride_must_be_positive():
+    with pytest.raises(ValueError):
+        TrajectoryWriter(io.BytesIO(), stride=0)
+
+
+def test_cli_saves_trajectory(tmp_path):
+    path = tmp_path / "model.pdb"
+    path.write_bytes(CA_PDB.read_bytes())
+    subprocess.run(
+        [sys.executable, str(PROJECT_ROOT / "pulchra.py"), "-t", "--trajectory-stride", "10",
+         str(path)],
+        check=True, capture_output=True, cwd=PROJECT_ROOT,
+    )
+
+    models = list(iter_model_tables(tmp_path / "model.pdb.tra"))
+    assert len(models) > 1
+    assert all(len(table) == 209 for _, table in models)
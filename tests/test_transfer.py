@@ -0,0 +1,74 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from pulchra.pdb_datastructures import Molecule
+from pulchra.pdb_parser import read_pdb_file, read_ca_trace
+from pulchra.shared import attach_molecule, share_molecule
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INPUT_PDB = PROJECT_ROOT / "tests/7laf.pdb"
+
+
+def summary(molecule):
+    return (molecule.name, molecule.model, molecule.nres, [
+        (res.num, res.locnum, res.type, res.pdbsg, res.protein, res.name, res.chain,
+         [(atom.name, atom.num, atom.x, atom.y, atom.z, atom.flag, atom.cispro)
+          for atom in res.atoms])
+        for res in molecule.residues
+    ])
+
+
+def molecule_with_changes():
+    molecule = read_pdb_file(INPUT_PDB, "7laf")
+    molecule.model = 3
+    molecule.residues[0].add_or_replace_atom("H", 1.0, 2.0, 3.0, 5)
+    molecule.residues[1].atoms[1].cispro = True
+    return molecule
+
+
+def test_buffers_round_trip():
+    molecule = molecule_with_changes()
+    buffers = molecule.to_buffers()
+
+    assert all(isinstance(array, np.ndarray) and array.dtype != object
+               for array in buffers.values())
+    assert summary(Molecule.from_buffers(buffers)) == summary(molecule)
+
+
+def test_pickle_uses_buffers():
+    molecule = molecule_with_changes()
+    copy = pickle.loads(pickle.dumps(molecule))
+
+    assert summary(copy) == summary(molecule)
+    copy.residues[0].atoms[0].x = 100.0
+    assert molecule.residues[0].atoms[0].x != 100.0
+
+
+def test_unnamed_float32_molecule_round_trips():
+    trace = read_ca_trace(INPUT_PDB, None)
+    trace.set_precision(np.float32)
+    molecule = trace.to_molecule()
+
+    copy = pickle.loads(pickle.dumps(molecule))
+    assert copy.name is None and copy.dtype == np.float32
+    assert summary(copy) == summary(molecule)
+
+
+def attach_and_summarize(name, layout):
+    return summary(attach_molecule(name, layout))
+
+
+def test_shared_memory_across_processes():
+    molecule = molecule_with_changes()
+    block, layout = share_molecule(molecule)
+    try:
+        with ProcessPoolExecutor(1) as executor:
+            result = executor.submit(attach_and_summarize, block.name, layout).result()
+    finally:
+        block.close()
+        block.unlink()
+
+    assert result == summary(molecule)
@@ -0,0 +1,152 @@
+import io
+import subprocess
+import sys
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+from pulchra.pdb_datastructures import Molecule, Residue
+from pulchra.pdb_parser import read_pdb_file, read_pdb_table
+from pulchra.pdb_writer import _format_records, format_pdb, format_pdb_models, write_pdb
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INPUT_PDB = PROJECT_ROOT / "tests/7laf.pdb"
+CA_PDB = PROJECT_ROOT / "c_legacy/examples/model.pdb"
+
+
+def _molecule(atoms, name="ALA", num=1, chain="A"):
+    molecule = Molecule("test")
+    res = Residue(num, 1, 0, 0, False, True, name, chain, molecule)
+    molecule.residues.append(res)
+    for atom_name, x, y, z in atoms:
+        res.add_or_replace_atom(atom_name, x, y, z, 1)
+    return molecule
+
+
+def _atom_lines(path):
+    return [line for line in Path(path).read_text().splitlines() if line.startswith("ATOM")]
+
+
+def test_records_have_standard_columns(tmp_path):
+    molecule = _molecule(
+        [("N", 1.0, -2.5, 3.25), ("CA", -0.0004, 10.0, -100.125), ("1HB", 0.0, 0.0, 0.0),
+         ("HB11", 0.0, 0.0, 0.0)],
+        chain="B", num=-12,
+    )
+    write_pdb(molecule, tmp_path / "out.pdb")
+    lines = _atom_lines(tmp_path / "out.pdb")
+
+    assert lines[0] == (
+        "ATOM      1  N   ALA B -12       1.000  -2.500   3.250  1.00  0.00           N  "
+    )
+    assert lines[1][30:54] == "  -0.000  10.000-100.125"
+    assert [line[12:16] for line in lines] == [" N  ", " CA ", "1HB ", "HB11"]
+    assert [line[76:78] for line in lines] == [" N", " C", " H", " H"]
+    assert {len(line) for line in lines} == {80}
+
+
+def test_ions_take_their_element_from_the_residue(tmp_path):
+    write_pdb(_molecule([("ZN", 1.0, 2.0, 3.0)], name="ZN"), tmp_path / "out.pdb")
+
+    line = _atom_lines(tmp_path / "out.pdb")[0]
+    assert (line[12:16], line[17:20], line[76:78]) == ("ZN  ", " ZN", "ZN")
+
+
+def test_coordinates_match_python_formatting():
+    rng = np.random.default_rng(7)
+    coords = np.concatenate([
+        rng.uniform(-999.0, 9999.0, (2000, 3)),
+        np.round(rng.uniform(-50.0, 50.0, (500, 3)), 4),
+        np.array([[0.0005, -0.0005, 1.0005], [-0.0, 2.5e-4, -999.9995], [12345.0, -1000.0, 0.1]]),
+    ])
+    n = len(coords)
+    data = _format_records(
+        np.arange(1, n + 1), np.full(n, b" CA "), np.full(n, b"GLY"), np.full(n, b"A"),
+        np.ones(n, dtype=np.int64), coords, np.full(n, b" C"),
+    )
+
+    for line, (x, y, z) in zip(data.decode().splitlines(), coords.tolist()):
+        assert line[30:].startswith(f"{x:8.3f}{y:8.3f}{z:8.3f}")
+
+
+def test_non_finite_coordinates_are_formatted_without_warnings(tmp_path):
+    molecule = _molecule(
+        [("N", float("inf"), -float("inf"), float("nan")), ("CA", 1e300, -1.5, 2.0)]
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        write_pdb(molecule, tmp_path / "out.pdb")
+        write_pdb(molecule, tmp_path / "out.cif")
+
+    lines = _atom_lines(tmp_path / "out.pdb")
+    assert lines[0][30:54] == "     inf    -inf     nan"
+    assert lines[1][30:].startswith(f"{1e300:8.3f}  -1.500   2.000")
+    cif = _atom_lines(tmp_path / "out.cif")
+    assert cif[0].split()[9:12] == ["inf", "-inf", "nan"]
+
+
+def test_written_chains_read_back(tmp_path):
+    table = read_pdb_table(INPUT_PDB, all_chains=True)
+    write_pdb(table.to_molecule("7laf"), tmp_path / "out.pdb")
+    written = read_pdb_table(tmp_path / "out.pdb", all_chains=True)
+
+    assert np.array_equal(written.coords, table.coords)
+    assert np.array_equal(written.chain, table.chain)
+    assert np.array_equal(written.resnum, table.resnum)
+    assert np.array_equal(np.char.strip(written.name), np.char.strip(table.name))
+    assert written.serial.tolist() == list(range(1, len(table) + 1))
+
+
+def test_serials_continue_across_chains(tmp_path):
+    molecule = read_pdb_file(INPUT_PDB, "7laf")
+    write_pdb(molecule, tmp_path / "out.pdb")
+    lines = Path(tmp_path / "out.pdb").read_text().splitlines()
+
+    assert lines[0].startswith("REMARK") and lines[-1] == "END"
+    assert [int(line[6:11]) for line in lines if line.startswith("ATOM")] == (
+        list(range(1, molecule.natoms + 1))
+    )
+
+
+def test_output_goes_to_bytes_and_file_objects(tmp_path):
+    table = read_pdb_table(INPUT_PDB, all_chains=True, passthrough=True)
+    molecule = table.to_molecule("7laf")
+    write_pdb(molecule, tmp_path / "out.pdb", table.passthrough)
+    out = io.BytesIO()
+    write_pdb(molecule, out, table.passthrough)
+
+    assert not out.closed
+    assert out.getvalue() == format_pdb(molecule, table.passthrough)
+    assert out.getvalue() == (tmp_path / "out.pdb").read_bytes()
+    assert format_pdb_models([molecule, molecule]).count(b"ENDMDL\n") == 2
+
+
+def test_cli_writes_to_stdout(tmp_path):
+    path = tmp_path / "model.pdb"
+    path.write_bytes(CA_PDB.read_bytes())
+    command = [sys.executable, str(PROJECT_ROOT / "pulchra.py"), "-c", str(path)]
+
+    piped = subprocess.run(
+        command + ["--output", "-"], check=True, capture_output=True, cwd=PROJECT_ROOT,
+    )
+    subprocess.run(command, check=True, capture_output=True, cwd=PROJECT_ROOT)
+
+    assert piped.stdout == (tmp_path / "model.rebuilt.pdb").read_bytes()
+    assert b"Rebuilding backbone" in piped.stderr
+
+
+def test_cli_rebuilds_several_files(tmp_path):
+    paths = []
+    for name in ("a", "b"):
+        paths.append(tmp_path / f"{name}.pdb")
+        paths[-1].write_bytes(CA_PDB.read_bytes())
+    command = [sys.executable, str(PROJECT_ROOT / "pulchra.py"), "-c"]
+    run = dict(check=True, capture_output=True, cwd=PROJECT_ROOT)
+    subprocess.run(command + [str(paths[0])], **run)
+    expected = (tmp_path / "a.rebuilt.pdb").read_bytes()
+    (tmp_path / "a.rebuilt.pdb").unlink()
+    subprocess.run(command + [str(path) for path in paths], **run)
+
+    assert (tmp_path / "a.rebuilt.pdb").read_bytes() == expected
+    assert (tmp_path / "b.rebuilt.pdb").read_bytes() == expected